@@ -112,6 +112,23 @@ options:
         'tags',
         ]
     default: 'list'
+  all_pages:
+    description:
+      - "Follow the NextMarker/NextRecordName of list requests until all
+        results are retrieved, within a single connection. Applies to listing
+        hosted zones, health checks, reusable delegation sets and record sets.
+        When set, max_items is the page size of each request and
+        next_marker/start_record_name/type only set where the listing starts,
+        paging carries on with every record name and type after that point."
+    required: false
+    default: false
+    version_added: "2.1"
+  max_records:
+    description:
+      - "Maximum total number of items to return when all_pages is set.
+        Listing stops once that many items have been retrieved."
+    required: false
+    version_added: "2.1"
 author: Karen Cheng(@Etherdaemon)
 extends_documentation_fragment: aws
 '''
@@ -138,6 +155,23 @@ EXAMPLES = '''
     max_items: 20
   register: record_sets
 
+- name: List all resource record sets of a zone in one task
+  route53_facts:
+    query: record_sets
+    hosted_zone_id: 'ZZZ1111112222'
+    all_pages: yes
+  register: record_sets
+
+- name: List at most 5000 record sets of any name and type, starting at the www.example.com CNAME
+  route53_facts:
+    query: record_sets
+    hosted_zone_id: 'ZZZ1111112222'
+    start_record_name: 'www.example.com'
+    type: CNAME
+    all_pages: yes
+    max_records: 5000
+  register: record_sets
+
 - name: List first 20 health checks
   route53_facts:
     query: health_check
@@ -174,6 +208,38 @@ except ImportError:
     HAS_BOTO3 = False
 
 
+def list_all_pages(client, module, operation, result_key, params):
+    """Call a list operation until all pages, or max_records, are retrieved.
+
+    boto3 paginators are used where the client provides one, otherwise the
+    NextMarker of each response is passed back as Marker.
+    """
+    max_records = module.params.get('max_records')
+
+    if client.can_paginate(operation):
+        pagination_config = dict()
+        if max_records:
+            pagination_config['MaxItems'] = max_records
+        paginator = client.get_paginator(operation)
+        return paginator.paginate(PaginationConfig=pagination_config, **params).build_full_result()
+
+    params = dict(params)
+    items = []
+    while True:
+        results = getattr(client, operation)(**params)
+        items.extend(results.get(result_key, []))
+        if max_records and len(items) >= max_records:
+            results['IsTruncated'] = results.get('IsTruncated') or len(items) > max_records
+            items = items[:max_records]
+            break
+        if not results.get('IsTruncated'):
+            break
+        params['Marker'] = results['NextMarker']
+
+    results[result_key] = items
+    return results
+
+
 def get_hosted_zone(client, module):
     params = dict()
 
@@ -195,7 +261,10 @@ def reusable_delegation_set_details(client, module):
         if module.params.get('next_marker'):
             params['Marker'] = module.params.get('next_marker')
 
-        results = client.list_reusable_delegation_sets(**params)
+        if module.params.get('all_pages'):
+            results = list_all_pages(client, module, 'list_reusable_delegation_sets', 'DelegationSets', params)
+        else:
+            results = client.list_reusable_delegation_sets(**params)
     else:
         params['DelegationSetId'] = module.params.get('delegation_set_id')
         results = client.get_reusable_delegation_set(**params)
@@ -215,7 +284,10 @@ def list_hosted_zones(client, module):
     if module.params.get('delegation_set_id'):
         params['DelegationSetId'] = module.params.get('delegation_set_id')
 
-    results = client.list_hosted_zones(**params)
+    if module.params.get('all_pages'):
+        results = list_all_pages(client, module, 'list_hosted_zones', 'HostedZones', params)
+    else:
+        results = client.list_hosted_zones(**params)
     return results
 
 
@@ -305,7 +377,10 @@ def list_health_checks(client, module):
     if module.params.get('next_marker'):
         params['Marker'] = module.params.get('next_marker')
 
-    results = client.list_health_checks(**params)
+    if module.params.get('all_pages'):
+        results = list_all_pages(client, module, 'list_health_checks', 'HealthChecks', params)
+    else:
+        results = client.list_health_checks(**params)
     return results
 
 
@@ -325,7 +400,13 @@ def record_sets_details(client, module):
     elif module.params.get('type'):
         params['StartRecordType'] = module.params.get('type')
 
-    results = client.list_resource_record_sets(**params)
+    if module.params.get('max_items'):
+        params['MaxItems'] = module.params.get('max_items')
+
+    if module.params.get('all_pages'):
+        results = list_all_pages(client, module, 'list_resource_record_sets', 'ResourceRecordSets', params)
+    else:
+        results = client.list_resource_record_sets(**params)
     return results
 
 
@@ -394,6 +475,8 @@ def main():
             'count',
             'tags',
         ], default='list'),
+        all_pages=dict(type='bool', default=False),
+        max_records=dict(type='int'),
         )
     )
 
@@ -25,6 +25,8 @@ options:
   force:
     description:
       - When trying to delete a bucket, delete all keys in the bucket first (an s3 bucket must be empty for a successful deletion)
+      - Keys are removed with multi-object delete requests of up to 1000 keys, sent by a few concurrent workers. For versioned buckets all object versions and delete markers are removed.
+      - The number of deleted keys, versions and delete markers is returned as C(deleted_keys), the number of delete requests sent as C(delete_requests).
     required: false
     default: no
     choices: [ 'yes', 'no' ]
@@ -96,6 +98,8 @@ EXAMPLES = '''
     
 '''
 
+import threading
+import Queue
 import xml.etree.ElementTree as ET
 
 try:
@@ -257,11 +261,75 @@ def create_bucket(connection, module, location):
 
     module.exit_json(changed=changed, name=bucket.name, versioning=versioning_status, requester_pays=requester_pays_status, policy=current_policy, tags=current_tags_dict)
     
+# Maximum number of keys S3 accepts in a single multi-object delete request
+DELETE_BATCH_SIZE = 1000
+DELETE_WORKERS = 4
+
+def empty_bucket(bucket):
+    """Delete every key of a bucket using batched multi-object deletes.
+
+    For versioned buckets every version and delete marker is removed.
+    Returns a tuple of the number of deleted keys, the number of delete
+    requests and a list of errors.
+    """
+
+    if bucket.get_versioning_status():
+        keys = ((key.name, key.version_id) for key in bucket.list_versions())
+    else:
+        keys = (key.name for key in bucket.list())
+
+    batches = Queue.Queue(maxsize=DELETE_WORKERS * 2)
+    lock = threading.Lock()
+    counters = {'deleted': 0, 'requests': 0}
+    errors = []
+
+    def worker():
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            try:
+                result = bucket.delete_keys(batch, quiet=True)
+                failed = ['%s: %s' % (e.key, e.message) for e in result.errors]
+                deleted = len(batch) - len(failed)
+            except Exception, e:
+                # nothing of the batch is known to be deleted
+                failed = [str(e)]
+                deleted = 0
+            with lock:
+                counters['requests'] += 1
+                counters['deleted'] += deleted
+                errors.extend(failed)
+
+    threads = [threading.Thread(target=worker) for i in range(DELETE_WORKERS)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    try:
+        batch = []
+        for key in keys:
+            batch.append(key)
+            if len(batch) == DELETE_BATCH_SIZE:
+                batches.put(batch)
+                batch = []
+        if batch:
+            batches.put(batch)
+    finally:
+        for thread in threads:
+            batches.put(None)
+        for thread in threads:
+            thread.join()
+
+    return counters['deleted'], counters['requests'], errors
+
 def destroy_bucket(connection, module):
     
     force = module.params.get("force")
     name = module.params.get("name")
     changed = False
+    deleted_keys = 0
+    requests = 0
     
     try:
         bucket = connection.get_bucket(name)
@@ -275,18 +343,25 @@ def destroy_bucket(connection, module):
     if force:
         try:
             # Empty the bucket
-            for key in bucket.list():
-                key.delete()
-                
+            deleted_keys, requests, errors = empty_bucket(bucket)
         except BotoServerError, e:
             module.fail_json(msg=e.message)
+
+        if deleted_keys:
+            changed = True
+        if errors:
+            module.fail_json(msg="Failed to delete %d key(s) from bucket %s" % (len(errors), name),
+                             errors=errors[:100], deleted_keys=deleted_keys, delete_requests=requests,
+                             changed=changed)
     
     try:
         bucket = connection.delete_bucket(name)
         changed = True
     except S3ResponseError, e:
         module.fail_json(msg=e.message)
-        
+
+    if force:
+        module.exit_json(changed=changed, deleted_keys=deleted_keys, delete_requests=requests)
     module.exit_json(changed=changed)
 
 def is_fakes3(s3_url):
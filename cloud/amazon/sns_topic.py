@@ -108,14 +108,44 @@ def get_all_topics(connection):
     return [t['TopicArn'] for t in topics]
 
 
+def get_topic_map(connection):
+    # index of topic name to ARN, topic names cannot have colons
+    return dict((arn.rsplit(':', 1)[-1], arn)
+            for arn in get_all_topics(connection))
+
+
+def topic_exists(connection, arn_topic):
+    try:
+        connection.get_topic_attributes(arn_topic)
+        return True
+    except boto.exception.BotoServerError, e:
+        if e.error_code == 'NotFound':
+            return False
+        return arn_topic in get_all_topics(connection)
+
+
 def arn_topic_lookup(connection, short_topic):
     # topic names cannot have colons, so this captures the full topic name
-    all_topics = get_all_topics(connection)
+    response = connection.get_all_topics()
+    result = response['ListTopicsResponse']['ListTopicsResult']
+    topics = [t['TopicArn'] for t in result['Topics']]
     lookup_topic = ':%s' % short_topic
-    for topic in all_topics:
+    for topic in topics:
         if topic.endswith(lookup_topic):
             return topic
-    return None
+    if not topics or not result['NextToken']:
+        return None
+
+    # ARNs only differ by topic name within an account and region, so
+    # derive it from a listed topic instead of paging through all of them
+    arn_topic = '%s:%s' % (topics[0].rsplit(':', 1)[0], short_topic)
+    try:
+        connection.get_topic_attributes(arn_topic)
+        return arn_topic
+    except boto.exception.BotoServerError, e:
+        if e.error_code == 'NotFound':
+            return None
+        return get_topic_map(connection).get(short_topic)
 
 def main():
     argument_spec = ec2_argument_spec()
@@ -159,8 +189,7 @@ def main():
 
     # topics cannot contain ':', so thats the decider
     if ':' in name:
-        all_topics = get_all_topics(connection)
-        if name in all_topics:
+        if topic_exists(connection, name):
             arn_topic = name
         elif state == 'absent':
             module.exit_json(changed=False)
@@ -179,11 +208,9 @@ def main():
             
             changed=True
             topic_created = True
-            connection.create_topic(name)
-            arn_topic = arn_topic_lookup(connection, name)
-            while not arn_topic:
-                time.sleep(3)
-                arn_topic = arn_topic_lookup(connection, name)
+            response = connection.create_topic(name)
+            arn_topic = response['CreateTopicResponse']['CreateTopicResult'] \
+                    ['TopicArn']
     
     if arn_topic and state == "absent":
         if not check_mode:
@@ -230,13 +257,14 @@ def main():
 
     desired_subscriptions = [(sub['protocol'],
         canonicalize_endpoint(sub['protocol'], sub['endpoint'])) for sub in
-        subscriptions]
-    aws_subscriptions_list = []
+        subscriptions or []]
+    desired_subscriptions_set = set(desired_subscriptions)
+    aws_subscriptions_set = set()
 
     for sub in aws_subscriptions:
         sub_key = (sub['Protocol'], sub['Endpoint'])
-        aws_subscriptions_list.append(sub_key)
-        if purge_subscriptions and sub_key not in desired_subscriptions and \
+        aws_subscriptions_set.add(sub_key)
+        if purge_subscriptions and sub_key not in desired_subscriptions_set and \
                 sub['SubscriptionArn'] != 'PendingConfirmation':
             changed = True
             subscriptions_deleted.append(sub_key)
@@ -244,9 +272,9 @@ def main():
                 connection.unsubscribe(sub['SubscriptionArn'])
 
     for (protocol, endpoint) in desired_subscriptions:
-        if (protocol, endpoint) not in aws_subscriptions_list:
+        if (protocol, endpoint) not in aws_subscriptions_set:
             changed = True
-            subscriptions_added.append(sub)
+            subscriptions_added.append((protocol, endpoint))
             if not check_mode:
                 connection.subscribe(arn_topic, protocol, endpoint)
 
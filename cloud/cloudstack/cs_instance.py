@@ -376,6 +376,7 @@ instance_name:
 '''
 
 import base64
+import re
 
 try:
     from cs import CloudStack, CloudStackException, read_config
@@ -406,19 +407,54 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         self.instance = None
         self.template = None
         self.iso = None
+        self.list_cache = {}
+        self.page_size = 500
+
+
+    def _list_all(self, api, result_key, **args):
+        """Return every item of a CloudStack list API, page by page.
+
+        Responses are cached, so lookups sharing the same list call and
+        arguments only query the API once per run.
+        """
+        cache_key = (api, tuple(sorted(args.items())))
+        if cache_key not in self.list_cache:
+            items = []
+            page = 1
+            while True:
+                res = getattr(self.cs, api)(page=page, pagesize=self.page_size, **args)
+                if res and 'errortext' in res:
+                    self.module.fail_json(msg="Failed: '%s'" % res['errortext'])
+                page_items = (res or {}).get(result_key, [])
+                items.extend(page_items)
+                if len(page_items) < self.page_size:
+                    break
+                page += 1
+            self.list_cache[cache_key] = items
+        return self.list_cache[cache_key]
+
+
+    def _index(self, items, keys):
+        """Return a dict of items by the values of keys, first match wins."""
+        index = {}
+        for item in items:
+            for key in keys:
+                if item.get(key) is not None:
+                    index.setdefault(item[key], item)
+        return index
 
 
     def get_service_offering_id(self):
         service_offering = self.module.params.get('service_offering')
 
-        service_offerings = self.cs.listServiceOfferings()
+        service_offerings = self._list_all('listServiceOfferings', 'serviceoffering')
         if service_offerings:
             if not service_offering:
-                return service_offerings['serviceoffering'][0]['id']
+                return service_offerings[0]['id']
 
-            for s in service_offerings['serviceoffering']:
-                if service_offering in [ s['name'], s['id'] ]:
-                    return s['id']
+            s = self._index(service_offerings, ['name', 'id']).get(service_offering)
+            if s:
+                return s['id']
         self.module.fail_json(msg="Service offering '%s' not found" % service_offering)
 
 
@@ -441,24 +477,20 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
                 return self._get_by_key(key, self.template)
 
             args['templatefilter'] = 'executable'
-            templates = self.cs.listTemplates(**args)
-            if templates:
-                for t in templates['template']:
-                    if template in [ t['displaytext'], t['name'], t['id'] ]:
-                        self.template = t
-                        return self._get_by_key(key, self.template)
+            templates = self._list_all('listTemplates', 'template', **args)
+            self.template = self._index(templates, ['displaytext', 'name', 'id']).get(template)
+            if self.template:
+                return self._get_by_key(key, self.template)
             self.module.fail_json(msg="Template '%s' not found" % template)
 
         elif iso:
             if self.iso:
                 return self._get_by_key(key, self.iso)
             args['isofilter'] = 'executable'
-            isos = self.cs.listIsos(**args)
-            if isos:
-                for i in isos['iso']:
-                    if iso in [ i['displaytext'], i['name'], i['id'] ]:
-                        self.iso = i
-                        return self._get_by_key(key, self.iso)
+            isos = self._list_all('listIsos', 'iso', **args)
+            self.iso = self._index(isos, ['displaytext', 'name', 'id']).get(iso)
+            if self.iso:
+                return self._get_by_key(key, self.iso)
             self.module.fail_json(msg="ISO '%s' not found" % iso)
 
 
@@ -468,11 +500,10 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         if not disk_offering:
             return None
 
-        disk_offerings = self.cs.listDiskOfferings()
-        if disk_offerings:
-            for d in disk_offerings['diskoffering']:
-                if disk_offering in [ d['displaytext'], d['name'], d['id'] ]:
-                    return d['id']
+        disk_offerings = self._list_all('listDiskOfferings', 'diskoffering')
+        d = self._index(disk_offerings, ['displaytext', 'name', 'id']).get(disk_offering)
+        if d:
+            return d['id']
         self.module.fail_json(msg="Disk offering '%s' not found" % disk_offering)
 
 
@@ -485,13 +516,15 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
             args['account']     = self.get_account(key='name')
             args['domainid']    = self.get_domain(key='id')
             args['projectid']   = self.get_project(key='id')
+            # Let the API narrow down the list, keyword matches on name and
+            # display name. The exact match is done on the returned items.
+            if re.match(r'^[0-9a-f]{8}-([0-9a-f]{4}-){3}[0-9a-f]{12}$', instance_name or '', re.I):
+                args['id'] = instance_name
+            else:
+                args['keyword'] = instance_name
             # Do not pass zoneid, as the instance name must be unique across zones.
-            instances = self.cs.listVirtualMachines(**args)
-            if instances:
-                for v in instances['virtualmachine']:
-                    if instance_name in [ v['name'], v['displayname'], v['id'] ]:
-                        self.instance = v
-                        break
+            instances = self._list_all('listVirtualMachines', 'virtualmachine', **args)
+            self.instance = self._index(instances, ['name', 'displayname', 'id']).get(instance_name)
         return self.instance
 
     def get_iptonetwork_mappings(self):
@@ -522,18 +555,18 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         args['projectid']   = self.get_project(key='id')
         args['zoneid']      = self.get_zone(key='id')
 
-        networks = self.cs.listNetworks(**args)
+        networks = self._list_all('listNetworks', 'network', **args)
         if not networks:
             self.module.fail_json(msg="No networks available")
 
+        network_index = self._index(networks, ['displaytext', 'name', 'id'])
         network_ids = []
         network_displaytexts = []
         for network_name in network_names:
-            for n in networks['network']:
-                if network_name in [ n['displaytext'], n['name'], n['id'] ]:
-                    network_ids.append(n['id'])
-                    network_displaytexts.append(n['name'])
-                    break
+            n = network_index.get(network_name)
+            if n:
+                network_ids.append(n['id'])
+                network_displaytexts.append(n['name'])
 
         if len(network_ids) != len(network_names):
             self.module.fail_json(msg="Could not find all networks, networks list found: %s" % network_displaytexts)
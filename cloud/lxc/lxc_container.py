@@ -30,8 +30,8 @@ author: "Kevin Carter (@cloudnull)"
 options:
     name:
         description:
-          - Name of a container.
-        required: true
+          - Name of a container. Required unless `containers` is used.
+        required: false
     backing_store:
         choices:
           - dir
@@ -154,6 +154,22 @@ options:
           - Type of compression to use when creating an archive of a running
             container.
         default: gzip
+    archive_mode:
+        version_added: "2.1"
+        choices:
+          - copy
+          - stream
+          - incremental
+        description:
+          - How the archive is built. `copy` rsyncs the container into a
+            temporary directory and archives the copy. `stream` archives the
+            container directory, LVM snapshot or overlayfs mount directly
+            without an intermediate copy. `incremental` streams like `stream`
+            but only archives the files changed since the previous
+            incremental archive, as recorded in a manifest file stored
+            next to the archives. Every incremental run creates a new time
+            stamped archive and the first one is a full archive.
+        default: copy
     state:
         choices:
           - started
@@ -173,6 +189,24 @@ options:
         description:
           - list of 'key=value' options to use when configuring a container.
         required: false
+    containers:
+        version_added: "2.1"
+        description:
+          - List of container specifications to manage in one run. Every
+            item is a dictionary that requires `name` and may set any other
+            option of this module, options not set in an item default to
+            the values given to the module. Containers are managed
+            concurrently, items sharing the same `name` (e.g. several clones
+            of one base container) are handled one after another. Mutually
+            exclusive with `name`.
+        required: false
+    workers:
+        version_added: "2.1"
+        description:
+          - Number of containers managed concurrently when `containers` is
+            used.
+        required: false
+        default: 4
 requirements:
   - 'lxc >= 1.0 # OS package'
   - 'python >= 2.6 # OS Package'
@@ -194,6 +228,11 @@ notes:
     tarball of the running container. The "archive" option supports LVM backed
     containers and will create a snapshot of the running container when
     creating the archive.
+  - When "archive_mode" is `stream` or `incremental` LVM backed containers
+    are only frozen while their snapshot is taken, other containers remain
+    frozen while the archive is written. The `incremental` mode requires GNU
+    tar and stores its manifest as "archive_path"/NAME.snar, remove that file
+    to start over with a full archive.
   - If your distro does not have a package for "python2-lxc", which is a
     requirement for this module, it can be installed from source at
     "https://github.com/lxc/python2-lxc" or installed via pip using the package
@@ -357,6 +396,32 @@ EXAMPLES = """
     archive: true
     archive_compression: gzip
 
+- name: Create an incremental archive of a container without copying it
+  lxc_container:
+    name: test-container-lvm
+    state: frozen
+    archive: true
+    archive_mode: incremental
+    archive_path: /opt/archives
+
+- name: Build a fleet of clones from one base container in a single task
+  lxc_container:
+    backing_store: overlayfs
+    clone_snapshot: true
+    state: stopped
+    workers: 8
+    containers:
+      - name: base-container
+        clone_name: web1
+      - name: base-container
+        clone_name: web2
+      - name: db1
+        template: ubuntu
+        state: started
+        container_config:
+          - "lxc.aa_profile=unconfined"
+  register: fleet_info
+
 - name: Start a cloned container.
   lxc_container:
     name: test-container-new-archive-destroyed-clone
@@ -382,6 +447,9 @@ EXAMPLES = """
 """
 
 
+import threading
+import Queue
+
 try:
     import lxc
 except ImportError:
@@ -556,17 +624,53 @@ def create_script(command):
         os.remove(script_file)
 
 
+class LxcLvmInfo(object):
+    def __init__(self):
+        """LVM information shared by every container managed in a run.
+
+        The volume group and the list of logical volumes are only read once,
+        even when several containers are managed concurrently.
+        """
+        self.lock = threading.Lock()
+        self.vg = None
+        self.lv_list = None
+
+    def lv_created(self, lv_name):
+        """Record an lv created during the run in the cached list.
+
+        :param lv_name: Name of the logical volume.
+        :type lv_name: ``str``
+        """
+
+        with self.lock:
+            if self.lv_list is not None and lv_name not in self.lv_list:
+                self.lv_list.append(lv_name)
+
+    def lv_removed(self, lv_name):
+        """Drop an lv removed during the run from the cached list.
+
+        :param lv_name: Name of the logical volume.
+        :type lv_name: ``str``
+        """
+
+        with self.lock:
+            if self.lv_list is not None and lv_name in self.lv_list:
+                self.lv_list.remove(lv_name)
+
+
 class LxcContainerManagement(object):
-    def __init__(self, module):
+    def __init__(self, module, lvm_info=None):
         """Management of LXC containers via Ansible.
 
         :param module: Processed Ansible Module.
         :type module: ``object``
+        :param lvm_info: LVM information shared with other containers.
+        :type lvm_info: ``LxcLvmInfo``
         """
         self.module = module
         self.state = self.module.params.get('state', None)
         self.state_change = False
-        self.lxc_vg = None
+        self.lvm_info = lvm_info or LxcLvmInfo()
         self.container_name = self.module.params['name']
         self.container = self.get_container_bind()
         self.archive_info = None
@@ -922,32 +1026,88 @@ class LxcContainerManagement(object):
             self.container.attach_wait(create_script, container_command)
             self.state_change = True
 
+    def _wait_until(self, condition, deadline):
+        """Wait for ``condition`` to become true before ``deadline``.
+
+        The condition is polled with a short back off that starts at 50ms
+        and doubles up to one second.
+
+        :param condition: Callable returning True once the wait is over.
+        :type condition: ``object``
+        :param deadline: Time, as returned by time.time(), to give up at.
+        :type deadline: ``float``
+        :returns: True if the condition was met.
+        :rtype: ``bol``
+        """
+
+        delay = 0.05
+        while not condition():
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 1)
+        return True
+
+    def _wait_for_state(self, state, deadline):
+        """Wait for the container to reach ``state`` before ``deadline``.
+
+        State changes are awaited through the lxc monitor with
+        ``Container.wait``. As it only accepts whole seconds, and may return
+        early when the monitor is unavailable, the remainder is polled.
+
+        :param state: State to wait for, e.g. "running" or "stopped".
+        :type state: ``str``
+        :param deadline: Time, as returned by time.time(), to give up at.
+        :type deadline: ``float``
+        :returns: True if the container reached the state.
+        :rtype: ``bol``
+        """
+
+        remaining = int(deadline - time.time())
+        if remaining > 0 and self.container.wait(state.upper(), remaining):
+            return True
+        return self._wait_until(
+            lambda: self._get_state() == state.lower(),
+            deadline
+        )
+
     def _container_startup(self, timeout=60):
         """Ensure a container is started.
 
-        :param timeout: Time before the destroy operation is abandoned.
+        The container is only started again when lxc reports that starting
+        it failed.
+
+        :param timeout: Time before the start operation is abandoned.
         :type timeout: ``int``
         """
 
+        deadline = time.time() + timeout
         self.container = self.get_container_bind()
-        for _ in xrange(timeout):
-            if self._get_state() != 'running':
-                self.container.start()
-                self.state_change = True
-                # post startup sleep for 1 second.
-                time.sleep(1)
-            else:
-                return True
+        delay = 0.05
+        while self._get_state() != 'running':
+            self.state_change = True
+            if self.container.start():
+                if self._wait_for_state('running', deadline):
+                    return True
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 1)
         else:
-            self.failure(
-                lxc_container=self._container_data(),
-                error='Failed to start container'
-                      ' [ %s ]' % self.container_name,
-                rc=1,
-                msg='The container [ %s ] failed to start. Check to lxc is'
-                    ' available and that the container is in a functional'
-                    ' state.' % self.container_name
-            )
+            return True
+
+        self.failure(
+            lxc_container=self._container_data(),
+            error='Failed to start container'
+                  ' [ %s ]' % self.container_name,
+            rc=1,
+            msg='The container [ %s ] failed to start. Check to lxc is'
+                ' available and that the container is in a functional'
+                ' state.' % self.container_name
+        )
 
     def _check_archive(self):
         """Create a compressed archive of a container.
@@ -956,9 +1116,15 @@ class LxcContainerManagement(object):
         """
 
         if self.module.params.get('archive') in BOOLEANS_TRUE:
-            self.archive_info = {
-                'archive': self._container_create_tar()
-            }
+            archive_mode = self.module.params.get('archive_mode')
+            if archive_mode == 'copy':
+                self.archive_info = {
+                    'archive': self._container_create_tar()
+                }
+            else:
+                self.archive_info = self._container_stream_tar(
+                    incremental=archive_mode == 'incremental'
+                )
 
     def _check_clone(self):
         """Create a compressed archive of a container.
@@ -984,26 +1150,33 @@ class LxcContainerManagement(object):
         :type timeout: ``int``
         """
 
-        for _ in xrange(timeout):
-            if not self._container_exists(container_name=self.container_name):
-                break
+        if not self._container_exists(container_name=self.container_name):
+            return
 
-            # Check if the container needs to have an archive created.
-            self._check_archive()
+        deadline = time.time() + timeout
 
-            # Check if the container is to be cloned
-            self._check_clone()
+        # Check if the container needs to have an archive created.
+        self._check_archive()
 
-            if self._get_state() != 'stopped':
-                self.state_change = True
-                self.container.stop()
+        # Check if the container is to be cloned
+        self._check_clone()
 
-            if self.container.destroy():
-                self.state_change = True
+        # Stop and destroy only once, then wait for the container to go.
+        stopped = True
+        if self._get_state() != 'stopped':
+            self.state_change = True
+            self.container.stop()
+            stopped = self._wait_for_state('stopped', deadline)
 
-            # post destroy attempt sleep for 1 second.
-            time.sleep(1)
-        else:
+        if stopped and self.container.destroy():
+            self.state_change = True
+
+        def _gone():
+            return not self._container_exists(
+                container_name=self.container_name
+            )
+
+        if not stopped or not self._wait_until(_gone, deadline):
             self.failure(
                 lxc_container=self._container_data(),
                 error='Failed to destroy container'
@@ -1070,6 +1243,7 @@ class LxcContainerManagement(object):
             if self._get_state() != 'stopped':
                 self.container.stop()
                 self.state_change = True
+                self._wait_for_state('stopped', time.time() + 60)
 
             # Run container startup
             self._container_startup()
@@ -1160,6 +1334,14 @@ class LxcContainerManagement(object):
     def _get_lxc_vg(self):
         """Return the name of the Volume Group used in LXC."""
 
+        with self.lvm_info.lock:
+            if self.lvm_info.vg is None:
+                self.lvm_info.vg = self._read_lxc_vg()
+            return self.lvm_info.vg
+
+    def _read_lxc_vg(self):
+        """Read the name of the Volume Group used in LXC from lxc-config."""
+
         build_command = [
             self.module.get_bin_path('lxc-config', True),
             "lxc.bdev.lvm.vg"
@@ -1176,9 +1358,24 @@ class LxcContainerManagement(object):
             return str(vg.strip())
 
     def _lvm_lv_list(self):
-        """Return a list of all lv in a current vg."""
+        """Return a list of all lv in a current vg.
+
+        The list is read once and shared by every container of the run.
+        """
 
         vg = self._get_lxc_vg()
+        with self.lvm_info.lock:
+            if self.lvm_info.lv_list is None:
+                self.lvm_info.lv_list = self._read_lvm_lv_list(vg)
+            return list(self.lvm_info.lv_list)
+
+    def _read_lvm_lv_list(self, vg):
+        """Read the list of all lv in ``vg`` from lvs.
+
+        :param vg: Name of the volume group.
+        :type vg: ``str``
+        """
+
         build_command = [
             self.module.get_bin_path('lvs', True)
         ]
@@ -1297,6 +1494,7 @@ class LxcContainerManagement(object):
                 msg='Failed to Create LVM snapshot %s/%s --> %s'
                     % (vg, source_lv, snapshot_name)
             )
+        self.lvm_info.lv_created(snapshot_name)
 
     def _lvm_lv_mount(self, lv_name, mount_point):
         """mount an lv.
@@ -1323,11 +1521,16 @@ class LxcContainerManagement(object):
                     % (vg, lv_name, mount_point)
             )
 
-    def _create_tar(self, source_dir):
+    def _create_tar(self, source_dir, archive_name=None, tar_options=None):
         """Create an archive of a given ``source_dir`` to ``output_path``.
 
         :param source_dir:  Path to the directory to be archived.
         :type source_dir: ``str``
+        :param archive_name: Base name of the archive, without extension.
+                             Defaults to the container name.
+        :type archive_name: ``str``
+        :param tar_options: Additional options passed to tar.
+        :type tar_options: ``list``
         """
 
         archive_path = self.module.params.get('archive_path')
@@ -1341,7 +1544,7 @@ class LxcContainerManagement(object):
         archive_name = '%s.%s' % (
             os.path.join(
                 archive_path,
-                self.container_name
+                archive_name or self.container_name
             ),
             compression_type['extension']
         )
@@ -1350,11 +1553,15 @@ class LxcContainerManagement(object):
             self.module.get_bin_path('tar', True),
             '--directory=%s' % os.path.realpath(
                 os.path.expanduser(source_dir)
-            ),
+            )
+        ]
+        if tar_options:
+            build_command.extend(tar_options)
+        build_command.extend([
             compression_type['argument'],
             archive_name,
             '.'
-        ]
+        ])
 
         rc, stdout, err = self._run_command(
             build_command=build_command,
@@ -1391,6 +1598,7 @@ class LxcContainerManagement(object):
                 msg='Failed to remove LVM LV %s/%s' % (vg, lv_name),
                 command=' '.join(build_command)
             )
+        self.lvm_info.lv_removed(lv_name)
 
     def _rsync_data(self, container_path, temp_dir):
         """Sync the container directory to the temp directory.
@@ -1572,15 +1780,244 @@ class LxcContainerManagement(object):
                 self._lvm_lv_remove(snapshot_name)
 
             # Restore original state of container
-            if container_state == 'running':
-                if self._get_state() == 'frozen':
-                    self.container.unfreeze()
-                else:
-                    self.container.start()
+            self._restore_archive_state(container_state)
 
             # Remove tmpdir
             shutil.rmtree(temp_dir)
 
+    def _restore_archive_state(self, container_state):
+        """Return a container to the state it had before being archived.
+
+        :param container_state: State of the container prior to archiving.
+        :type container_state: ``str``
+        """
+
+        if container_state == 'running':
+            if self._get_state() == 'frozen':
+                self.container.unfreeze()
+            else:
+                self.container.start()
+
+    def _stage_container_dir(self, container_dir, stage_dir):
+        """Copy the container configuration into a staging directory.
+
+        Everything except the rootfs is copied, these are only a few small
+        configuration files. The rootfs is mounted into the staging
+        directory by the caller.
+
+        :param container_dir: path to the container directory
+        :type container_dir: ``str``
+        :param stage_dir: path to the staging directory
+        :type stage_dir: ``str``
+        """
+
+        if os.path.isdir(stage_dir):
+            shutil.rmtree(stage_dir)
+        os.makedirs(os.path.join(stage_dir, 'rootfs'))
+        for entry in os.listdir(container_dir):
+            if entry == 'rootfs':
+                continue
+            source = os.path.join(container_dir, entry)
+            if os.path.isdir(source) and not os.path.islink(source):
+                shutil.copytree(
+                    source, os.path.join(stage_dir, entry), symlinks=True
+                )
+            else:
+                shutil.copy2(source, os.path.join(stage_dir, entry))
+
+    def _bind_mount(self, source_dir, mount_point):
+        """Bind mount a directory.
+
+        :param source_dir: path of the directory to bind mount
+        :type source_dir: ``str``
+        :param mount_point: path on the file system that is mounted.
+        :type mount_point: ``str``
+        """
+
+        build_command = [
+            self.module.get_bin_path('mount', True),
+            '--bind',
+            source_dir,
+            mount_point,
+        ]
+        rc, stdout, err = self._run_command(build_command)
+        if rc != 0:
+            self.failure(
+                err=err,
+                rc=rc,
+                msg='failed to bind mount %s to %s' % (source_dir, mount_point),
+                command=' '.join(build_command)
+            )
+
+    def _container_stream_tar(self, incremental=False):
+        """Stream an LXC container directly into a tar archive.
+
+        Unlike ``_container_create_tar`` no copy of the container is made.
+        The process is as follows:
+            * Stop or Freeze the container
+            * If LVM backed:
+                * Create LVM snapshot of LV backing the container
+                * Mount the snapshot and restore the state of the container
+            * If overlayfs backed mount the layers
+            * Create tar of the container directory or mount point
+            * Restore the state of the container
+            * Clean up
+
+        Everything but the standard dir backed layout is archived from a
+        staging directory at a fixed location so that the paths recorded in
+        the incremental manifest stay the same between runs.
+
+        :param incremental: Only archive files changed since the previous
+                            incremental archive.
+        :type incremental: ``bol``
+        :returns: archive information
+        :rtype: ``dict``
+        """
+
+        container_dir = os.path.dirname(self.container.config_file_name)
+        stage_dir = os.path.join(
+            tempfile.gettempdir(), '%s_lxc_archive' % self.container_name
+        )
+        mount_point = os.path.join(stage_dir, 'rootfs')
+
+        # LXC container rootfs
+        lxc_rootfs = self.container.get_config_item('lxc.rootfs')
+
+        # Test if the containers rootfs is a block device
+        block_backed = lxc_rootfs.startswith(os.path.join(os.sep, 'dev'))
+
+        # Test if the container is using overlayfs
+        overlayfs_backed = lxc_rootfs.startswith('overlayfs')
+
+        # Test if the rootfs lives inside of the container directory
+        in_place = not (block_backed or overlayfs_backed) and \
+            os.path.realpath(lxc_rootfs) == os.path.realpath(
+                os.path.join(container_dir, 'rootfs')
+            )
+
+        if os.path.ismount(mount_point):
+            self.failure(
+                err='[ %s ] is already mounted' % mount_point,
+                rc=1,
+                msg='The staging mount point [ %s ] is still mounted from a'
+                    ' previous archive run. Please unmount it before'
+                    ' continuing.' % mount_point
+            )
+
+        # Set the snapshot name if needed
+        snapshot_name = '%s_lxc_snapshot' % self.container_name
+        if block_backed and snapshot_name in self._lvm_lv_list():
+            self.failure(
+                err='snapshot [ %s ] already exists' % snapshot_name,
+                rc=1,
+                msg='The snapshot [ %s ] already exists. Please clean'
+                    ' up old snapshot of containers before continuing.'
+                    % snapshot_name
+            )
+
+        archive_path = self.module.params.get('archive_path')
+        archive_name = self.container_name
+        tar_options = []
+        manifest = None
+        if incremental:
+            if not os.path.isdir(archive_path):
+                os.makedirs(archive_path)
+            manifest = os.path.join(
+                archive_path, '%s.snar' % self.container_name
+            )
+            archive_name = '%s-%s' % (
+                self.container_name, time.strftime('%Y%m%d%H%M%S')
+            )
+            # Work on a copy of the manifest so that a failed run does not
+            # record files which never made it into an archive.
+            if os.path.exists(manifest):
+                shutil.copy2(manifest, '%s.tmp' % manifest)
+            tar_options.extend([
+                '--listed-incremental=%s.tmp' % manifest,
+                '--no-check-device'
+            ])
+
+        container_state = self._get_state()
+        mounted = False
+        snapshot_created = False
+        try:
+            # Ensure the original container is stopped or frozen
+            if container_state not in ['stopped', 'frozen']:
+                if container_state == 'running':
+                    self.container.freeze()
+                else:
+                    self.container.stop()
+
+            if in_place:
+                source_dir = container_dir
+            else:
+                source_dir = stage_dir
+                self._stage_container_dir(container_dir, stage_dir)
+                if block_backed:
+                    # Take snapshot
+                    size, measurement = self._get_lv_size(
+                        lv_name=self.container_name
+                    )
+                    self._lvm_snapshot_create(
+                        source_lv=self.container_name,
+                        snapshot_name=snapshot_name,
+                        snapshot_size_gb=size
+                    )
+                    snapshot_created = True
+
+                    # Mount snapshot
+                    self._lvm_lv_mount(
+                        lv_name=snapshot_name,
+                        mount_point=mount_point
+                    )
+                    mounted = True
+
+                    # The snapshot is consistent, the container can resume.
+                    self._restore_archive_state(container_state)
+                    container_state = None
+                elif overlayfs_backed:
+                    lowerdir, upperdir = lxc_rootfs.split(':')[1:]
+                    self._overlayfs_mount(
+                        lowerdir=lowerdir,
+                        upperdir=upperdir,
+                        mount_point=mount_point
+                    )
+                    mounted = True
+                else:
+                    self._bind_mount(lxc_rootfs, mount_point)
+                    mounted = True
+
+            # Set the state as changed and set a new fact
+            self.state_change = True
+            archive_info = {
+                'archive': self._create_tar(
+                    source_dir=source_dir,
+                    archive_name=archive_name,
+                    tar_options=tar_options
+                )
+            }
+            if manifest:
+                os.rename('%s.tmp' % manifest, manifest)
+                archive_info['archive_manifest'] = manifest
+            return archive_info
+        finally:
+            if mounted:
+                # unmount snapshot
+                self._unmount(mount_point)
+
+            if snapshot_created:
+                # Remove snapshot
+                self._lvm_lv_remove(snapshot_name)
+
+            # Restore original state of container
+            self._restore_archive_state(container_state)
+
+            if manifest and os.path.exists('%s.tmp' % manifest):
+                os.remove('%s.tmp' % manifest)
+
+            if not in_place and os.path.isdir(stage_dir):
+                shutil.rmtree(stage_dir)
+
     def check_count(self, count, method):
         if count > 1:
             self.failure(
@@ -1620,14 +2057,156 @@ class LxcContainerManagement(object):
         )
 
 
+class LxcBatchExit(Exception):
+    """Raised instead of exiting when a container of a batch is done."""
+
+    def __init__(self, result):
+        Exception.__init__(self, result.get('msg'))
+        self.result = result
+
+
+class LxcBatchModule(object):
+    def __init__(self, module, params):
+        """Per container view of the Ansible module used in batch mode.
+
+        Everything but the parameters is taken from the real module, exiting
+        raises ``LxcBatchExit`` so that the other containers carry on.
+
+        :param module: Processed Ansible Module.
+        :type module: ``object``
+        :param params: Parameters of a single container.
+        :type params: ``dict``
+        """
+        self.module = module
+        self.params = params
+
+    def __getattr__(self, name):
+        return getattr(self.module, name)
+
+    def exit_json(self, **kwargs):
+        raise LxcBatchExit(kwargs)
+
+    def fail_json(self, **kwargs):
+        kwargs['failed'] = True
+        raise LxcBatchExit(kwargs)
+
+
+def _batch_params(module, spec):
+    """Return the module parameters for a single item of ``containers``.
+
+    :param module: Processed Ansible Module.
+    :type module: ``object``
+    :param spec: Item of the containers list.
+    :type spec: ``dict``
+    :returns: parameters, or an error message.
+    :rtype: ``tuple``
+    """
+
+    if not isinstance(spec, dict) or not spec.get('name'):
+        return None, 'every item of containers requires a name'
+
+    params = dict(module.params)
+    for key, value in spec.items():
+        option = module.argument_spec.get(key)
+        if option is None or key in ['containers', 'workers']:
+            return None, 'unsupported option [ %s ] for container [ %s ]' % (
+                key, spec['name']
+            )
+        if option.get('type') == 'str' and value is not None and \
+                not isinstance(value, basestring):
+            value = str(value)
+        choices = option.get('choices')
+        if choices and value not in choices:
+            return None, 'value of %s must be one of: %s, got: %s' % (
+                key, ', '.join([str(i) for i in choices]), value
+            )
+        params[key] = value
+
+    if not spec.get('lv_name'):
+        params['lv_name'] = params['name']
+    return params, None
+
+
+def run_batch(module):
+    """Manage every container of ``containers`` concurrently.
+
+    :param module: Processed Ansible Module.
+    :type module: ``object``
+    """
+
+    groups = []
+    group_index = {}
+    keys = set()
+    for spec in module.params['containers']:
+        params, error = _batch_params(module, spec)
+        if error:
+            module.fail_json(msg=error)
+
+        key = params.get('clone_name') or params['name']
+        if key in keys:
+            module.fail_json(
+                msg='container [ %s ] is listed more than once' % key
+            )
+        keys.add(key)
+
+        # Containers sharing a name are handled by the same worker so that
+        # clones of one base container do not fight over its state.
+        if params['name'] not in group_index:
+            group_index[params['name']] = len(groups)
+            groups.append([])
+        groups[group_index[params['name']]].append((key, params))
+
+    pending = Queue.Queue()
+    for group in groups:
+        pending.put(group)
+
+    lvm_info = LxcLvmInfo()
+    results = {}
+
+    def worker():
+        while True:
+            try:
+                group = pending.get_nowait()
+            except Queue.Empty:
+                return
+            for key, params in group:
+                try:
+                    LxcContainerManagement(
+                        module=LxcBatchModule(module, params),
+                        lvm_info=lvm_info
+                    ).run()
+                except LxcBatchExit, e:
+                    results[key] = e.result
+                except Exception, e:
+                    results[key] = {'failed': True, 'msg': str(e)}
+
+    workers = max(1, min(module.params['workers'], len(groups)))
+    threads = [threading.Thread(target=worker) for _ in xrange(workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    changed = any([i.get('changed') for i in results.values()])
+    failed = sorted([k for k, v in results.items() if v.get('failed')])
+    if failed:
+        module.fail_json(
+            msg='Failed to manage containers [ %s ]' % ', '.join(failed),
+            changed=changed,
+            containers=results
+        )
+
+    module.exit_json(changed=changed, containers=results)
+
+
 def main():
     """Ansible Main module."""
 
     module = AnsibleModule(
         argument_spec=dict(
             name=dict(
-                type='str',
-                required=True
+                type='str'
             ),
             template=dict(
                 type='str',
@@ -1709,8 +2288,21 @@ def main():
             archive_compression=dict(
                 choices=LXC_COMPRESSION_MAP.keys(),
                 default='gzip'
+            ),
+            archive_mode=dict(
+                choices=['copy', 'stream', 'incremental'],
+                default='copy'
+            ),
+            containers=dict(
+                type='list'
+            ),
+            workers=dict(
+                type='int',
+                default=4
             )
         ),
+        required_one_of=[['name', 'containers']],
+        mutually_exclusive=[['name', 'containers']],
         supports_check_mode=False,
     )
 
@@ -1719,6 +2311,9 @@ def main():
             msg='The `lxc` module is not importable. Check the requirements.'
         )
 
+    if module.params.get('containers'):
+        run_batch(module)
+
     lv_name = module.params.get('lv_name')
     if not lv_name:
         module.params['lv_name'] = module.params.get('name')
@@ -22,6 +22,7 @@ short_description: Perform common tasks in Nagios related to downtime and notifi
 description:
   - "The M(nagios) module has two basic functions: scheduling downtime and toggling alerts for services or hosts."
   - All actions require the I(host) parameter to be given explicitly. In playbooks you can use the C({{inventory_hostname}}) variable to refer to the host the playbook is currently running on.
+  - Several hosts may be given at once by separating them with commas, e.g., C(host=web1,web2,web3). All commands generated for them are written to the command file in one go.
   - You can specify multiple services at once by separating them with commas, .e.g., C(services=httpd,nfs,puppet).
   - When specifying what service to handle there is a special service value, I(host), which will handle alerts/downtime for the I(host itself), e.g., C(service=host). This keyword may not be given with other services at the same time. I(Setting alerts/downtime for a host does not affect alerts/downtime for any of the services running on it.) To schedule downtime for all services on particular host use keyword "all", e.g., C(service=all).
   - When using the M(nagios) module you will need to specify your Nagios server using the C(delegate_to) parameter.
@@ -37,7 +38,23 @@ options:
                "servicegroup_host_downtime" ]
   host:
     description:
-      - Host to operate on in Nagios.
+      - Host to operate on in Nagios. Separate multiple hosts with commas.
+    required: false
+    default: null
+  hostgroup:
+    version_added: "2.1"
+    description:
+      - Hostgroup to operate on in Nagios instead of I(host). Separate multiple hostgroups with commas.
+        Usable with the C(downtime), C(enable_alerts), C(disable_alerts), C(silence) and C(unsilence) actions,
+        where I(service) must be C(host) or C(all).
+    required: false
+    default: null
+  livestatus:
+    version_added: "2.1"
+    description:
+      - Submit the commands through this MK Livestatus socket, either the path of a UNIX socket or C(host:port),
+        instead of the command file. Downtimes and notification changes for hosts and services are verified
+        with a single query afterwards.
     required: false
     default: null
   cmdfile:
@@ -118,6 +135,15 @@ EXAMPLES = '''
 # disable HOST alerts
 - nagios: action=disable_alerts service=host host={{ inventory_hostname }}
 
+# schedule an hour of HOST downtime for many hosts at once
+- nagios: action=downtime minutes=60 service=host host={{ groups['web'] | join(',') }}
+
+# schedule downtime for all services of every host in a hostgroup
+- nagios: action=downtime minutes=30 service=all hostgroup=webservers
+
+# schedule downtime through livestatus and verify it was registered
+- nagios: action=downtime minutes=30 service=host host={{ inventory_hostname }} livestatus=/var/lib/nagios/rw/live
+
 # silence ALL alerts
 - nagios: action=silence host={{ inventory_hostname }}
 
@@ -138,6 +164,17 @@ import ConfigParser
 import types
 import time
 import os.path
+import select
+import socket
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+# writes up to this size are atomic on a pipe, POSIX guarantees 512 bytes
+# and select only exposes the real value from python 2.7 on
+PIPE_BUF = getattr(select, 'PIPE_BUF', 512)
 
 ######################################################################
 
@@ -199,6 +236,8 @@ def main():
             author=dict(default='Ansible'),
             comment=dict(default='Scheduling downtime'),
             host=dict(required=False, default=None),
+            hostgroup=dict(required=False, default=None),
+            livestatus=dict(required=False, default=None),
             servicegroup=dict(required=False, default=None),
             minutes=dict(default=30),
             cmdfile=dict(default=which_cmdfile()),
@@ -209,6 +248,8 @@ def main():
 
     action = module.params['action']
     host = module.params['host']
+    hostgroup = module.params['hostgroup']
+    livestatus = module.params['livestatus']
     servicegroup = module.params['servicegroup']
     minutes = module.params['minutes']
     services = module.params['services']
@@ -227,8 +268,15 @@ def main():
 
     ##################################################################
     if action not in ['command', 'silence_nagios', 'unsilence_nagios']:
-        if not host:
+        if not host and not hostgroup:
             module.fail_json(msg='no host specified for action requiring one')
+        if host and hostgroup:
+            module.fail_json(msg='host and hostgroup are mutually exclusive')
+    if hostgroup:
+        if action not in ['downtime', 'enable_alerts', 'disable_alerts', 'silence', 'unsilence']:
+            module.fail_json(msg='hostgroup is not supported by the %s action' % action)
+        if action not in ['silence', 'unsilence'] and services not in ['host', 'all']:
+            module.fail_json(msg='service must be host or all when using hostgroup')
     ######################################################################
     if action == 'downtime':
         # Make sure there's an actual service selected
@@ -265,8 +313,8 @@ def main():
         if not command:
             module.fail_json(msg='no command passed for command action')
     ##################################################################
-    if not cmdfile:
-        module.fail_json('unable to locate nagios.cfg')
+    if not cmdfile and not livestatus:
+        module.fail_json(msg='unable to locate nagios.cfg')
 
     ##################################################################
     ansible_nagios = Nagios(module, **module.params)
@@ -299,6 +347,8 @@ class Nagios(object):
         self.author = kwargs['author']
         self.comment = kwargs['comment']
         self.host = kwargs['host']
+        self.hostgroup = kwargs.get('hostgroup')
+        self.livestatus = kwargs.get('livestatus')
         self.servicegroup = kwargs['servicegroup']
         self.minutes = int(kwargs['minutes'])
         self.cmdfile = kwargs['cmdfile']
@@ -309,7 +359,18 @@ class Nagios(object):
         else:
             self.services = kwargs['services'].split(',')
 
+        if self.host:
+            self.hosts = self.host.split(',')
+        else:
+            self.hosts = []
+
+        if self.hostgroup:
+            self.hostgroups = self.hostgroup.split(',')
+        else:
+            self.hostgroups = []
+
         self.command_results = []
+        self.pending_commands = []
 
     def _now(self):
         """
@@ -320,18 +381,129 @@ class Nagios(object):
 
     def _write_command(self, cmd):
         """
-        Write the given command to the Nagios command file
+        Queue the given command, all queued commands are written at once
+        by _flush_commands
         """
 
+        self.pending_commands.append(cmd)
+        self.command_results.append(cmd.strip())
+        return True
+
+    def _flush_commands(self):
+        """
+        Write all queued commands to the Nagios command file, opening
+        it only once. Every write holds whole lines and stays within
+        PIPE_BUF so that it can not interleave with other writers.
+        """
+
+        if self.livestatus:
+            return self._submit_livestatus()
+
+        chunks = []
+        for cmd in self.pending_commands:
+            if chunks and len(chunks[-1]) + len(cmd) <= PIPE_BUF:
+                chunks[-1] += cmd
+            else:
+                chunks.append(cmd)
+
         try:
-            fp = open(self.cmdfile, 'w')
-            fp.write(cmd)
-            fp.flush()
-            fp.close()
-            self.command_results.append(cmd.strip())
-        except IOError:
+            fd = os.open(self.cmdfile, os.O_WRONLY)
+            try:
+                for chunk in chunks:
+                    while chunk:
+                        chunk = chunk[os.write(fd, chunk):]
+            finally:
+                os.close(fd)
+        except (IOError, OSError):
             self.module.fail_json(msg='unable to write to nagios command file',
                                   cmdfile=self.cmdfile)
+        self.pending_commands = []
+
+    def _livestatus_query(self, query):
+        """
+        Send a request to the livestatus socket and return the response
+        """
+
+        if ':' in self.livestatus and not self.livestatus.startswith('/'):
+            address, port = self.livestatus.rsplit(':', 1)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            target = (address, int(port))
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            target = self.livestatus
+
+        try:
+            sock.connect(target)
+            sock.sendall(query)
+            sock.shutdown(socket.SHUT_WR)
+            response = []
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                response.append(data)
+        finally:
+            sock.close()
+        return ''.join(response)
+
+    def _submit_livestatus(self):
+        """
+        Submit all queued commands in a single livestatus connection and
+        verify their effect with one query per table involved. Livestatus
+        hands commands to the core synchronously, so no polling is needed.
+        """
+
+        request = ''.join('COMMAND %s\n\n' % cmd.strip()
+                          for cmd in self.pending_commands)
+        try:
+            self._livestatus_query(request)
+        except (socket.error, ValueError), e:
+            self.module.fail_json(msg='unable to submit commands to livestatus: %s' % e,
+                                  livestatus=self.livestatus)
+        self.pending_commands = []
+
+        expected = {'downtimes': [], 'hosts': [], 'services': []}
+        for cmd in self.command_results:
+            fields = cmd.split(' ', 1)[-1].split(';')
+            name = fields[0]
+            if name == 'SCHEDULE_HOST_DOWNTIME':
+                expected['downtimes'].append((fields[1], ''))
+            elif name == 'SCHEDULE_SVC_DOWNTIME':
+                expected['downtimes'].append((fields[1], fields[2]))
+            elif name in ['ENABLE_HOST_NOTIFICATIONS', 'DISABLE_HOST_NOTIFICATIONS']:
+                expected['hosts'].append(((fields[1],), int(name.startswith('ENABLE'))))
+            elif name in ['ENABLE_SVC_NOTIFICATIONS', 'DISABLE_SVC_NOTIFICATIONS']:
+                expected['services'].append(((fields[1], fields[2]), int(name.startswith('ENABLE'))))
+
+        queries = {
+            'downtimes': 'GET downtimes\nColumns: host_name service_description\n'
+                         'Filter: author = %s\nFilter: comment = %s\n' % (self.author, self.comment),
+            'hosts': 'GET hosts\nColumns: name notifications_enabled\n',
+            'services': 'GET services\nColumns: host_name description notifications_enabled\n',
+        }
+
+        failed = []
+        for table, items in expected.iteritems():
+            if not items:
+                continue
+            try:
+                rows = json.loads(self._livestatus_query(
+                    queries[table] + 'OutputFormat: json\n\n'))
+            except (socket.error, ValueError), e:
+                self.module.fail_json(msg='unable to verify commands with livestatus: %s' % e,
+                                      livestatus=self.livestatus)
+            if table == 'downtimes':
+                present = set((row[0], row[1]) for row in rows)
+                failed.extend(';'.join(filter(None, item)) for item in items
+                              if item not in present)
+            else:
+                state = dict((tuple(row[:-1]), row[-1]) for row in rows)
+                failed.extend(';'.join(key) for key, value in items
+                              if state.get(key) != value)
+
+        if failed:
+            self.module.fail_json(msg='livestatus did not apply the commands for: %s' % ', '.join(failed),
+                                  nagios_commands=self.command_results)
 
     def _fmt_dt_str(self, cmd, host, duration, author=None,
                     comment=None, start=None,
@@ -883,14 +1055,20 @@ class Nagios(object):
         """
         # host or service downtime?
         if self.action == 'downtime':
-            if self.services == 'host':
-                self.schedule_host_downtime(self.host, self.minutes)
-            elif self.services == 'all':
-                self.schedule_host_svc_downtime(self.host, self.minutes)
-            else:
-                self.schedule_svc_downtime(self.host,
-                                           services=self.services,
-                                           minutes=self.minutes)
+            for hostgroup in self.hostgroups:
+                if self.services == 'host':
+                    self.schedule_hostgroup_host_downtime(hostgroup, self.minutes)
+                else:
+                    self.schedule_hostgroup_svc_downtime(hostgroup, self.minutes)
+            for host in self.hosts:
+                if self.services == 'host':
+                    self.schedule_host_downtime(host, self.minutes)
+                elif self.services == 'all':
+                    self.schedule_host_svc_downtime(host, self.minutes)
+                else:
+                    self.schedule_svc_downtime(host,
+                                               services=self.services,
+                                               minutes=self.minutes)
         elif self.action == "servicegroup_host_downtime":
             if self.servicegroup:
                 self.schedule_servicegroup_host_downtime(servicegroup = self.servicegroup, minutes = self.minutes)
@@ -900,29 +1078,49 @@ class Nagios(object):
 
         # toggle the host AND service alerts
         elif self.action == 'silence':
-            self.silence_host(self.host)
+            for hostgroup in self.hostgroups:
+                self.disable_hostgroup_svc_notifications(hostgroup)
+                self.disable_hostgroup_host_notifications(hostgroup)
+            for host in self.hosts:
+                self.silence_host(host)
 
         elif self.action == 'unsilence':
-            self.unsilence_host(self.host)
+            for hostgroup in self.hostgroups:
+                self.enable_hostgroup_svc_notifications(hostgroup)
+                self.enable_hostgroup_host_notifications(hostgroup)
+            for host in self.hosts:
+                self.unsilence_host(host)
 
         # toggle host/svc alerts
         elif self.action == 'enable_alerts':
-            if self.services == 'host':
-                self.enable_host_notifications(self.host)
-            elif self.services == 'all':
-                self.enable_host_svc_notifications(self.host)
-            else:
-                self.enable_svc_notifications(self.host,
-                                              services=self.services)
+            for hostgroup in self.hostgroups:
+                if self.services == 'host':
+                    self.enable_hostgroup_host_notifications(hostgroup)
+                else:
+                    self.enable_hostgroup_svc_notifications(hostgroup)
+            for host in self.hosts:
+                if self.services == 'host':
+                    self.enable_host_notifications(host)
+                elif self.services == 'all':
+                    self.enable_host_svc_notifications(host)
+                else:
+                    self.enable_svc_notifications(host,
+                                                  services=self.services)
 
         elif self.action == 'disable_alerts':
-            if self.services == 'host':
-                self.disable_host_notifications(self.host)
-            elif self.services == 'all':
-                self.disable_host_svc_notifications(self.host)
-            else:
-                self.disable_svc_notifications(self.host,
-                                               services=self.services)
+            for hostgroup in self.hostgroups:
+                if self.services == 'host':
+                    self.disable_hostgroup_host_notifications(hostgroup)
+                else:
+                    self.disable_hostgroup_svc_notifications(hostgroup)
+            for host in self.hosts:
+                if self.services == 'host':
+                    self.disable_host_notifications(host)
+                elif self.services == 'all':
+                    self.disable_host_svc_notifications(host)
+                else:
+                    self.disable_svc_notifications(host,
+                                                   services=self.services)
         elif self.action == 'silence_nagios':
             self.silence_nagios()
 
@@ -937,6 +1135,8 @@ class Nagios(object):
             self.module.fail_json(msg="unknown action specified: '%s'" % \
                                       self.action)
 
+        self._flush_commands()
+
         self.module.exit_json(nagios_commands=self.command_results,
                               changed=True)
 
@@ -51,7 +51,21 @@ options:
         description:
             - Name of the host in Zabbix.
             - host_name is the unique identifier used and cannot be updated using this module.
-        required: true
+            - Required unless I(hosts) is given.
+        required: false
+    hosts:
+        description:
+            - List of hosts to create, update or delete in bulk instead of the single I(host_name).
+            - Each entry is a dict with a C(host_name) key and optionally C(host_groups), C(link_templates),
+              C(status), C(interfaces) and C(proxy), which default to the module options of the same name.
+            - Groups, templates and proxies of all hosts are resolved with one request each, the existing hosts
+              are read with a single C(host.get) and all new hosts are created with one C(host.create) call.
+              Updated hosts sharing the same groups, templates, status and proxy are changed with one
+              C(host.massupdate) call.
+            - With I(force=no) hosts that already exist are left untouched.
+        required: false
+        default: null
+        version_added: "2.1"
     host_groups:
         description:
             - List of host groups the host is part of.
@@ -130,6 +144,25 @@ EXAMPLES = '''
         dns: ""
         port: 12345
     proxy: a.zabbix.proxy
+
+- name: Enroll a batch of hosts with a few API calls
+  local_action:
+    module: zabbix_host
+    server_url: http://monitor.example.com
+    login_user: username
+    login_password: password
+    host_groups:
+      - Example group1
+    link_templates:
+      - Example template1
+    hosts:
+      - host_name: ExampleHost1
+        interfaces:
+          - {type: 1, main: 1, useip: 1, ip: 10.xx.xx.1, dns: "", port: 10050}
+      - host_name: ExampleHost2
+        proxy: a.zabbix.proxy
+        interfaces:
+          - {type: 1, main: 1, useip: 1, ip: 10.xx.xx.2, dns: "", port: 10050}
 '''
 
 import logging
@@ -159,6 +192,24 @@ class Host(object):
     def __init__(self, module, zbx):
         self._module = module
         self._zapi = zbx
+        # names already resolved to ids, per object type
+        self._resolved = {'hostgroup': {}, 'template': {}, 'proxy': {}}
+
+    # resolve names of groups, templates or proxies to ids with one get for all names not cached yet
+    def resolve_ids(self, object_type, names):
+        cache = self._resolved[object_type]
+        name_key = 'name' if object_type == 'hostgroup' else 'host'
+        id_key = {'hostgroup': 'groupid', 'template': 'templateid', 'proxy': 'proxyid'}[object_type]
+        missing = list(set(names) - set(cache))
+        if missing:
+            api = getattr(self._zapi, object_type)
+            for obj in api.get({'output': [id_key, name_key], 'filter': {name_key: missing}}):
+                cache[obj[name_key]] = obj[id_key]
+        not_found = [name for name in names if name not in cache]
+        if not_found:
+            label = {'hostgroup': 'Hostgroup', 'template': 'Template', 'proxy': 'Proxy'}[object_type]
+            self._module.fail_json(msg="%s not found: %s" % (label, ', '.join(not_found)))
+        return [cache[name] for name in names]
 
     # exist host
     def is_host_exist(self, host_name):
@@ -167,24 +218,13 @@ class Host(object):
 
     # check if host group exists
     def check_host_group_exist(self, group_names):
-        for group_name in group_names:
-            result = self._zapi.hostgroup.exists({'name': group_name})
-            if not result:
-                self._module.fail_json(msg="Hostgroup not found: %s" % group_name)
+        self.resolve_ids('hostgroup', group_names)
         return True
 
     def get_template_ids(self, template_list):
-        template_ids = []
         if template_list is None or len(template_list) == 0:
-            return template_ids
-        for template in template_list:
-            template_list = self._zapi.template.get({'output': 'extend', 'filter': {'host': template}})
-            if len(template_list) < 1:
-                self._module.fail_json(msg="Template not found: %s" % template)
-            else:
-                template_id = template_list[0]['templateid']
-                template_ids.append(template_id)
-        return template_ids
+            return []
+        return self.resolve_ids('template', template_list)
 
     def add_host(self, host_name, group_ids, status, interfaces, proxy_id):
         try:
@@ -252,21 +292,11 @@ class Host(object):
 
     # get proxyid by proxy name
     def get_proxyid_by_proxy_name(self, proxy_name):
-        proxy_list = self._zapi.proxy.get({'output': 'extend', 'filter': {'host': [proxy_name]}})
-        if len(proxy_list) < 1:
-            self._module.fail_json(msg="Proxy not found: %s" % proxy_name)
-        else:
-            return proxy_list[0]['proxyid']
+        return self.resolve_ids('proxy', [proxy_name])[0]
 
     # get group ids by group names
     def get_group_ids_by_group_names(self, group_names):
-        group_ids = []
-        if self.check_host_group_exist(group_names):
-            group_list = self._zapi.hostgroup.get({'output': 'extend', 'filter': {'name': group_names}})
-            for group in group_list:
-                group_id = group['groupid']
-                group_ids.append({'groupid': group_id})
-        return group_ids
+        return [{'groupid': group_id} for group_id in self.resolve_ids('hostgroup', group_names)]
 
     # get host templates by host id
     def get_host_templates_by_host_id(self, host_id):
@@ -363,6 +393,128 @@ class Host(object):
         except Exception, e:
             self._module.fail_json(msg="Failed to link template to host: %s" % e)
 
+    # get all existing hosts with their interfaces, templates and groups in a single host.get
+    def get_hosts_by_host_names(self, host_names):
+        host_list = self._zapi.host.get({'output': ['hostid', 'host', 'status', 'proxy_hostid'],
+                                         'filter': {'host': host_names},
+                                         'selectInterfaces': 'extend',
+                                         'selectParentTemplates': ['templateid'],
+                                         'selectGroups': ['groupid']})
+        return dict((host['host'], host) for host in host_list)
+
+    # work out the interface changes of an existing host, matching interfaces by type like update_host
+    def diff_interfaces(self, host_id, exist_interface_list, interfaces):
+        remaining = list(exist_interface_list)
+        to_update = []
+        to_create = []
+        for interface in interfaces or []:
+            for exist_interface in remaining:
+                if int(interface['type']) == int(exist_interface['type']):
+                    remaining.remove(exist_interface)
+                    for key in interface.keys():
+                        if str(exist_interface.get(key)) != str(interface[key]):
+                            to_update.append(dict(interface, interfaceid=exist_interface['interfaceid']))
+                            break
+                    break
+            else:
+                to_create.append(dict(interface, hostid=host_id))
+        to_delete = []
+        if interfaces:
+            to_delete = [exist_interface['interfaceid'] for exist_interface in remaining]
+        return to_update, to_create, to_delete
+
+    # create, update or delete many hosts with a few array-form API calls
+    def sync_hosts(self, hosts, state, force):
+        host_names = [host['host_name'] for host in hosts]
+        exist_hosts = self.get_hosts_by_host_names(host_names)
+
+        if state == 'absent':
+            deleted = [name for name in host_names if name in exist_hosts]
+            if deleted and not self._module.check_mode:
+                try:
+                    self._zapi.host.delete([exist_hosts[name]['hostid'] for name in deleted])
+                except Exception, e:
+                    self._module.fail_json(msg="Failed to delete hosts %s: %s" % (', '.join(deleted), e))
+            return dict(changed=bool(deleted), deleted=deleted)
+
+        # resolve all names up front, one get per object type
+        self.resolve_ids('hostgroup', list(set(sum([host['host_groups'] for host in hosts], []))))
+        self.resolve_ids('template', list(set(sum([host['link_templates'] for host in hosts], []))))
+        self.resolve_ids('proxy', list(set([host['proxy'] for host in hosts if host['proxy']])))
+
+        new_hosts = []
+        massupdates = {}
+        interface_updates, interface_creates, interface_deletes = [], [], []
+        created, updated = [], []
+        for host in hosts:
+            host_name = host['host_name']
+            if not host['host_groups']:
+                self._module.fail_json(msg="Specify at least one group for host '%s'." % host_name)
+            group_ids = self.resolve_ids('hostgroup', host['host_groups'])
+            template_ids = self.resolve_ids('template', host['link_templates'])
+            proxy_id = self.get_proxyid_by_proxy_name(host['proxy']) if host['proxy'] else "0"
+
+            if host_name not in exist_hosts:
+                if not host['interfaces']:
+                    self._module.fail_json(msg="Specify at least one interface for creating host '%s'." % host_name)
+                parameters = {'host': host_name, 'interfaces': host['interfaces'], 'status': host['status'],
+                              'groups': [{'groupid': group_id} for group_id in group_ids],
+                              'templates': [{'templateid': template_id} for template_id in template_ids]}
+                if proxy_id != "0":
+                    parameters['proxy_hostid'] = proxy_id
+                new_hosts.append(parameters)
+                created.append(host_name)
+                continue
+
+            if not force:
+                continue
+
+            exist_host = exist_hosts[host_name]
+            host_id = exist_host['hostid']
+            exist_group_ids = set(group['groupid'] for group in exist_host['groups'])
+            exist_template_ids = set(template['templateid'] for template in exist_host['parentTemplates'])
+            templates_clear = sorted(exist_template_ids - set(template_ids))
+            if (exist_group_ids != set(group_ids) or exist_template_ids != set(template_ids) or
+                    int(exist_host['status']) != host['status'] or exist_host['proxy_hostid'] != proxy_id):
+                key = (tuple(sorted(set(group_ids))), tuple(sorted(set(template_ids))), tuple(templates_clear),
+                       host['status'], proxy_id)
+                massupdates.setdefault(key, []).append(host_id)
+                updated.append(host_name)
+
+            to_update, to_create, to_delete = self.diff_interfaces(host_id, exist_host['interfaces'],
+                                                                   host['interfaces'])
+            if to_update or to_create or to_delete:
+                interface_updates.extend(to_update)
+                interface_creates.extend(to_create)
+                interface_deletes.extend(to_delete)
+                if host_name not in updated:
+                    updated.append(host_name)
+
+        changed = bool(created or updated)
+        if not changed or self._module.check_mode:
+            return dict(changed=changed, created=created, updated=updated)
+
+        try:
+            if new_hosts:
+                self._zapi.host.create(new_hosts)
+            for (group_ids, template_ids, templates_clear, status, proxy_id), host_ids in massupdates.items():
+                parameters = {'hosts': [{'hostid': host_id} for host_id in host_ids],
+                              'groups': [{'groupid': group_id} for group_id in group_ids],
+                              'templates': [{'templateid': template_id} for template_id in template_ids],
+                              'status': status, 'proxy_hostid': proxy_id}
+                if templates_clear:
+                    parameters['templates_clear'] = [{'templateid': template_id} for template_id in templates_clear]
+                self._zapi.host.massupdate(parameters)
+            if interface_updates:
+                self._zapi.hostinterface.update(interface_updates)
+            if interface_creates:
+                self._zapi.hostinterface.create(interface_creates)
+            if interface_deletes:
+                self._zapi.hostinterface.delete(interface_deletes)
+        except Exception, e:
+            self._module.fail_json(msg="Failed to update hosts: %s" % e, created=created, updated=updated)
+        return dict(changed=True, created=created, updated=updated)
+
 
 def main():
     module = AnsibleModule(
@@ -370,7 +522,8 @@ def main():
             server_url=dict(required=True, aliases=['url']),
             login_user=dict(required=True),
             login_password=dict(required=True, no_log=True),
-            host_name=dict(required=True),
+            host_name=dict(required=False),
+            hosts=dict(type='list', required=False),
             host_groups=dict(required=False),
             link_templates=dict(required=False),
             status=dict(default="enabled", choices=['enabled', 'disabled']),
@@ -380,6 +533,8 @@ def main():
             force=dict(default=True, type='bool'),
             proxy=dict(required=False)
         ),
+        required_one_of=[['host_name', 'hosts']],
+        mutually_exclusive=[['host_name', 'hosts']],
         supports_check_mode=True
     )
 
@@ -412,6 +567,20 @@ def main():
 
     host = Host(module, zbx)
 
+    if module.params['hosts']:
+        hosts = []
+        for entry in module.params['hosts']:
+            if not isinstance(entry, dict) or not entry.get('host_name'):
+                module.fail_json(msg="Every entry of hosts needs a host_name: %s" % entry)
+            entry_status = entry.get('status', module.params['status'])
+            hosts.append({'host_name': entry['host_name'],
+                          'host_groups': entry.get('host_groups', host_groups) or [],
+                          'link_templates': entry.get('link_templates', link_templates) or [],
+                          'status': 1 if entry_status in ("disabled", 1, "1") else 0,
+                          'interfaces': entry.get('interfaces', interfaces),
+                          'proxy': entry.get('proxy', proxy)})
+        module.exit_json(**host.sync_hosts(hosts, state, force))
+
     template_ids = []
     if link_templates:
         template_ids = host.get_template_ids(link_templates)
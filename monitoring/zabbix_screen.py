@@ -217,11 +217,11 @@ class Screen(object):
             self._module.fail_json(msg="Failed to delete screen %s: %s" % (screen_name, e))
 
     # get graph ids
-    def get_graph_ids(self, hosts, graph_name_list):
+    def get_graph_ids(self, hosts, graphs_by_host):
         graph_id_lists = []
         vsize = 1
         for host in hosts:
-            graph_id_list = self.get_graphs_by_host_id(graph_name_list, host)
+            graph_id_list = graphs_by_host.get(host, [])
             size = len(graph_id_list)
             if size > 0:
                 graph_id_lists.extend(graph_id_list)
@@ -231,17 +231,28 @@ class Screen(object):
 
     #  getGraphs
     def get_graphs_by_host_id(self, graph_name_list, host_id):
-        graph_ids = []
-        for graph_name in graph_name_list:
-            graphs_list = self._zapi.graph.get({'output': 'extend', 'search': {'name': graph_name}, 'hostids': host_id})
-            graph_id_list = []
-            if len(graphs_list) > 0:
-                for graph in graphs_list:
-                    graph_id = graph['graphid']
-                    graph_id_list.append(graph_id)
-            if len(graph_id_list) > 0:
-                graph_ids.extend(graph_id_list)
-        return graph_ids
+        return self.get_graphs_by_host_ids(graph_name_list, [host_id])[host_id]
+
+    # get the graph ids of all hosts with a single graph.get, keyed by host id
+    def get_graphs_by_host_ids(self, graph_name_list, host_ids):
+        graphs_by_host = dict((host_id, []) for host_id in host_ids)
+        if not graph_name_list or not host_ids:
+            return graphs_by_host
+        graphs_list = self._zapi.graph.get({'output': ['graphid', 'name'], 'selectHosts': ['hostid'],
+                                            'hostids': host_ids, 'search': {'name': graph_name_list},
+                                            'searchByAny': True, 'sortfield': 'graphid'})
+        host_graphs = dict((host_id, []) for host_id in host_ids)
+        for graph in graphs_list:
+            for host in graph.get('hosts', []):
+                if host['hostid'] in host_graphs:
+                    host_graphs[host['hostid']].append(graph)
+        # keep the order of graph_name_list, like one graph.get per name would
+        for host_id in host_ids:
+            for graph_name in graph_name_list:
+                for graph in host_graphs[host_id]:
+                    if graph_name.lower() in graph['name'].lower():
+                        graphs_by_host[host_id].append(graph['graphid'])
+        return graphs_by_host
 
     # get screen items
     def get_screen_items(self, screen_id):
@@ -253,13 +264,10 @@ class Screen(object):
         try:
             if len(screen_item_id_list) == 0:
                 return True
-            screen_item_list = self.get_screen_items(screen_id)
-            if len(screen_item_list) > 0:
-                if self._module.check_mode:
-                    self._module.exit_json(changed=True)
-                self._zapi.screenitem.delete(screen_item_id_list)
-                return True
-            return False
+            if self._module.check_mode:
+                self._module.exit_json(changed=True)
+            self._zapi.screenitem.delete(screen_item_id_list)
+            return True
         except ZabbixAPIException:
             pass
 
@@ -276,8 +284,8 @@ class Screen(object):
             v_size = (v_size - 1) / h_size + 1
         return h_size, v_size
 
-    # create screen_items
-    def create_screen_items(self, screen_id, hosts, graph_name_list, width, height, h_size):
+    # build the screen items of all graphs
+    def build_screen_items(self, screen_id, hosts, graphs_by_host, width, height, h_size):
         if len(hosts) < 4:
             if width is None or width < 0:
                 width = 500
@@ -287,27 +295,40 @@ class Screen(object):
         if height is None or height < 0:
             height = 100
 
+        positions = []
+        # when there're only one host, only one row is not good.
+        if len(hosts) == 1:
+            for i, graph_id in enumerate(graphs_by_host.get(hosts[0], [])):
+                positions.append((graph_id, i % h_size, i / h_size))
+        else:
+            for i, host in enumerate(hosts):
+                for j, graph_id in enumerate(graphs_by_host.get(host, [])):
+                    positions.append((graph_id, i, j))
+
+        screen_items = []
+        for graph_id, x, y in positions:
+            if graph_id is not None:
+                screen_items.append({'screenid': screen_id, 'resourcetype': 0, 'resourceid': graph_id,
+                                     'width': width, 'height': height,
+                                     'x': x, 'y': y, 'colspan': 1, 'rowspan': 1,
+                                     'elements': 0, 'valign': 0, 'halign': 0,
+                                     'style': 0, 'dynamic': 0, 'sort_triggers': 0})
+        return screen_items
+
+    # check whether the existing screen items match the wanted ones
+    def screen_items_changed(self, screen_item_list, screen_items):
+        def layout(items):
+            return sorted([(str(i['resourceid']), str(i['x']), str(i['y']), str(i['width']), str(i['height']))
+                           for i in items])
+        return layout(screen_item_list) != layout(screen_items)
+
+    # create screen_items with a single screenitem.create call
+    def create_screen_items(self, screen_id, hosts, graphs_by_host, width, height, h_size):
+        screen_items = self.build_screen_items(screen_id, hosts, graphs_by_host, width, height, h_size)
+        if not screen_items:
+            return
         try:
-            # when there're only one host, only one row is not good.
-            if len(hosts) == 1:
-                graph_id_list = self.get_graphs_by_host_id(graph_name_list, hosts[0])
-                for i, graph_id in enumerate(graph_id_list):
-                    if graph_id is not None:
-                        self._zapi.screenitem.create({'screenid': screen_id, 'resourcetype': 0, 'resourceid': graph_id,
-                                                      'width': width, 'height': height,
-                                                      'x': i % h_size, 'y': i / h_size, 'colspan': 1, 'rowspan': 1,
-                                                      'elements': 0, 'valign': 0, 'halign': 0,
-                                                      'style': 0, 'dynamic': 0, 'sort_triggers': 0})
-            else:
-                for i, host in enumerate(hosts):
-                    graph_id_list = self.get_graphs_by_host_id(graph_name_list, host)
-                    for j, graph_id in enumerate(graph_id_list):
-                        if graph_id is not None:
-                            self._zapi.screenitem.create({'screenid': screen_id, 'resourcetype': 0, 'resourceid': graph_id,
-                                                          'width': width, 'height': height,
-                                                          'x': i, 'y': j, 'colspan': 1, 'rowspan': 1,
-                                                          'elements': 0, 'valign': 0, 'halign': 0,
-                                                          'style': 0, 'dynamic': 0, 'sort_triggers': 0})
+            self._zapi.screenitem.create(screen_items)
         except Already_Exists:
             pass
 
@@ -374,32 +395,26 @@ def main():
             host_group_id = screen.get_host_group_id(host_group)
             hosts = screen.get_host_ids_by_group_id(host_group_id)
 
-            screen_item_id_list = []
-            resource_id_list = []
-
-            graph_ids, v_size = screen.get_graph_ids(hosts, graph_names)
+            graphs_by_host = screen.get_graphs_by_host_ids(graph_names, hosts)
+            graph_ids, v_size = screen.get_graph_ids(hosts, graphs_by_host)
             h_size, v_size = screen.get_hsize_vsize(hosts, v_size)
 
             if not screen_id:
                 # create screen
                 screen_id = screen.create_screen(screen_name, h_size, v_size)
-                screen.create_screen_items(screen_id, hosts, graph_names, graph_width, graph_height, h_size)
+                screen.create_screen_items(screen_id, hosts, graphs_by_host, graph_width, graph_height, h_size)
                 created_screens.append(screen_name)
             else:
                 screen_item_list = screen.get_screen_items(screen_id)
-
-                for screen_item in screen_item_list:
-                    screen_item_id = screen_item['screenitemid']
-                    resource_id = screen_item['resourceid']
-                    screen_item_id_list.append(screen_item_id)
-                    resource_id_list.append(resource_id)
+                screen_items = screen.build_screen_items(screen_id, hosts, graphs_by_host, graph_width, graph_height, h_size)
 
                 # when the screen items changed, then update
-                if graph_ids != resource_id_list:
+                if screen.screen_items_changed(screen_item_list, screen_items):
+                    screen_item_id_list = [screen_item['screenitemid'] for screen_item in screen_item_list]
                     deleted = screen.delete_screen_items(screen_id, screen_item_id_list)
                     if deleted:
                         screen.update_screen(screen_id, screen_name, h_size, v_size)
-                        screen.create_screen_items(screen_id, hosts, graph_names, graph_width, graph_height, h_size)
+                        screen.create_screen_items(screen_id, hosts, graphs_by_host, graph_width, graph_height, h_size)
                         changed_screens.append(screen_name)
 
     if created_screens and changed_screens:
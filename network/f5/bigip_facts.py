@@ -31,6 +31,8 @@ notes:
     - "F5 developed module 'bigsuds' required (see http://devcentral.f5.com)"
     - "Best run as a local_action in your playbook"
     - "Tested with manager and above account privilege level"
+    - "Seconds spent collecting each category are returned in the collection_time fact"
+    - "Categories served from C(cache_dir) are listed in the cached_categories fact"
 
 requirements:
     - bigsuds
@@ -90,6 +92,35 @@ options:
         default: null
         choices: []
         aliases: []
+    workers:
+        description:
+            - Number of concurrent iControl connections used to collect facts.
+              Fact categories and the fields within each category are fetched
+              in parallel over this many connections. Combine with
+              C(session=yes) so that every connection gets its own session.
+        required: false
+        default: 1
+        version_added: 2.1
+    cache_dir:
+        description:
+            - Directory used to cache collected facts between runs. Cached
+              categories are keyed on C(server), C(user) and C(filter) and
+              are only fetched from the device again once their TTL has
+              expired. Caching is disabled when not set.
+        required: false
+        default: null
+        version_added: 2.1
+    cache_ttl:
+        description:
+            - Dictionary mapping fact categories to the number of seconds
+              their cached copy stays valid. Merged over the defaults of
+              86400 for C(software) and 3600 for C(certificate), C(key),
+              C(client_ssl_profile) and C(system_info). Categories with a
+              TTL of 0 or not listed are never cached. Only used together
+              with C(cache_dir).
+        required: false
+        default: null
+        version_added: 2.1
 '''
 
 EXAMPLES = '''
@@ -109,6 +140,27 @@ EXAMPLES = '''
       password=mysecret
       include=interface,vlan
 
+  - name: Collect BIG-IP facts over four concurrent sessions
+    local_action: >
+      bigip_facts
+      server=lb.mydomain.com
+      user=admin
+      password=mysecret
+      session=yes
+      workers=4
+      include=virtual_server,pool,client_ssl_profile
+
+  - name: Collect BIG-IP facts, reusing static data for up to a day
+    bigip_facts:
+      server: lb.mydomain.com
+      user: admin
+      password: mysecret
+      include: software,certificate,key,virtual_server
+      cache_dir: /var/cache/bigip_facts
+      cache_ttl:
+        certificate: 86400
+        key: 86400
+
 '''
 
 try:
@@ -122,6 +174,19 @@ else:
 import fnmatch
 import traceback
 import re
+import copy
+import hashlib
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+import os
+import tempfile
+import sys
+import threading
+import time
+import Queue
 
 # ===========================================
 # bigip_facts module specific support methods.
@@ -166,6 +231,81 @@ class F5(object):
         return self.api.System.Session.get_active_folder()
 
 
+class F5Pool(object):
+    """F5 iControl connection pool class.
+
+    Bounded pool of F5 iControl connections shared by worker threads.
+
+    Attributes:
+        members: A list of F5 instances owned by the pool.
+        size: Number of connections in the pool.
+    """
+
+    def __init__(self, host, user, password, session=False, size=1):
+        self.size = max(1, size)
+        self.members = []
+        self.idle = Queue.Queue()
+        for i in range(self.size):
+            f5 = F5(host, user, password, session)
+            self.members.append(f5)
+            self.idle.put(f5)
+
+    def acquire(self):
+        return self.idle.get()
+
+    def release(self, f5):
+        self.idle.put(f5)
+
+    def build(self, cls, *args):
+        return self.call(lambda f5: cls(f5.get_api(), *args))
+
+    def call(self, func, *args):
+        f5 = self.acquire()
+        try:
+            return func(f5, *args)
+        finally:
+            self.release(f5)
+
+    def map(self, func, items):
+        """Run func(f5, item) for every item, at most size at a time.
+
+        Returns a list of (item, result, exc_info) tuples in item order.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        if self.size == 1 or len(items) < 2:
+            for i, item in enumerate(items):
+                try:
+                    results[i] = (item, self.call(func, item), None)
+                except Exception:
+                    results[i] = (item, None, sys.exc_info())
+            return results
+
+        pending = Queue.Queue()
+        for i, item in enumerate(items):
+            pending.put((i, item))
+
+        def worker():
+            while True:
+                try:
+                    i, item = pending.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    results[i] = (item, self.call(func, item), None)
+                except Exception:
+                    results[i] = (item, None, sys.exc_info())
+
+        threads = [threading.Thread(target=worker)
+                   for i in range(min(self.size, len(items)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+
 class Interfaces(object):
     """Interfaces class.
 
@@ -1364,38 +1504,43 @@ class SystemInfo(object):
         return self.api.System.SystemInfo.get_uptime()
 
 
-def generate_dict(api_obj, fields):
+def bind_api(api_obj, f5):
+    """Return a copy of api_obj that talks over the connection of f5."""
+    bound = copy.copy(api_obj)
+    bound.api = f5.get_api()
+    return bound
+
+def fetch_fields(api_obj, fields, pool):
+    """Fetch every supported field of api_obj over the connection pool."""
+    responses = {}
+
+    def fetch(f5, field):
+        return getattr(bind_api(api_obj, f5), "get_" + field)()
+
+    for field, response, exc_info in pool.map(fetch, fields):
+        if exc_info is None:
+            responses[field] = response
+        elif not issubclass(exc_info[0], (MethodNotFound, WebFault)):
+            raise exc_info[0], exc_info[1], exc_info[2]
+    return responses
+
+def generate_dict(api_obj, fields, pool):
     result_dict = {}
-    lists = []
-    supported_fields = []
-    if api_obj.get_list():
-        for field in fields:
-            try:
-                api_response = getattr(api_obj, "get_" + field)()
-            except (MethodNotFound, WebFault):
-                pass
-            else:
-                lists.append(api_response)
-                supported_fields.append(field)
-        for i, j in enumerate(api_obj.get_list()):
+    names = api_obj.get_list()
+    if names:
+        responses = fetch_fields(api_obj, fields, pool)
+        supported_fields = [x for x in fields if x in responses]
+        for i, j in enumerate(names):
             temp = {}
-            temp.update([(item[0], item[1][i]) for item in zip(supported_fields, lists)])
+            temp.update([(field, responses[field][i]) for field in supported_fields])
             result_dict[j] = temp
     return result_dict
 
-def generate_simple_dict(api_obj, fields):
-    result_dict = {}
-    for field in fields:
-        try:
-            api_response = getattr(api_obj, "get_" + field)()
-        except (MethodNotFound, WebFault):
-            pass
-        else:
-            result_dict[field] = api_response
-    return result_dict
+def generate_simple_dict(api_obj, fields, pool):
+    return fetch_fields(api_obj, fields, pool)
 
-def generate_interface_dict(f5, regex):
-    interfaces = Interfaces(f5.get_api(), regex)
+def generate_interface_dict(pool, regex):
+    interfaces = pool.build(Interfaces, regex)
     fields = ['active_media', 'actual_flow_control', 'bundle_state',
               'description', 'dual_media_state', 'enabled_state', 'if_index',
               'learning_mode', 'lldp_admin_status', 'lldp_tlvmap',
@@ -1406,27 +1551,27 @@ def generate_interface_dict(f5, regex):
               'sfp_media_state', 'stp_active_edge_port_state',
               'stp_enabled_state', 'stp_link_type',
               'stp_protocol_detection_reset_state']
-    return generate_dict(interfaces, fields)
+    return generate_dict(interfaces, fields, pool)
 
-def generate_self_ip_dict(f5, regex):
-    self_ips = SelfIPs(f5.get_api(), regex)
+def generate_self_ip_dict(pool, regex):
+    self_ips = pool.build(SelfIPs, regex)
     fields = ['address', 'allow_access_list', 'description',
               'enforced_firewall_policy', 'floating_state', 'fw_rule',
               'netmask', 'staged_firewall_policy', 'traffic_group',
               'vlan', 'is_traffic_group_inherited']
-    return generate_dict(self_ips, fields)
+    return generate_dict(self_ips, fields, pool)
 
-def generate_trunk_dict(f5, regex):
-    trunks = Trunks(f5.get_api(), regex)
+def generate_trunk_dict(pool, regex):
+    trunks = pool.build(Trunks, regex)
     fields = ['active_lacp_state', 'configured_member_count', 'description',
               'distribution_hash_option', 'interface', 'lacp_enabled_state',
               'lacp_timeout_option', 'link_selection_policy', 'media_speed',
               'media_status', 'operational_member_count', 'stp_enabled_state',
               'stp_protocol_detection_reset_state']
-    return generate_dict(trunks, fields)
+    return generate_dict(trunks, fields, pool)
 
-def generate_vlan_dict(f5, regex):
-    vlans = Vlans(f5.get_api(), regex)
+def generate_vlan_dict(pool, regex):
+    vlans = pool.build(Vlans, regex)
     fields = ['auto_lasthop', 'cmp_hash_algorithm', 'description',
               'dynamic_forwarding', 'failsafe_action', 'failsafe_state',
               'failsafe_timeout', 'if_index', 'learning_mode',
@@ -1434,10 +1579,10 @@ def generate_vlan_dict(f5, regex):
               'sflow_poll_interval', 'sflow_poll_interval_global',
               'sflow_sampling_rate', 'sflow_sampling_rate_global',
               'source_check_state', 'true_mac_address', 'vlan_id']
-    return generate_dict(vlans, fields)
+    return generate_dict(vlans, fields, pool)
 
-def generate_vs_dict(f5, regex):
-    virtual_servers = VirtualServers(f5.get_api(), regex)
+def generate_vs_dict(pool, regex):
+    virtual_servers = pool.build(VirtualServers, regex)
     fields = ['actual_hardware_acceleration', 'authentication_profile',
               'auto_lasthop', 'bw_controller_policy', 'clone_pool',
               'cmp_enable_mode', 'connection_limit', 'connection_mirror_state',
@@ -1454,10 +1599,10 @@ def generate_vs_dict(f5, regex):
               'source_address_translation_type', 'source_port_behavior',
               'staged_firewall_policy', 'translate_address_state',
               'translate_port_state', 'type', 'vlan', 'wildmask']
-    return generate_dict(virtual_servers, fields)
+    return generate_dict(virtual_servers, fields, pool)
 
-def generate_pool_dict(f5, regex):
-    pools = Pools(f5.get_api(), regex)
+def generate_pool_dict(pool, regex):
+    pools = pool.build(Pools, regex)
     fields = ['action_on_service_down', 'active_member_count',
               'aggregate_dynamic_ratio', 'allow_nat_state',
               'allow_snat_state', 'client_ip_tos', 'client_link_qos',
@@ -1470,10 +1615,10 @@ def generate_pool_dict(f5, regex):
               'queue_on_connection_limit_state', 'queue_time_limit',
               'reselect_tries', 'server_ip_tos', 'server_link_qos',
               'simple_timeout', 'slow_ramp_time']
-    return generate_dict(pools, fields)
+    return generate_dict(pools, fields, pool)
 
-def generate_device_dict(f5, regex):
-    devices = Devices(f5.get_api(), regex)
+def generate_device_dict(pool, regex):
+    devices = pool.build(Devices, regex)
     fields = ['active_modules', 'base_mac_address', 'blade_addresses',
               'build', 'chassis_id', 'chassis_type', 'comment',
               'configsync_address', 'contact', 'description', 'edition',
@@ -1482,60 +1627,60 @@ def generate_device_dict(f5, regex):
               'optional_modules', 'platform_id', 'primary_mirror_address',
               'product', 'secondary_mirror_address', 'software_version',
               'timelimited_modules', 'timezone', 'unicast_addresses']
-    return generate_dict(devices, fields)
+    return generate_dict(devices, fields, pool)
 
-def generate_device_group_dict(f5, regex):
-    device_groups = DeviceGroups(f5.get_api(), regex)
+def generate_device_group_dict(pool, regex):
+    device_groups = pool.build(DeviceGroups, regex)
     fields = ['all_preferred_active', 'autosync_enabled_state','description',
               'device', 'full_load_on_sync_state',
               'incremental_config_sync_size_maximum',
               'network_failover_enabled_state', 'sync_status', 'type']
-    return generate_dict(device_groups, fields)
+    return generate_dict(device_groups, fields, pool)
 
-def generate_traffic_group_dict(f5, regex):
-    traffic_groups = TrafficGroups(f5.get_api(), regex)
+def generate_traffic_group_dict(pool, regex):
+    traffic_groups = pool.build(TrafficGroups, regex)
     fields = ['auto_failback_enabled_state', 'auto_failback_time',
               'default_device', 'description', 'ha_load_factor',
               'ha_order', 'is_floating', 'mac_masquerade_address',
               'unit_id']
-    return generate_dict(traffic_groups, fields)
+    return generate_dict(traffic_groups, fields, pool)
 
-def generate_rule_dict(f5, regex):
-    rules = Rules(f5.get_api(), regex)
+def generate_rule_dict(pool, regex):
+    rules = pool.build(Rules, regex)
     fields = ['definition', 'description', 'ignore_vertification',
               'verification_status']
-    return generate_dict(rules, fields)
+    return generate_dict(rules, fields, pool)
 
-def generate_node_dict(f5, regex):
-    nodes = Nodes(f5.get_api(), regex)
+def generate_node_dict(pool, regex):
+    nodes = pool.build(Nodes, regex)
     fields = ['address', 'connection_limit', 'description', 'dynamic_ratio',
               'monitor_instance', 'monitor_rule', 'monitor_status',
               'object_status', 'rate_limit', 'ratio', 'session_status']
-    return generate_dict(nodes, fields)
+    return generate_dict(nodes, fields, pool)
 
-def generate_virtual_address_dict(f5, regex):
-    virtual_addresses = VirtualAddresses(f5.get_api(), regex)
+def generate_virtual_address_dict(pool, regex):
+    virtual_addresses = pool.build(VirtualAddresses, regex)
     fields = ['address', 'arp_state', 'auto_delete_state', 'connection_limit',
               'description', 'enabled_state', 'icmp_echo_state',
               'is_floating_state', 'netmask', 'object_status',
               'route_advertisement_state', 'traffic_group']
-    return generate_dict(virtual_addresses, fields)
+    return generate_dict(virtual_addresses, fields, pool)
 
-def generate_address_class_dict(f5, regex):
-    address_classes = AddressClasses(f5.get_api(), regex)
+def generate_address_class_dict(pool, regex):
+    address_classes = pool.build(AddressClasses, regex)
     fields = ['address_class', 'description']
-    return generate_dict(address_classes, fields)
+    return generate_dict(address_classes, fields, pool)
 
-def generate_certificate_dict(f5, regex):
-    certificates = Certificates(f5.get_api(), regex)
+def generate_certificate_dict(pool, regex):
+    certificates = pool.build(Certificates, regex)
     return dict(zip(certificates.get_list(), certificates.get_certificate_list()))
 
-def generate_key_dict(f5, regex):
-    keys = Keys(f5.get_api(), regex)
+def generate_key_dict(pool, regex):
+    keys = pool.build(Keys, regex)
     return dict(zip(keys.get_list(), keys.get_key_list()))
 
-def generate_client_ssl_profile_dict(f5, regex):
-    profiles = ProfileClientSSL(f5.get_api(), regex)
+def generate_client_ssl_profile_dict(pool, regex):
+    profiles = pool.build(ProfileClientSSL, regex)
     fields = ['alert_timeout', 'allow_nonssl_state', 'authenticate_depth',
               'authenticate_once_state', 'ca_file', 'cache_size',
               'cache_timeout', 'certificate_file', 'chain_file',
@@ -1555,10 +1700,10 @@ def generate_client_ssl_profile_dict(f5, regex):
               'server_name', 'session_ticket_state', 'sni_default_state',
               'sni_require_state', 'ssl_option', 'strict_resume_state',
               'unclean_shutdown_state', 'is_base_profile', 'is_system_profile']
-    return generate_dict(profiles, fields)
+    return generate_dict(profiles, fields, pool)
 
-def generate_system_info_dict(f5):
-    system_info = SystemInfo(f5.get_api())
+def generate_system_info_dict(pool):
+    system_info = pool.build(SystemInfo)
     fields = ['base_mac_address',
               'blade_temperature', 'chassis_slot_information',
               'globally_unique_identifier', 'group_id',
@@ -1567,13 +1712,130 @@ def generate_system_info_dict(f5):
               'product_information', 'pva_version', 'system_id',
               'system_information', 'time',
               'time_zone', 'uptime']
-    return generate_simple_dict(system_info, fields)
+    return generate_simple_dict(system_info, fields, pool)
 
-def generate_software_list(f5):
-    software = Software(f5.get_api())
-    software_list = software.get_all_software_status()
+def generate_software_list(pool):
+    software_list = pool.call(lambda f5: Software(f5.get_api()).get_all_software_status())
     return software_list
 
+def collect_facts(pool, include, regex):
+    """Collect the requested fact categories over the connection pool.
+
+    Categories run concurrently, at most one per pool connection, and the
+    wall clock time spent on each one is reported under collection_time.
+    """
+    generators = {
+        'address_class': lambda: generate_address_class_dict(pool, regex),
+        'certificate': lambda: generate_certificate_dict(pool, regex),
+        'client_ssl_profile': lambda: generate_client_ssl_profile_dict(pool, regex),
+        'device': lambda: generate_device_dict(pool, regex),
+        'device_group': lambda: generate_device_group_dict(pool, regex),
+        'interface': lambda: generate_interface_dict(pool, regex),
+        'key': lambda: generate_key_dict(pool, regex),
+        'node': lambda: generate_node_dict(pool, regex),
+        'pool': lambda: generate_pool_dict(pool, regex),
+        'rule': lambda: generate_rule_dict(pool, regex),
+        'self_ip': lambda: generate_self_ip_dict(pool, regex),
+        'software': lambda: generate_software_list(pool),
+        'system_info': lambda: generate_system_info_dict(pool),
+        'traffic_group': lambda: generate_traffic_group_dict(pool, regex),
+        'trunk': lambda: generate_trunk_dict(pool, regex),
+        'virtual_address': lambda: generate_virtual_address_dict(pool, regex),
+        'virtual_server': lambda: generate_vs_dict(pool, regex),
+        'vlan': lambda: generate_vlan_dict(pool, regex),
+    }
+    categories = sorted(set(include))
+    facts = {}
+    timing = {}
+    errors = []
+    pending = Queue.Queue()
+    for category in categories:
+        pending.put(category)
+
+    def worker():
+        while True:
+            try:
+                category = pending.get_nowait()
+            except Queue.Empty:
+                return
+            start = time.time()
+            try:
+                facts[category] = generators[category]()
+            except Exception:
+                errors.append(sys.exc_info())
+            timing[category] = round(time.time() - start, 3)
+
+    if pool.size == 1:
+        worker()
+    else:
+        threads = [threading.Thread(target=worker)
+                   for i in range(min(pool.size, len(categories)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0][0], errors[0][1], errors[0][2]
+    facts['collection_time'] = timing
+    return facts
+
+DEFAULT_CACHE_TTL = {
+    'certificate': 3600,
+    'client_ssl_profile': 3600,
+    'key': 3600,
+    'software': 86400,
+    'system_info': 3600,
+}
+
+def get_cache_path(cache_dir, server, user, fact_filter, category):
+    key = hashlib.sha1("\0".join([server, user, fact_filter or ""])).hexdigest()
+    return os.path.join(cache_dir, key, "%s.json" % category)
+
+def load_cached_facts(path, ttl):
+    """Return cached facts from path if younger than ttl seconds, else None."""
+    if ttl <= 0 or not os.path.exists(path):
+        return None
+    try:
+        f = open(path)
+        try:
+            cached = json.load(f)
+        finally:
+            f.close()
+    except (IOError, ValueError):
+        return None
+    if time.time() - cached.get('timestamp', 0) > ttl:
+        return None
+    return cached.get('facts')
+
+def save_cached_facts(path, facts):
+    """Atomically write facts to path, ignoring unserializable data.
+
+    Returns an error message if the cache could not be written, the facts
+    gathered are still good then.
+    """
+    try:
+        data = json.dumps({'timestamp': time.time(), 'facts': facts})
+    except (TypeError, ValueError):
+        return None
+    cache_dir = os.path.dirname(path)
+    tmp_path = None
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, 0700)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.', suffix='.tmp')
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        os.rename(tmp_path, path)
+    except (IOError, OSError), e:
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        return "Failed to write fact cache %s: %s" % (path, e)
+    return None
+
 def disable_ssl_cert_validation():
     # You probably only want to do this for testing and never in production.
     # From https://www.python.org/dev/peps/pep-0476/#id29
@@ -1591,6 +1853,9 @@ def main():
             session = dict(type='bool', default=False),
             include = dict(type='list', required=True),
             filter = dict(type='str', required=False),
+            workers = dict(type='int', default=1),
+            cache_dir = dict(type='str', required=False),
+            cache_ttl = dict(type='dict', required=False),
         )
     )
 
@@ -1602,6 +1867,17 @@ def main():
     password = module.params['password']
     validate_certs = module.params['validate_certs']
     session = module.params['session']
+    workers = module.params['workers']
+    cache_dir = module.params['cache_dir']
+    if cache_dir:
+        cache_dir = os.path.expanduser(cache_dir)
+    cache_ttl = dict(DEFAULT_CACHE_TTL)
+    if module.params['cache_ttl']:
+        try:
+            for category, ttl in module.params['cache_ttl'].items():
+                cache_ttl[category.lower()] = int(ttl)
+        except ValueError:
+            module.fail_json(msg="cache_ttl values must be integer seconds")
     fact_filter = module.params['filter']
     if fact_filter:
         regex = fnmatch.translate(fact_filter)
@@ -1616,67 +1892,63 @@ def main():
     include_test = map(lambda x: x in valid_includes, include)
     if not all(include_test):
         module.fail_json(msg="value of include must be one or more of: %s, got: %s" % (",".join(valid_includes), ",".join(include)))
+    if workers < 1:
+        module.fail_json(msg="workers must be at least 1")
 
     if not validate_certs:
         disable_ssl_cert_validation()
 
     try:
         facts = {}
+        cached_categories = []
+        warnings = []
+
+        if cache_dir:
+            for category in set(include):
+                path = get_cache_path(cache_dir, server, user, fact_filter, category)
+                cached = load_cached_facts(path, cache_ttl.get(category, 0))
+                if cached is not None:
+                    facts[category] = cached
+                    cached_categories.append(category)
+            include = [x for x in include if x not in cached_categories]
 
         if len(include) > 0:
-            f5 = F5(server, user, password, session)
-            saved_active_folder = f5.get_active_folder()
-            saved_recursive_query_state = f5.get_recursive_query_state()
-            if saved_active_folder != "/":
-                f5.set_active_folder("/")
-            if saved_recursive_query_state != "STATE_ENABLED":
-                f5.enable_recursive_query_state()
-
-            if 'interface' in include:
-                facts['interface'] = generate_interface_dict(f5, regex)
-            if 'self_ip' in include:
-                facts['self_ip'] = generate_self_ip_dict(f5, regex)
-            if 'trunk' in include:
-                facts['trunk'] = generate_trunk_dict(f5, regex)
-            if 'vlan' in include:
-                facts['vlan'] = generate_vlan_dict(f5, regex)
-            if 'virtual_server' in include:
-                facts['virtual_server'] = generate_vs_dict(f5, regex)
-            if 'pool' in include:
-                facts['pool'] = generate_pool_dict(f5, regex)
-            if 'device' in include:
-                facts['device'] = generate_device_dict(f5, regex)
-            if 'device_group' in include:
-                facts['device_group'] = generate_device_group_dict(f5, regex)
-            if 'traffic_group' in include:
-                facts['traffic_group'] = generate_traffic_group_dict(f5, regex)
-            if 'rule' in include:
-                facts['rule'] = generate_rule_dict(f5, regex)
-            if 'node' in include:
-                facts['node'] = generate_node_dict(f5, regex)
-            if 'virtual_address' in include:
-                facts['virtual_address'] = generate_virtual_address_dict(f5, regex)
-            if 'address_class' in include:
-                facts['address_class'] = generate_address_class_dict(f5, regex)
-            if 'software' in include:
-                facts['software'] = generate_software_list(f5)
-            if 'certificate' in include:
-                facts['certificate'] = generate_certificate_dict(f5, regex)
-            if 'key' in include:
-                facts['key'] = generate_key_dict(f5, regex)
-            if 'client_ssl_profile' in include:
-                facts['client_ssl_profile'] = generate_client_ssl_profile_dict(f5, regex)
-            if 'system_info' in include:
-                facts['system_info'] = generate_system_info_dict(f5)
-
-            # restore saved state
-            if saved_active_folder and saved_active_folder != "/":
-                f5.set_active_folder(saved_active_folder)
-            if saved_recursive_query_state and \
-               saved_recursive_query_state != "STATE_ENABLED":
-                f5.set_recursive_query_state(saved_recursive_query_state)
-
+            pool = F5Pool(server, user, password, session, workers)
+            saved_states = []
+            for f5 in pool.members:
+                saved_active_folder = f5.get_active_folder()
+                saved_recursive_query_state = f5.get_recursive_query_state()
+                if saved_active_folder != "/":
+                    f5.set_active_folder("/")
+                if saved_recursive_query_state != "STATE_ENABLED":
+                    f5.enable_recursive_query_state()
+                saved_states.append((f5, saved_active_folder,
+                                     saved_recursive_query_state))
+
+            facts.update(collect_facts(pool, include, regex))
+
+            # restore saved state, first connection last since without
+            # sessions it is the only one that saw the original state
+            for f5, saved_active_folder, saved_recursive_query_state in reversed(saved_states):
+                if saved_active_folder and saved_active_folder != "/":
+                    f5.set_active_folder(saved_active_folder)
+                if saved_recursive_query_state and \
+                   saved_recursive_query_state != "STATE_ENABLED":
+                    f5.set_recursive_query_state(saved_recursive_query_state)
+
+            if cache_dir:
+                for category in set(include):
+                    if cache_ttl.get(category, 0) > 0:
+                        path = get_cache_path(cache_dir, server, user, fact_filter, category)
+                        warning = save_cached_facts(path, facts[category])
+                        if warning:
+                            warnings.append(warning)
+
+        if cache_dir:
+            facts['cached_categories'] = sorted(cached_categories)
         result = {'ansible_facts': facts}
+        if warnings:
+            result['warnings'] = warnings
 
     except Exception, e:
         module.fail_json(msg="received exception: %s\ntraceback: %s" % (e, traceback.format_exc()))
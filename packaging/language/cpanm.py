@@ -30,6 +30,8 @@ options:
   name:
     description:
       - The name of the Perl library to install. You may use the "full distribution path", e.g.  MIYAGAWA/Plack-0.99_05.tar.gz
+      - Several libraries may be given separated by commas. They are checked with a single perl process, optionally
+        against a minimum version given as C(Module~1.23), and the missing ones are installed with a single cpanm run.
     required: false
     default: null
     aliases: ["pkg"]
@@ -98,8 +100,48 @@ EXAMPLES = '''
 
 # install Dancer perl package into the system root path
 - cpanm: name=Dancer system_lib=yes
+
+# install several perl packages at once, Plack at least in version 1.0030
+- cpanm: name=Dancer,Plack~1.0030,JSON::XS locallib=/srv/webapps/my_app/extlib
+'''
+
+import re
+
+# Loads every module given on the command line in one perl process and
+# reports whether it is installed in the requested version
+CHECK_MODULES_SCRIPT = r'''
+for my $spec (@ARGV) {
+    my ($module, $version) = split /~/, $spec, 2;
+    (my $file = "$module.pm") =~ s{::}{/}g;
+    my $ok = eval { require $file; 1 };
+    $ok = eval { $module->VERSION($version); 1 } if $ok && defined $version;
+    print "$spec\t", ($ok ? "installed" : "missing"), "\n";
+}
 '''
 
+def _is_checkable(name):
+    # Only plain module names (with an optional minimum version) can be
+    # checked, distribution paths and urls are always handed to cpanm.
+    return re.match(r'^\w+(::\w+)*(~[\w.]+)?$', name) is not None
+
+def _missing_packages(module, names, locallib):
+    checkable = [n for n in names if _is_checkable(n)]
+    missing = [n for n in names if n not in checkable]
+    if not checkable:
+        return missing
+
+    if locallib:
+        os.environ["PERL5LIB"] = "%s/lib/perl5" % locallib
+    res, stdout, stderr = module.run_command(['perl', '-e', CHECK_MODULES_SCRIPT] + checkable, check_rc=False)
+
+    installed = set()
+    for line in stdout.splitlines():
+        fields = line.split('\t')
+        if len(fields) == 2 and fields[1] == 'installed':
+            installed.add(fields[0])
+    missing.extend(n for n in checkable if n not in installed)
+    return missing
+
 def _is_package_installed(module, name, locallib, cpanm):
     cmd = ""
     if locallib:
@@ -169,18 +211,37 @@ def main():
 
     changed   = False
 
-    installed = _is_package_installed(module, name, locallib, cpanm)
+    batch = name and ',' in name and not from_path
+    if batch:
+        names     = [n.strip() for n in name.split(',') if n.strip()]
+        missing   = _missing_packages(module, names, locallib)
+        installed = not missing
+        # the remaining command line applies to all modules
+        install_name = ' '.join(missing)
+    else:
+        installed = _is_package_installed(module, name, locallib, cpanm)
+        install_name = name
 
     if not installed:
         out_cpanm = err_cpanm = ''
-        cmd       = _build_cmd_line(name, from_path, notest, locallib, mirror, mirror_only, installdeps, cpanm, use_sudo)
+        cmd       = _build_cmd_line(install_name, from_path, notest, locallib, mirror, mirror_only, installdeps, cpanm, use_sudo)
 
         rc_cpanm, out_cpanm, err_cpanm = module.run_command(cmd, check_rc=False)
 
         if rc_cpanm != 0:
             module.fail_json(msg=err_cpanm, cmd=cmd)
 
-        if err_cpanm and 'is up to date' not in err_cpanm:
+        if batch:
+            # changed if any module found missing before is installed now,
+            # only for paths and urls the output has to tell
+            checked = [n for n in missing if _is_checkable(n)]
+            if checked:
+                still_missing = _missing_packages(module, checked, locallib)
+                if len(still_missing) < len(checked):
+                    changed = True
+            if len(checked) < len(missing) and err_cpanm and 'is up to date' not in err_cpanm:
+                changed = True
+        elif err_cpanm and 'is up to date' not in err_cpanm:
             changed = True
 
     module.exit_json(changed=changed, binary=cpanm, name=name)
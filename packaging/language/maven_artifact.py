@@ -25,6 +25,9 @@ from lxml import etree
 import os
 import hashlib
 import sys
+import json
+import threading
+import Queue
 
 DOCUMENTATION = '''
 ---
@@ -42,12 +45,12 @@ requirements:
 options:
     group_id:
         description:
-            - The Maven groupId coordinate
-        required: true
+            - The Maven groupId coordinate. Required unless C(artifacts) is used.
+        required: false
     artifact_id:
         description:
-            - The maven artifactId coordinate
-        required: true
+            - The maven artifactId coordinate. Required unless C(artifacts) is used.
+        required: false
     version:
         description:
             - The maven version coordinate
@@ -80,9 +83,9 @@ options:
         default: null
     dest:
         description:
-            - The path where the artifact should be written to
-        required: true
-        default: false
+            - The path where the artifact should be written to. Required unless C(artifacts) is used.
+        required: false
+        default: null
     state:
         description:
             - The desired state of the artifact
@@ -96,6 +99,33 @@ options:
         default: 'yes'
         choices: ['yes', 'no']
         version_added: "1.9.3"
+    artifacts:
+        description:
+            - List of artifacts to download in one run. Every item is a dictionary with the C(group_id),
+              C(artifact_id), C(version), C(classifier), C(extension), C(dest) and C(state) keys of a single
+              artifact; C(version), C(classifier), C(extension) and C(state) default to the values given to the
+              module. Repository settings are shared by all items.
+            - The C(maven-metadata.xml) of every group and artifact is fetched only once. Existing files are
+              checked against the remote SHA-1 (or MD5) checksum and only replaced when they differ. Interrupted
+              downloads are resumed with HTTP range requests and checksums are computed while downloading.
+        required: false
+        default: null
+        version_added: "2.1"
+    workers:
+        description:
+            - Number of artifacts downloaded concurrently when C(artifacts) is used.
+        required: false
+        default: 4
+        version_added: "2.1"
+    digest_cache:
+        description:
+            - Keep the checksums of downloaded artifacts in a hidden C(.<name>.digest) file next to them, keyed on
+              size and modification time, so that unchanged files are not hashed again on the next run. Only used
+              with C(artifacts).
+        required: false
+        default: 'yes'
+        choices: ['yes', 'no']
+        version_added: "2.1"
 '''
 
 EXAMPLES = '''
@@ -110,6 +140,20 @@ EXAMPLES = '''
 
 # Download a WAR File to the Tomcat webapps directory to be deployed
 - maven_artifact: group_id=com.company artifact_id=web-app extension=war repository_url=https://repo.company.com/maven dest=/var/lib/tomcat7/webapps/web-app.war
+
+# Download several artifacts concurrently, replacing those whose checksum changed
+- maven_artifact:
+    repository_url: https://repo.company.com/maven
+    artifacts:
+      - group_id: com.company
+        artifact_id: web-app
+        extension: war
+        dest: /var/lib/tomcat7/webapps/web-app.war
+      - group_id: com.company
+        artifact_id: admin-app
+        version: 1.2.0
+        extension: war
+        dest: /var/lib/tomcat7/webapps/admin-app.war
 '''
 
 class Artifact(object):
@@ -186,18 +230,44 @@ class MavenDownloader:
             base = base.rstrip("/")
         self.base = base
         self.user_agent = "Maven Artifact Downloader/1.0"
+        self.metadata = {}
+        self.lock = threading.Lock()
+
+    def _metadata(self, path):
+        # maven-metadata.xml is fetched once per group/artifact (or snapshot
+        # version) and shared by every artifact resolved from it
+        url = self.base + "/%s/maven-metadata.xml" % path
+        with self.lock:
+            if url not in self.metadata:
+                self.metadata[url] = threading.Event(), []
+                owner = True
+            else:
+                owner = False
+            event, result = self.metadata[url]
+        if owner:
+            # the failure is kept as well, so waiters re-raise it instead
+            # of blocking forever
+            try:
+                try:
+                    result.append(self._request(url, "Failed to download maven-metadata.xml", lambda r: etree.parse(r)))
+                except Exception as e:
+                    result.append(e)
+            finally:
+                event.set()
+        event.wait()
+        if isinstance(result[0], Exception):
+            raise result[0]
+        return result[0]
 
     def _find_latest_version_available(self, artifact):
-        path = "/%s/maven-metadata.xml" % (artifact.path(False))
-        xml = self._request(self.base + path, "Failed to download maven-metadata.xml", lambda r: etree.parse(r))
+        xml = self._metadata(artifact.path(False))
         v = xml.xpath("/metadata/versioning/versions/version[last()]/text()")
         if v:
             return v[0]
 
     def find_uri_for_artifact(self, artifact):
         if artifact.is_snapshot():
-            path = "/%s/maven-metadata.xml" % (artifact.path())
-            xml = self._request(self.base + path, "Failed to download maven-metadata.xml", lambda r: etree.parse(r))
+            xml = self._metadata(artifact.path())
             timestamp = xml.xpath("/metadata/versioning/snapshot/timestamp/text()")[0]
             buildNumber = xml.xpath("/metadata/versioning/snapshot/buildNumber/text()")[0]
             return self._uri_for_artifact(artifact, artifact.version.replace("SNAPSHOT", timestamp + "-" + buildNumber))
@@ -214,79 +284,211 @@ class MavenDownloader:
 
         return self.base + "/" + artifact.path() + "/" + artifact.artifact_id + "-" + version + "." + artifact.extension
 
-    def _request(self, url, failmsg, f):
+    def _open(self, url, failmsg, headers=None, accept=(200,)):
         # Hack to add parameters in the way that fetch_url expects
         self.module.params['url_username'] = self.module.params.get('username', '')
         self.module.params['url_password'] = self.module.params.get('password', '')
         self.module.params['http_agent'] = self.module.params.get('user_agent', None)
 
-        response, info = fetch_url(self.module, url)
-        if info['status'] != 200:
+        response, info = fetch_url(self.module, url, headers=headers)
+        if info['status'] not in accept:
             raise ValueError(failmsg + " because of " + info['msg'] + "for URL " + url)
-        else:
-            return f(response)
+        return response, info['status']
+
+    def _request(self, url, failmsg, f):
+        response, status = self._open(url, failmsg)
+        return f(response)
 
 
     def download(self, artifact, filename=None):
         filename = artifact.get_filename(filename)
+        self.fetch_artifact(artifact, filename, use_cache=False)
+        return True
+
+    def _remote_digest(self, url):
+        # prefer SHA-1, which every maven repository publishes, over MD5
+        for algorithm in ("sha1", "md5"):
+            try:
+                digest = self._request(url + "." + algorithm, "Failed to download checksum", lambda r: r.read())
+            except ValueError:
+                continue
+            if digest.strip():
+                return algorithm, digest.split()[0].lower()
+        return None, None
+
+    def _digest_path(self, filename):
+        return os.path.join(os.path.dirname(filename), "." + os.path.basename(filename) + ".digest")
+
+    def _local_digests(self, filename, use_cache):
+        st = os.stat(filename)
+        cache = self._digest_path(filename)
+        if use_cache and os.path.exists(cache):
+            try:
+                with open(cache) as f:
+                    cached = json.load(f)
+                if cached.get("size") == st.st_size and cached.get("mtime") == st.st_mtime:
+                    return cached
+            except (IOError, ValueError):
+                pass
+
+        digests = {"md5": hashlib.md5(), "sha1": hashlib.sha1()}
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), ''):
+                for digest in digests.values():
+                    digest.update(chunk)
+        digests = dict((k, v.hexdigest()) for k, v in digests.items())
+        if use_cache:
+            self._save_digests(filename, digests)
+        return digests
+
+    def _save_digests(self, filename, digests):
+        st = os.stat(filename)
+        cached = dict(digests, size=st.st_size, mtime=st.st_mtime)
+        try:
+            with open(self._digest_path(filename), 'w') as f:
+                json.dump(cached, f)
+        except IOError:
+            pass
+
+    def _fetch(self, url, filename, failmsg, chunk_size=65536):
+        """Download url to filename through a partial file, resuming it with
+        a range request if a previous run was interrupted, and return the
+        digests of the data computed while it is written."""
+        partial = filename + ".part"
+        digests = {"md5": hashlib.md5(), "sha1": hashlib.sha1()}
+        offset = 0
+        if os.path.exists(partial):
+            with open(partial, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), ''):
+                    offset += len(chunk)
+                    for digest in digests.values():
+                        digest.update(chunk)
+
+        headers = None
+        if offset:
+            headers = {"Range": "bytes=%d-" % offset}
+        try:
+            response, status = self._open(url, failmsg, headers=headers, accept=(200, 206))
+        except ValueError:
+            if not offset:
+                raise
+            # the partial file may be stale or complete, start over
+            os.remove(partial)
+            return self._fetch(url, filename, failmsg, chunk_size)
+
+        if status == 200 and offset:
+            # the server ignored the range, restart from the beginning
+            digests = {"md5": hashlib.md5(), "sha1": hashlib.sha1()}
+            offset = 0
+            mode = 'wb'
+        else:
+            mode = 'ab'
+
+        with open(partial, mode) as f:
+            for chunk in iter(lambda: response.read(chunk_size), ''):
+                f.write(chunk)
+                for digest in digests.values():
+                    digest.update(chunk)
+        return partial, offset > 0, dict((k, v.hexdigest()) for k, v in digests.items())
+
+    def fetch_artifact(self, artifact, filename, use_cache=True):
+        """Make sure filename holds artifact. Returns True if it was
+        downloaded and False if the existing file already matched."""
         if not artifact.version or artifact.version == "latest":
             artifact = Artifact(artifact.group_id, artifact.artifact_id, self._find_latest_version_available(artifact),
                                 artifact.classifier, artifact.extension)
 
         url = self.find_uri_for_artifact(artifact)
-        if not self.verify_md5(filename, url + ".md5"):
-            response = self._request(url, "Failed to download artifact " + str(artifact), lambda r: r)
-            if response:
-                with open(filename, 'w') as f:
-                    # f.write(response.read())
-                    self._write_chunks(response, f, report_hook=self.chunk_report)
-                return True
-            else:
+        algorithm, remote = self._remote_digest(url)
+        if os.path.exists(filename):
+            if algorithm is None:
+                # nothing to compare with, keep what is there
+                return False
+            if self._local_digests(filename, use_cache)[algorithm] == remote:
                 return False
-        else:
-            return True
-
-    def chunk_report(self, bytes_so_far, chunk_size, total_size):
-        percent = float(bytes_so_far) / total_size
-        percent = round(percent * 100, 2)
-        sys.stdout.write("Downloaded %d of %d bytes (%0.2f%%)\r" %
-                         (bytes_so_far, total_size, percent))
-
-        if bytes_so_far >= total_size:
-            sys.stdout.write('\n')
-
-    def _write_chunks(self, response, file, chunk_size=8192, report_hook=None):
-        total_size = response.info().getheader('Content-Length').strip()
-        total_size = int(total_size)
-        bytes_so_far = 0
-
-        while 1:
-            chunk = response.read(chunk_size)
-            bytes_so_far += len(chunk)
-
-            if not chunk:
-                break
-
-            file.write(chunk)
-            if report_hook:
-                report_hook(bytes_so_far, chunk_size, total_size)
-
-        return bytes_so_far
-
-    def verify_md5(self, file, remote_md5):
-        if not os.path.exists(file):
-            return False
-        else:
-            local_md5 = self._local_md5(file)
-            remote = self._request(remote_md5, "Failed to download MD5", lambda r: r.read())
-            return local_md5 == remote
 
-    def _local_md5(self, file):
-        md5 = hashlib.md5()
-        with open(file, 'rb') as f:
-            for chunk in iter(lambda: f.read(8192), ''):
-                md5.update(chunk)
-        return md5.hexdigest()
+        failmsg = "Failed to download artifact " + str(artifact)
+        partial, resumed, digests = self._fetch(url, filename, failmsg)
+        if algorithm is not None and digests[algorithm] != remote and resumed:
+            # the partial file belonged to another build of the artifact
+            os.remove(partial)
+            partial, resumed, digests = self._fetch(url, filename, failmsg)
+        if algorithm is not None and digests[algorithm] != remote:
+            os.remove(partial)
+            raise ValueError("Checksum mismatch for artifact %s: expected %s %s but got %s" %
+                             (str(artifact), algorithm, remote, digests[algorithm]))
+        self.module.atomic_move(partial, filename)
+        if use_cache:
+            self._save_digests(filename, digests)
+        return True
+
+
+def download_artifacts(module, downloader):
+    p = module.params
+    items = []
+    for spec in p["artifacts"]:
+        if not isinstance(spec, dict):
+            module.fail_json(msg="Every item of artifacts must be a dictionary")
+        spec = dict(spec)
+        for key in ("version", "classifier", "extension", "state"):
+            spec.setdefault(key, p[key])
+        if not spec.get("dest"):
+            module.fail_json(msg="Every item of artifacts requires a dest")
+        if spec["state"] not in ("present", "absent"):
+            module.fail_json(msg="Invalid state %s for %s" % (spec["state"], spec["dest"]))
+        try:
+            artifact = Artifact(spec.get("group_id"), spec.get("artifact_id"), spec["version"],
+                                spec["classifier"], spec["extension"])
+        except ValueError as e:
+            module.fail_json(msg=e.args[0])
+        dest = artifact.get_filename(os.path.expanduser(spec["dest"]))
+        items.append((artifact, dest, spec["state"]))
+
+    pending = Queue.Queue()
+    for index, item in enumerate(items):
+        pending.put((index, item))
+
+    results = [None] * len(items)
+
+    def worker():
+        while True:
+            try:
+                index, (artifact, dest, state) = pending.get_nowait()
+            except Queue.Empty:
+                return
+            result = dict(artifact=str(artifact), dest=dest, state=state, changed=False)
+            try:
+                if state == "absent":
+                    if os.path.lexists(dest):
+                        os.remove(dest)
+                        result["changed"] = True
+                else:
+                    path = os.path.dirname(dest)
+                    if path and not os.path.exists(path):
+                        try:
+                            os.makedirs(path)
+                        except OSError:
+                            # created concurrently by another worker
+                            if not os.path.isdir(path):
+                                raise
+                    result["changed"] = downloader.fetch_artifact(artifact, dest, p["digest_cache"])
+            except Exception as e:
+                result["failed"] = True
+                result["msg"] = str(e) or e.__class__.__name__
+            results[index] = result
+
+    threads = [threading.Thread(target=worker) for _ in xrange(max(1, min(p["workers"], len(items))))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    changed = any(r["changed"] for r in results)
+    failed = [r for r in results if r.get("failed")]
+    if failed:
+        module.fail_json(msg="Unable to download %d artifact(s)" % len(failed), results=results, changed=changed)
+    module.exit_json(changed=changed, results=results, repository_url=downloader.base)
 
 
 def main():
@@ -303,7 +505,12 @@ def main():
             state = dict(default="present", choices=["present","absent"]), # TODO - Implement a "latest" state
             dest = dict(default=None),
             validate_certs = dict(required=False, default=True, type='bool'),
-        )
+            artifacts = dict(required=False, default=None, type='list'),
+            workers = dict(required=False, default=4, type='int'),
+            digest_cache = dict(required=False, default=True, type='bool'),
+        ),
+        required_one_of = [['dest', 'artifacts']],
+        mutually_exclusive = [['dest', 'artifacts'], ['group_id', 'artifacts'], ['artifact_id', 'artifacts']],
     )
 
     group_id = module.params["group_id"]
@@ -323,6 +530,9 @@ def main():
     #downloader = MavenDownloader(module, repository_url, repository_username, repository_password)
     downloader = MavenDownloader(module, repository_url)
 
+    if module.params["artifacts"] is not None:
+        download_artifacts(module, downloader)
+
     try:
         artifact = Artifact(group_id, artifact_id, version, classifier, extension)
     except ValueError as e:
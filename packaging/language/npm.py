@@ -74,6 +74,23 @@ options:
     required: false
     default: present
     choices: [ "present", "absent", "latest" ]
+  packages:
+    description:
+      - A list of C(name@range) specifiers (a bare C(name) accepts any version) to manage together.
+        They are compared with a single C(npm ls --json --depth=0) and, for I(latest), C(npm outdated --json)
+        and only the missing or outdated packages are installed with one C(npm install) (or removed with one
+        C(npm uninstall) for I(absent)).
+    required: false
+    version_added: "2.1"
+  skip_unchanged:
+    description:
+      - Remember a hash of C(package.json), C(npm-shrinkwrap.json) and the requested packages in
+        C(node_modules/.ansible-npm.sha1) after a successful I(present) run and skip npm entirely while
+        it does not change.
+    required: false
+    choices: [ "yes", "no" ]
+    default: no
+    version_added: "2.1"
 '''
 
 EXAMPLES = '''
@@ -100,15 +117,123 @@ description: Update packages based on package.json to their latest version.
 
 description: Install packages based on package.json using the npm installed with nvm v0.10.1.
 - npm: path=/app/location executable=/opt/nvm/v0.10.1/bin/npm state=present
+
+description: Install several packages with a single npm run.
+- npm:
+    path: /app/location
+    packages:
+      - express@^4.13.0
+      - lodash@~3.10.1
+      - "@angular/core@2.x"
+
+description: Install packages based on package.json unless it is unchanged since the last run.
+- npm: path=/app/location skip_unchanged=yes
 '''
 
 import os
+import copy
+
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import sha as sha1
 
 try:
     import json
 except ImportError:
     import simplejson as json
 
+
+def is_package_name(name):
+    """Is name a registry package name, as opposed to a git url, tarball
+    or path whose package name is only known after installing it?"""
+    return re.match(r'^(@[^/@\s]+/)?[^/@\s:]+$', name) is not None and \
+        not name.endswith('.tgz') and not name.endswith('.tar.gz')
+
+
+def split_spec(spec):
+    """Split a name@range specifier, keeping the @ of scoped packages."""
+    at = spec.rfind('@')
+    if at <= 0:
+        return spec, ''
+    return spec[:at], spec[at + 1:]
+
+
+def _parse_version(version):
+    parts = re.split(r'[-+]', version.strip().lstrip('v='), 1)[0].split('.')
+    numbers = []
+    for part in parts[:3]:
+        if part in ('x', 'X', '*', ''):
+            break
+        numbers.append(int(part))
+    return numbers
+
+
+def _compare(version, op, bound):
+    """Compare a full version with a (possibly partial) bound."""
+    partial = len(bound) < 3
+    padded = bound + [0] * (3 - len(bound))
+    if op in ('', '='):
+        return version[:len(bound)] == bound
+    if op == '>=':
+        return version >= padded
+    if op == '>':
+        if partial:
+            return version[:len(bound)] > bound
+        return version > padded
+    if op == '<':
+        return version < padded
+    if op == '<=':
+        if partial:
+            return version[:len(bound)] <= bound
+        return version <= padded
+    if op == '^':
+        upper = list(padded)
+        # bump the first non-zero part given, as npm does
+        for i, n in enumerate(padded[:max(len(bound), 1)]):
+            if n != 0 or i == len(bound) - 1:
+                upper = padded[:i] + [n + 1] + [0] * (2 - i)
+                break
+        return padded <= version < upper
+    if op == '~':
+        if len(bound) <= 1:
+            upper = [padded[0] + 1, 0, 0]
+        else:
+            upper = [padded[0], padded[1] + 1, 0]
+        return padded <= version < upper
+    raise ValueError(op)
+
+
+def satisfies(version, spec_range):
+    """Check a version against a semver range. Returns None for ranges
+    which are not versions at all, such as tags, urls or git repos."""
+    spec_range = spec_range.strip()
+    if spec_range in ('', '*', 'x', 'X', 'latest'):
+        return True
+    try:
+        version = _parse_version(version)
+        for alternative in spec_range.split('||'):
+            alternative = alternative.strip()
+            hyphen = re.match(r'^(\S+)\s+-\s+(\S+)$', alternative)
+            if hyphen:
+                comparators = [('>=', hyphen.group(1)), ('<=', hyphen.group(2))]
+            else:
+                comparators = []
+                for token in re.sub(r'(\^|~>?|[<>]=?|=)\s+', r'\1', alternative).split():
+                    comparator = re.match(r'^(\^|~>?|[<>]=?|=)?(v?\d[\w.*+-]*|[*xX])$', token)
+                    if not comparator:
+                        return None
+                    comparators.append(comparator.groups())
+            for op, bound in comparators:
+                op = {'~>': '~', None: ''}.get(op, op)
+                if not _compare(version, op, _parse_version(bound)):
+                    break
+            else:
+                return True
+        return False
+    except ValueError:
+        return None
+
 class Npm(object):
     def __init__(self, module, **kwargs):
         self.module = module
@@ -119,6 +244,7 @@ class Npm(object):
         self.registry = kwargs['registry']
         self.production = kwargs['production']
         self.ignore_scripts = kwargs['ignore_scripts']
+        self.sources = set()
 
         if kwargs['executable']:
             self.executable = kwargs['executable'].split(' ')
@@ -130,9 +256,9 @@ class Npm(object):
         else:
             self.name_version = self.name
 
-    def _exec(self, args, run_in_check_mode=False, check_rc=True):
+    def _exec(self, args, run_in_check_mode=False, check_rc=True, targets=None):
         if not self.module.check_mode or (self.module.check_mode and run_in_check_mode):
-            cmd = self.executable + args
+            cmd = self.executable + args + (targets or [])
 
             if self.glbl:
                 cmd.append('--global')
@@ -191,6 +317,77 @@ class Npm(object):
     def uninstall(self):
         return self._exec(['uninstall'])
 
+    def snapshot(self):
+        """Return the installed top-level packages with their versions,
+        from a single npm ls run."""
+        out = self._exec(['ls', '--json', '--depth=0'], True, False)
+        try:
+            data = json.loads(out or '{}')
+        except ValueError:
+            self.module.fail_json(msg="could not parse the output of npm ls", stdout=out)
+        installed = {}
+        self.sources = set()
+        for dep, info in (data.get('dependencies') or {}).iteritems():
+            if info.get('missing') or not info.get('version'):
+                continue
+            installed[dep] = info['version']
+            for key in ('from', 'resolved'):
+                if info.get(key):
+                    self.sources.add(info[key])
+        return installed
+
+    def spec_missing(self, spec):
+        """Check a single spec the snapshot can not key by name, such as a
+        git url or tarball, with its own npm list run."""
+        if spec in self.sources:
+            return False
+        checker = copy.copy(self)
+        checker.name = checker.name_version = spec
+        installed, missing = checker.list()
+        return bool(missing)
+
+    def outdated_snapshot(self):
+        """Return the packages npm reports as outdated, mapped to the newer
+        versions available for them, from a single npm outdated run."""
+        out = self._exec(['outdated', '--json'], True, False)
+        try:
+            data = json.loads(out or '{}')
+        except ValueError:
+            return dict((dep, None) for dep in self.list_outdated())
+        outdated = {}
+        for dep, info in data.iteritems():
+            if not isinstance(info, dict):
+                continue
+            newer = [info.get(key) for key in ('wanted', 'latest')
+                     if info.get(key) and info.get(key) != info.get('current')]
+            if newer:
+                outdated[dep] = newer
+        return outdated
+
+    def install_packages(self, specs):
+        return self._exec(['install'], targets=specs)
+
+    def uninstall_packages(self, names):
+        return self._exec(['uninstall'], targets=names)
+
+    def fingerprint(self, specs):
+        """Hash everything an install from package.json depends on."""
+        digest = sha1()
+        for filename in ['package.json', 'npm-shrinkwrap.json']:
+            digest.update('\0%s\0' % filename)
+            try:
+                f = open(os.path.join(self.path, filename), 'rb')
+                digest.update(f.read())
+                f.close()
+            except IOError:
+                pass
+        digest.update(json.dumps([specs, self.production, self.ignore_scripts,
+                                  self.registry, self.name_version]))
+        return digest.hexdigest()
+
+    def fingerprint_path(self):
+        return os.path.join(self.path, 'node_modules', '.ansible-npm.sha1')
+
     def list_outdated(self):
         outdated = list()
         data = self._exec(['outdated'], True, False)
@@ -214,10 +411,13 @@ def main():
         registry=dict(default=None),
         state=dict(default='present', choices=['present', 'absent', 'latest']),
         ignore_scripts=dict(default=False, type='bool'),
+        packages=dict(default=None, type='list'),
+        skip_unchanged=dict(default=False, type='bool'),
     )
     arg_spec['global'] = dict(default='no', type='bool')
     module = AnsibleModule(
         argument_spec=arg_spec,
+        mutually_exclusive=[['name', 'packages']],
         supports_check_mode=True
     )
 
@@ -230,17 +430,60 @@ def main():
     registry = module.params['registry']
     state = module.params['state']
     ignore_scripts = module.params['ignore_scripts']
+    packages = module.params['packages']
+    skip_unchanged = module.params['skip_unchanged']
 
     if not path and not glbl:
         module.fail_json(msg='path must be specified when not using global')
-    if state == 'absent' and not name:
+    if state == 'absent' and not (name or packages):
         module.fail_json(msg='uninstalling a package is only available for named packages')
 
     npm = Npm(module, name=name, path=path, version=version, glbl=glbl, production=production, \
               executable=executable, registry=registry, ignore_scripts=ignore_scripts)
 
+    fingerprint = None
+    if skip_unchanged and state == 'present' and path and not glbl:
+        npm.path = os.path.abspath(os.path.expanduser(path))
+        fingerprint = npm.fingerprint(packages)
+        try:
+            f = open(npm.fingerprint_path())
+            previous = f.read().strip()
+            f.close()
+        except IOError:
+            previous = None
+        if previous == fingerprint:
+            module.exit_json(changed=False, msg='package.json and packages unchanged')
+
     changed = False
-    if state == 'present':
+    if packages is not None:
+        installed = npm.snapshot()
+        specs = [split_spec(spec) for spec in packages]
+        if state == 'absent':
+            names = [spec_name for spec_name, spec_range in specs if spec_name in installed]
+            if names:
+                changed = True
+                npm.uninstall_packages(names)
+        else:
+            if state == 'latest':
+                outdated = npm.outdated_snapshot()
+            targets = []
+            for spec, (spec_name, spec_range) in zip(packages, specs):
+                if spec_name not in installed:
+                    if is_package_name(spec_name) or npm.spec_missing(spec):
+                        targets.append(spec)
+                elif satisfies(installed[spec_name], spec_range) is False:
+                    targets.append(spec)
+                elif state == 'latest' and spec_name in outdated:
+                    newer = outdated[spec_name]
+                    # only upgrade when the range allows a newer version
+                    if not spec_range:
+                        targets.append(spec_name + '@latest')
+                    elif newer is None or [v for v in newer if satisfies(v, spec_range) is not False]:
+                        targets.append(spec)
+            if targets:
+                changed = True
+                npm.install_packages(targets)
+    elif state == 'present':
         installed, missing = npm.list()
         if len(missing):
             changed = True
@@ -257,6 +500,14 @@ def main():
             changed = True
             npm.uninstall()
 
+    if fingerprint and not module.check_mode:
+        try:
+            f = open(npm.fingerprint_path(), 'w')
+            f.write(fingerprint + '\n')
+            f.close()
+        except IOError:
+            pass
+
     module.exit_json(changed=changed)
 
 # import module snippets
@@ -32,7 +32,10 @@ author:
 options:
     name:
         description:
-            - Name of the package to install, upgrade, or remove.
+            - Name of the package to install, upgrade, or remove. Several
+              packages may be given separated by commas, they are checked
+              against a single listing of the installed packages and
+              installed, upgraded or removed with a single pear call.
         required: true
 
     state:
@@ -58,112 +61,157 @@ EXAMPLES = '''
 '''
 
 import os
-
-def get_local_version(pear_output):
-    """Take pear remoteinfo output and get the installed version"""
-    lines = pear_output.split('\n')
-    for line in lines:
-        if 'Installed ' in line:
-            installed = line.rsplit(None, 1)[-1].strip()
-            if installed == '-': continue
-            return installed
-    return None
-
-def get_repository_version(pear_output):
-    """Take pear remote-info output and get the latest version"""
-    lines = pear_output.split('\n')
-    for line in lines:
-        if 'Latest ' in line:
-            return line.rsplit(None, 1)[-1].strip()
-    return None
-
-def query_package(module, name, state="present"):
+import re
+
+# Channel aliases known without asking pear
+CHANNEL_ALIASES = {
+    'pear': 'pear.php.net',
+    'pecl': 'pecl.php.net',
+    'phpdocs': 'doc.php.net',
+    '__uri': '__uri',
+}
+
+def get_channel_aliases(module):
+    """Read the aliases of all registered channels with pear list-channels."""
+    aliases = dict(CHANNEL_ALIASES)
+    rc, stdout, stderr = module.run_command("pear list-channels", check_rc=False)
+    for line in stdout.split('\n'):
+        fields = line.split()
+        if len(fields) >= 2 and '.' in fields[0]:
+            aliases[fields[1].lower()] = fields[0].lower()
+    return aliases
+
+def split_package(name, aliases=CHANNEL_ALIASES):
+    """Split a [channel/]package[-version] name into the channel and the
+    lower case package name."""
+    if '/' in name:
+        channel, package = name.rsplit('/', 1)
+    else:
+        channel, package = 'pear', name
+    channel = aliases.get(channel.lower(), channel.lower())
+    # pear package names use underscores, anything after a dash is a
+    # version or stability
+    return channel, package.split('-', 1)[0].lower()
+
+def get_local_versions(module):
+    """Read the versions of all installed packages with a single pear list -a.
+    Returns a dictionary mapping (channel, package) to the version."""
+    cmd = "pear list -a"
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
+    if rc != 0:
+        module.fail_json(msg="could not list installed packages", stdout=stdout, stderr=stderr)
+
+    versions = {}
+    channel = None
+    for line in stdout.split('\n'):
+        match = re.match(r'^INSTALLED PACKAGES, CHANNEL (\S+):', line)
+        if match:
+            channel = match.group(1).lower()
+            continue
+        fields = line.split()
+        if channel is None or len(fields) < 2 or fields[0] == 'PACKAGE' or line.startswith('='):
+            continue
+        versions[(channel, fields[0].lower())] = fields[1]
+    return versions
+
+def get_repository_versions(module, channels):
+    """Read the latest versions with a single pear list-all per channel.
+    Returns a dictionary mapping (channel, package) to the version."""
+    versions = {}
+    for channel in channels:
+        cmd = "pear list-all -c %s" % (channel)
+        rc, stdout, stderr = module.run_command(cmd, check_rc=False)
+        if rc != 0:
+            module.fail_json(msg="could not list packages of channel %s" % (channel), stdout=stdout, stderr=stderr)
+        for line in stdout.split('\n'):
+            fields = line.split()
+            if len(fields) < 2 or '/' not in fields[0]:
+                continue
+            package = fields[0].rsplit('/', 1)[1].lower()
+            versions[(channel, package)] = fields[1]
+    return versions
+
+def get_package_states(module, packages, state):
     """Query the package status in both the local system and the repository.
-    Returns a boolean to indicate if the package is installed,
-    and a second boolean to indicate if the package is up-to-date."""
-    if state == "present":
-        lcmd = "pear info %s" % (name)
-        lrc, lstdout, lstderr = module.run_command(lcmd, check_rc=False)
-        if lrc != 0:
+    Returns a dictionary mapping every package to a boolean to indicate if
+    it is installed, and a second boolean to indicate if it is up-to-date."""
+    aliases = CHANNEL_ALIASES
+    keys = [split_package(package) for package in packages]
+    if [channel for channel, name in keys if channel not in aliases.values()]:
+        # channels given by an alias of their own
+        aliases = get_channel_aliases(module)
+
+    local = get_local_versions(module)
+    remote = {}
+    if state == 'latest':
+        channels = set(split_package(package, aliases)[0] for package in packages)
+        remote = get_repository_versions(module, sorted(channels))
+
+    states = {}
+    for package in packages:
+        key = split_package(package, aliases)
+        if key not in local:
             # package is not installed locally
-            return False, False
-
-        rcmd = "pear remote-info %s" % (name)
-        rrc, rstdout, rstderr = module.run_command(rcmd, check_rc=False)
-
-        # get the version installed locally (if any)
-        lversion = get_local_version(rstdout)
-
-        # get the version in the repository
-        rversion = get_repository_version(rstdout)
-
-        if rrc == 0:
-            # Return True to indicate that the package is installed locally,
-            # and the result of the version number comparison
-            # to determine if the package is up-to-date.
-            return True, (lversion == rversion)
-
-        return False, False
+            states[package] = (False, False)
+        else:
+            # a package missing from the channel listing can not be upgraded
+            states[package] = (True, remote.get(key, local[key]) == local[key])
+    return states
 
 
 def remove_packages(module, packages):
-    remove_c = 0
-    # Using a for loop incase of error, we can report the package that failed
-    for package in packages:
-        # Query the package first, to see if we even need to remove
-        installed, updated = query_package(module, package)
-        if not installed:
-            continue
-
-        cmd = "pear uninstall %s" % (package)
-        rc, stdout, stderr = module.run_command(cmd, check_rc=False)
+    states = get_package_states(module, packages, 'absent')
 
-        if rc != 0:
-            module.fail_json(msg="failed to remove %s" % (package))
+    # Query the packages first, to see if we even need to remove
+    to_remove = [package for package in packages if states[package][0]]
 
-        remove_c += 1
+    if not to_remove:
+        module.exit_json(changed=False, msg="package(s) already absent")
 
-    if remove_c > 0:
+    cmd = "pear uninstall %s" % (" ".join(to_remove))
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
 
-        module.exit_json(changed=True, msg="removed %s package(s)" % remove_c)
+    if rc != 0:
+        module.fail_json(msg="failed to remove %s" % (" ".join(to_remove)), stdout=stdout, stderr=stderr)
 
-    module.exit_json(changed=False, msg="package(s) already absent")
+    module.exit_json(changed=True, msg="removed %s package(s)" % len(to_remove))
 
 
 def install_packages(module, state, packages):
-    install_c = 0
+    states = get_package_states(module, packages, state)
 
-    for i, package in enumerate(packages):
+    to_install = []
+    for package in packages:
         # if the package is installed and state == present
         # or state == latest and is up-to-date then skip
-        installed, updated = query_package(module, package)
+        installed, updated = states[package]
         if installed and (state == 'present' or (state == 'latest' and updated)):
             continue
+        to_install.append(package)
 
-        if state == 'present':
-            command = 'install'
+    if not to_install:
+        module.exit_json(changed=False, msg="package(s) already installed")
 
-        if state == 'latest':
-            command = 'upgrade'
+    if state == 'present':
+        command = 'install'
 
-        cmd = "pear %s %s" % (command, package)
-        rc, stdout, stderr = module.run_command(cmd, check_rc=False)
-
-        if rc != 0:
-            module.fail_json(msg="failed to install %s" % (package))
+    if state == 'latest':
+        command = 'upgrade'
 
-        install_c += 1
+    cmd = "pear %s %s" % (command, " ".join(to_install))
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
 
-    if install_c > 0:
-        module.exit_json(changed=True, msg="installed %s package(s)" % (install_c))
+    if rc != 0:
+        module.fail_json(msg="failed to install %s" % (" ".join(to_install)), stdout=stdout, stderr=stderr)
 
-    module.exit_json(changed=False, msg="package(s) already installed")
+    module.exit_json(changed=True, msg="installed %s package(s)" % (len(to_install)))
 
 
 def check_packages(module, packages, state):
     would_be_changed = []
+    states = get_package_states(module, packages, state)
     for package in packages:
-        installed, updated = query_package(module, package)
+        installed, updated = states[package]
         if ((state in ["present", "latest"] and not installed) or
                 (state == "absent" and installed) or
                 (state == "latest" and not updated)):
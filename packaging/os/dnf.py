@@ -82,6 +82,53 @@ options:
     choices: ["yes", "no"]
     aliases: []
 
+  installed_first:
+    description:
+      - Load only the installed packages first and skip loading the repository metadata when
+        the request can be answered from them, e.g. all packages for I(present) are already installed
+        or none of the packages for I(absent) are. Also used for C(list=installed).
+    required: false
+    default: "yes"
+    choices: ["yes", "no"]
+    version_added: "2.1"
+
+  list_name:
+    description:
+      - Only list packages whose name matches this glob. Used with C(list).
+    required: false
+    default: null
+    version_added: "2.1"
+
+  list_repo:
+    description:
+      - Only list packages from this repository (C(@System) for installed packages). Used with C(list).
+    required: false
+    default: null
+    version_added: "2.1"
+
+  list_arch:
+    description:
+      - Only list packages of this architecture. Used with C(list).
+    required: false
+    default: null
+    version_added: "2.1"
+
+  list_limit:
+    description:
+      - Return at most this many packages. Used with C(list).
+    required: false
+    default: null
+    version_added: "2.1"
+
+  noop_cache:
+    description:
+      - Path of a file remembering the requests for I(present) which had nothing to do, keyed on the
+        state of the rpm database. As long as the rpm database does not change, repeating such a request
+        returns without loading any metadata or running the solver. Remote packages are never cached.
+    required: false
+    default: null
+    version_added: "2.1"
+
 notes: []
 # informational: requirements for nodes
 requirements:
@@ -114,8 +161,17 @@ EXAMPLES = '''
 - name: install the 'Development tools' package group
   dnf: name="@Development tools" state=present
 
+- name: list at most 20 available python packages from the updates repo
+  dnf: list=available list_name=python* list_repo=updates list_limit=20
+
+- name: skip the solver for repeated no-op runs
+  dnf: name=httpd,mod_ssl state=present noop_cache=/var/cache/ansible/dnf-noop.json
+
 '''
 import os
+import hashlib
+import json
+import fnmatch
 
 try:
     import dnf
@@ -174,16 +230,81 @@ def _specify_repositories(base, disablerepo, enablerepo):
             repo.enable()
 
 
-def _base(module, conf_file, disable_gpg_check, disablerepo, enablerepo):
+def _base(module, conf_file, disable_gpg_check, disablerepo, enablerepo,
+          load_available_repos=True):
     """Return a fully configured dnf Base object."""
     _fail_if_no_dnf(module)
     base = dnf.Base()
     _configure_base(module, base, conf_file, disable_gpg_check)
-    _specify_repositories(base, disablerepo, enablerepo)
-    base.fill_sack()
+    if load_available_repos:
+        _specify_repositories(base, disablerepo, enablerepo)
+    base.fill_sack(load_system_repo=True,
+                   load_available_repos=load_available_repos)
     return base
 
 
+RPMDB_PATHS = ['/var/lib/rpm/Packages', '/var/lib/rpm/rpmdb.sqlite']
+
+
+def _rpmdb_cookie():
+    """Return a string which changes whenever the rpm database does."""
+    for path in RPMDB_PATHS:
+        if os.path.exists(path):
+            st = os.stat(path)
+            return '%d:%d:%d' % (st.st_ino, st.st_size, st.st_mtime)
+    return None
+
+
+def _noop_cache_key(params):
+    """Return the key of a request in the no-op cache."""
+    request = [
+        params['state'], sorted(params['name']), params['enablerepo'],
+        params['disablerepo'], params['conf_file'],
+        params['disable_gpg_check']]
+    return hashlib.sha1(json.dumps(request)).hexdigest()
+
+
+def _read_noop_cache(path):
+    """Return the contents of the no-op cache, or an empty one."""
+    try:
+        with open(path) as cache_file:
+            return json.load(cache_file)
+    except (IOError, ValueError):
+        return {}
+
+
+def _write_noop_cache(module, path, key, cookie):
+    """Remember that the request had nothing to do at this rpmdb state."""
+    cache = _read_noop_cache(path)
+    cache[key] = cookie
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(tmp_path, 'w') as cache_file:
+            json.dump(cache, cache_file)
+        os.rename(tmp_path, path)
+    except (IOError, OSError):
+        # The cache is an optimization only.
+        pass
+
+
+def _answered_by_installed(base, state, names):
+    """Check whether the installed packages alone show there is nothing to do."""
+    if state not in ['installed', 'present', 'absent', 'removed']:
+        return False
+    for name in names:
+        # Groups, files and globs need the repositories to be decided.
+        if (name.startswith('@') or '/' in name or name.endswith('.rpm') or
+                set('*?[') & set(name)):
+            return False
+        installed = subject.Subject(name).get_best_query(base.sack).installed()
+        if bool(installed) != (state in ['installed', 'present']):
+            return False
+    return True
+
+
 def _package_dict(package):
     """Return a dictionary of information for the package."""
     # NOTE: This no longer contains the 'dnfstate' field because it is
@@ -201,7 +322,22 @@ def _package_dict(package):
     return result
 
 
-def list_items(module, base, command):
+def _filter_packages(packages, name=None, repo=None, arch=None, limit=None):
+    """Narrow down a package query and yield at most limit packages."""
+    if name:
+        packages = packages.filter(name__glob=name)
+    if repo:
+        packages = packages.filter(reponame=repo)
+    if arch:
+        packages = packages.filter(arch=arch)
+    for count, package in enumerate(packages):
+        if limit is not None and count >= limit:
+            break
+        yield package
+
+
+def list_items(module, base, command, name=None, repo=None, arch=None,
+               limit=None):
     """List package info based on the command."""
     # Rename updates to upgrades
     if command == 'updates':
@@ -209,18 +345,22 @@ def list_items(module, base, command):
 
     # Return the corresponding packages
     if command in ['installed', 'upgrades', 'available']:
+        packages = getattr(base.sack.query(), command)()
         results = [
             _package_dict(package)
-            for package in getattr(base.sack.query(), command)()]
+            for package in _filter_packages(packages, name, repo, arch, limit)]
     # Return the enabled repository ids
     elif command in ['repos', 'repositories']:
         results = [
-            {'repoid': repo.id, 'state': 'enabled'}
-            for repo in base.repos.iter_enabled()]
+            {'repoid': repo_.id, 'state': 'enabled'}
+            for repo_ in base.repos.iter_enabled()
+            if not repo or fnmatch.fnmatch(repo_.id, repo)]
     # Return any matching packages
     else:
         packages = subject.Subject(command).get_best_query(base.sack)
-        results = [_package_dict(package) for package in packages]
+        results = [
+            _package_dict(package)
+            for package in _filter_packages(packages, name, repo, arch, limit)]
 
     module.exit_json(results=results)
 
@@ -233,7 +373,8 @@ def _mark_package_install(module, base, pkg_spec):
         module.fail_json(msg="No package {} available.".format(pkg_spec))
 
 
-def ensure(module, base, state, names):
+def ensure(module, base, state, names, noop_cache=None):
+    filenames = []
     if names == ['*'] and state == 'latest':
         base.upgrade_all()
     else:
@@ -293,6 +434,10 @@ def ensure(module, base, state, names):
                     base.remove(pkg_spec)
 
     if not base.resolve():
+        if noop_cache and state in ['installed', 'present'] and not filenames:
+            _write_noop_cache(
+                module, noop_cache, _noop_cache_key(module.params),
+                _rpmdb_cookie())
         module.exit_json(msg="Nothing to do")
     else:
         if module.check_mode:
@@ -322,26 +467,56 @@ def main():
             list=dict(),
             conf_file=dict(default=None),
             disable_gpg_check=dict(default=False, type='bool'),
+            installed_first=dict(default=True, type='bool'),
+            list_name=dict(default=None),
+            list_repo=dict(default=None),
+            list_arch=dict(default=None),
+            list_limit=dict(default=None, type='int'),
+            noop_cache=dict(default=None),
         ),
         required_one_of=[['name', 'list']],
         mutually_exclusive=[['name', 'list']],
         supports_check_mode=True)
     params = module.params
     if params['list']:
+        # Installed packages only need the system repository.
+        installed_only = params['installed_first'] and (
+            params['list'] == 'installed' or params['list_repo'] == '@System')
         base = _base(
             module, params['conf_file'], params['disable_gpg_check'],
-            params['disablerepo'], params['enablerepo'])
-        list_items(module, base, params['list'])
+            params['disablerepo'], params['enablerepo'],
+            load_available_repos=not installed_only)
+        list_items(
+            module, base, params['list'], params['list_name'],
+            params['list_repo'], params['list_arch'], params['list_limit'])
     else:
         # Note: base takes a long time to run so we want to check for failure
         # before running it.
         if not util.am_i_root():
             module.fail_json(msg="This command has to be run under the root user.")
+
+        noop_cache = params['noop_cache']
+        if noop_cache:
+            noop_cache = os.path.expanduser(noop_cache)
+            cookie = _rpmdb_cookie()
+            cache = _read_noop_cache(noop_cache)
+            if cookie and cache.get(_noop_cache_key(params)) == cookie:
+                module.exit_json(msg="Nothing to do")
+
+        if params['installed_first'] and params['name'] != ['*']:
+            base = _base(
+                module, params['conf_file'], params['disable_gpg_check'],
+                params['disablerepo'], params['enablerepo'],
+                load_available_repos=False)
+            if _answered_by_installed(base, params['state'], params['name']):
+                module.exit_json(msg="Nothing to do")
+            base.close()
+
         base = _base(
             module, params['conf_file'], params['disable_gpg_check'],
             params['disablerepo'], params['enablerepo'])
 
-        ensure(module, base, params['state'], params['name'])
+        ensure(module, base, params['state'], params['name'], noop_cache)
 
 
 # import module snippets
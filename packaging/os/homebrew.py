@@ -95,6 +95,11 @@ EXAMPLES = '''
 import os.path
 import re
 
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
 
 # exceptions -------------------------------------------------------------- {{{
 class HomebrewException(Exception):
@@ -340,6 +345,7 @@ class Homebrew(object):
         self.changed_count = 0
         self.unchanged_count = 0
         self.message = ''
+        self.package_index = None
 
     def _setup_instance_vars(self, **kwargs):
         for key, val in kwargs.iteritems():
@@ -388,12 +394,83 @@ class Homebrew(object):
         return (failed, changed, message)
 
     # checks ------------------------------------------------------- {{{
+    def _prefetch_packages(self):
+        '''Read the installed and outdated packages with one brew call each.
+
+        Every check below is answered from the resulting index instead of
+        running brew once or twice per package. Versions of brew without
+        JSON output leave the index unset, which falls back to those calls.
+        '''
+        self.package_index = None
+
+        rc, out, err = self.module.run_command([
+            self.brew_path,
+            'info',
+            '--json=v1',
+            '--installed',
+        ])
+        installed = None
+        if rc == 0:
+            try:
+                installed = json.loads(out)
+            except ValueError:
+                pass
+        if not isinstance(installed, list):
+            return None
+
+        rc, out, err = self.module.run_command([
+            self.brew_path,
+            'outdated',
+            '--json=v1',
+        ])
+        outdated = None
+        if rc == 0:
+            try:
+                outdated = json.loads(out)
+            except ValueError:
+                pass
+        if not isinstance(outdated, list):
+            return None
+        outdated = set(formula.get('name') for formula in outdated)
+
+        index = {}
+        for formula in installed:
+            versions = [
+                keg.get('version') or ''
+                for keg in formula.get('installed') or []
+            ]
+            if not versions:
+                continue
+            info = {
+                'head': any(v.startswith('HEAD') for v in versions),
+                'outdated': formula.get('name') in outdated,
+            }
+            names = [formula.get('name'), formula.get('full_name')]
+            names.extend(formula.get('aliases') or [])
+            for name in names:
+                if name:
+                    index[name] = info
+
+        self.package_index = index
+        return index
+
+    def _indexed_package(self):
+        '''Look up the current package, as a bare name or a tap path.'''
+        package = self.current_package
+        info = self.package_index.get(package)
+        if info is None and '/' in package:
+            info = self.package_index.get(package.split('/')[-1])
+        return info
+
     def _current_package_is_installed(self):
         if not self.valid_package(self.current_package):
             self.failed = True
             self.message = 'Invalid package: {0}.'.format(self.current_package)
             raise HomebrewException(self.message)
 
+        if self.package_index is not None:
+            return self._indexed_package() is not None
+
         cmd = [
             "{brew_path}".format(brew_path=self.brew_path),
             "info",
@@ -413,6 +490,10 @@ class Homebrew(object):
         if not self.valid_package(self.current_package):
             return False
 
+        if self.package_index is not None:
+            info = self._indexed_package()
+            return info is not None and info['outdated']
+
         rc, out, err = self.module.run_command([
             self.brew_path,
             'outdated',
@@ -427,6 +508,9 @@ class Homebrew(object):
         elif not self._current_package_is_installed():
             return False
 
+        if self.package_index is not None:
+            return self._indexed_package()['head']
+
         rc, out, err = self.module.run_command([
             self.brew_path,
             'info',
@@ -450,6 +534,8 @@ class Homebrew(object):
             self._upgrade_all()
 
         if self.packages:
+            self._prefetch_packages()
+
             if self.state == 'installed':
                 return self._install_packages()
             elif self.state == 'upgraded':
@@ -511,101 +597,125 @@ class Homebrew(object):
     # /_upgrade_all -------------------------- }}}
 
     # installed ------------------------------ {{{
-    def _install_current_package(self):
-        if not self.valid_package(self.current_package):
-            self.failed = True
-            self.message = 'Invalid package: {0}.'.format(self.current_package)
-            raise HomebrewException(self.message)
+    def _select_packages(self, check):
+        '''Validate all packages and split them by the result of check.'''
+        selected = []
+        for package in self.packages:
+            self.current_package = package
+            if not self.valid_package(package):
+                self.failed = True
+                self.message = 'Invalid package: {0}.'.format(package)
+                raise HomebrewException(self.message)
+            if check():
+                selected.append(package)
+        return selected
+
+    def _run_batch(self, command, packages, extra=None):
+        '''Run one brew command for all packages.'''
+        opts = (
+            [self.brew_path, command]
+            + self.install_options
+            + packages
+            + (extra or [])
+        )
+        cmd = [opt for opt in opts if opt]
+        return self.module.run_command(cmd)
 
-        if self._current_package_is_installed():
-            self.unchanged_count += 1
+    def _refresh_packages(self):
+        '''Re-read the index after changing packages, if there is one.'''
+        if self.package_index is not None:
+            self._prefetch_packages()
+
+    def _install_packages(self):
+        missing = self._select_packages(
+            lambda: not self._current_package_is_installed())
+        self.unchanged_count += len(self.packages) - len(missing)
+
+        if not missing:
             self.message = 'Package already installed: {0}'.format(
-                self.current_package,
+                ', '.join(self.packages),
             )
             return True
 
         if self.module.check_mode:
             self.changed = True
             self.message = 'Package would be installed: {0}'.format(
-                self.current_package
+                ', '.join(missing)
             )
             raise HomebrewException(self.message)
 
         if self.state == 'head':
-            head = '--HEAD'
+            head = ['--HEAD']
         else:
             head = None
 
-        opts = (
-            [self.brew_path, 'install']
-            + self.install_options
-            + [self.current_package, head]
-        )
-        cmd = [opt for opt in opts if opt]
-        rc, out, err = self.module.run_command(cmd)
+        # all missing packages are installed with a single brew call
+        rc, out, err = self._run_batch('install', missing, head)
+        self._refresh_packages()
 
-        if self._current_package_is_installed():
-            self.changed_count += 1
-            self.changed = True
-            self.message = 'Package installed: {0}'.format(self.current_package)
-            return True
-        else:
+        failed = self._select_packages(
+            lambda: self.current_package in missing
+            and not self._current_package_is_installed())
+        self.changed_count += len(missing) - len(failed)
+        self.changed = self.changed_count > 0
+        if failed:
             self.failed = True
-            self.message = err.strip()
+            self.message = err.strip() or 'Package not installed: {0}'.format(
+                ', '.join(failed))
             raise HomebrewException(self.message)
 
-    def _install_packages(self):
-        for package in self.packages:
-            self.current_package = package
-            self._install_current_package()
-
+        self.message = 'Package installed: {0}'.format(', '.join(missing))
         return True
     # /installed ----------------------------- }}}
 
     # upgraded ------------------------------- {{{
-    def _upgrade_current_package(self):
-        command = 'upgrade'
-
-        if not self.valid_package(self.current_package):
-            self.failed = True
-            self.message = 'Invalid package: {0}.'.format(self.current_package)
-            raise HomebrewException(self.message)
-
-        if not self._current_package_is_installed():
-            command = 'install'
-
-        if self._current_package_is_installed() and not self._current_package_is_outdated():
+    def _upgrade_current_packages(self):
+        missing = self._select_packages(
+            lambda: not self._current_package_is_installed())
+        outdated = self._select_packages(
+            lambda: self._current_package_is_installed()
+            and self._current_package_is_outdated())
+        pending = missing + outdated
+        self.unchanged_count += len(self.packages) - len(pending)
+
+        if not pending:
             self.message = 'Package is already upgraded: {0}'.format(
-                self.current_package,
+                ', '.join(self.packages),
             )
-            self.unchanged_count += 1
             return True
 
         if self.module.check_mode:
             self.changed = True
             self.message = 'Package would be upgraded: {0}'.format(
-                self.current_package
+                ', '.join(pending)
             )
             raise HomebrewException(self.message)
 
-        opts = (
-            [self.brew_path, command]
-            + self.install_options
-            + [self.current_package]
-        )
-        cmd = [opt for opt in opts if opt]
-        rc, out, err = self.module.run_command(cmd)
-
-        if self._current_package_is_installed() and not self._current_package_is_outdated():
-            self.changed_count += 1
-            self.changed = True
-            self.message = 'Package upgraded: {0}'.format(self.current_package)
-            return True
-        else:
+        # brew refuses to install a formula which is already installed, so
+        # missing and outdated packages need one call each
+        err = ''
+        if missing:
+            rc, out, err = self._run_batch('install', missing)
+        if outdated:
+            rc, out, upgrade_err = self._run_batch('upgrade', outdated)
+            err = '\n'.join(e for e in (err, upgrade_err) if e)
+        self._refresh_packages()
+
+        failed = self._select_packages(
+            lambda: self.current_package in pending
+            and (not self._current_package_is_installed()
+                 or self._current_package_is_outdated()))
+        self.changed_count += len(pending) - len(failed)
+        self.changed = self.changed_count > 0
+        if failed:
             self.failed = True
-            self.message = err.strip()
+            self.message = err.strip() or 'Package not upgraded: {0}'.format(
+                ', '.join(failed))
             raise HomebrewException(self.message)
 
+        self.message = 'Package upgraded: {0}'.format(', '.join(pending))
+        return True
+
     def _upgrade_all_packages(self):
         opts = (
             [self.brew_path, 'upgrade']
@@ -627,56 +737,42 @@ class Homebrew(object):
         if not self.packages:
             self._upgrade_all_packages()
         else:
-            for package in self.packages:
-                self.current_package = package
-                self._upgrade_current_package()
-            return True
+            return self._upgrade_current_packages()
     # /upgraded ------------------------------ }}}
 
     # uninstalled ---------------------------- {{{
-    def _uninstall_current_package(self):
-        if not self.valid_package(self.current_package):
-            self.failed = True
-            self.message = 'Invalid package: {0}.'.format(self.current_package)
-            raise HomebrewException(self.message)
+    def _uninstall_packages(self):
+        installed = self._select_packages(self._current_package_is_installed)
+        self.unchanged_count += len(self.packages) - len(installed)
 
-        if not self._current_package_is_installed():
-            self.unchanged_count += 1
+        if not installed:
             self.message = 'Package already uninstalled: {0}'.format(
-                self.current_package,
+                ', '.join(self.packages),
             )
             return True
 
         if self.module.check_mode:
             self.changed = True
             self.message = 'Package would be uninstalled: {0}'.format(
-                self.current_package
+                ', '.join(installed)
             )
             raise HomebrewException(self.message)
 
-        opts = (
-            [self.brew_path, 'uninstall']
-            + self.install_options
-            + [self.current_package]
-        )
-        cmd = [opt for opt in opts if opt]
-        rc, out, err = self.module.run_command(cmd)
+        rc, out, err = self._run_batch('uninstall', installed)
+        self._refresh_packages()
 
-        if not self._current_package_is_installed():
-            self.changed_count += 1
-            self.changed = True
-            self.message = 'Package uninstalled: {0}'.format(self.current_package)
-            return True
-        else:
+        failed = self._select_packages(
+            lambda: self.current_package in installed
+            and self._current_package_is_installed())
+        self.changed_count += len(installed) - len(failed)
+        self.changed = self.changed_count > 0
+        if failed:
             self.failed = True
-            self.message = err.strip()
+            self.message = err.strip() or 'Package not uninstalled: {0}'.format(
+                ', '.join(failed))
             raise HomebrewException(self.message)
 
-    def _uninstall_packages(self):
-        for package in self.packages:
-            self.current_package = package
-            self._uninstall_current_package()
-
+        self.message = 'Package uninstalled: {0}'.format(', '.join(installed))
         return True
     # /uninstalled ----------------------------- }}}
 
@@ -33,7 +33,8 @@ options:
     name:
         required: true
         description:
-        - Name of the package.
+        - Name of the package, or a list of packages which are then handled
+          with a single pkg_add or pkg_delete run.
     state:
         required: true
         choices: [ present, latest, absent ]
@@ -59,6 +60,9 @@ EXAMPLES = '''
 # Specify the default flavour to avoid ambiguity errors
 - openbsd_pkg: name=vim-- state=present
 
+# Make sure several packages are installed
+- openbsd_pkg: name=nmap,curl,vim--no_x11 state=present
+
 # Update all packages on the system
 - openbsd_pkg: name=* state=latest
 '''
@@ -71,95 +75,92 @@ def execute_command(cmd, module):
     cmd_args = shlex.split(cmd)
     return module.run_command(cmd_args)
 
-# Function used for getting the name of a currently installed package.
-def get_current_name(name, pkg_spec, module):
+# Function used for reading the installed packages once. Returns a
+# dictionary mapping every stem to a list of (name, version, flavor) tuples.
+def get_installed_packages(module):
     info_cmd = 'pkg_info'
     (rc, stdout, stderr) = execute_command("%s" % (info_cmd), module)
     if rc != 0:
-        return (rc, stdout, stderr)
-
-    if pkg_spec['version']:
-        pattern = "^%s" % name
-    elif pkg_spec['flavor']:
-        pattern = "^%s-.*-%s\s" % (pkg_spec['stem'], pkg_spec['flavor'])
-    else:
-        pattern = "^%s-" % pkg_spec['stem']
-
-    module.debug("get_current_name(): pattern = %s" % pattern)
+        module.fail_json(msg="failed in get_installed_packages(): " + (stderr or stdout))
 
+    installed = {}
     for line in stdout.splitlines():
-        module.debug("get_current_name: line = %s" % line)
-        match = re.search(pattern, line)
+        if not line.strip():
+            continue
+        current_name = line.split()[0]
+        match = re.search("^(?P<stem>.*?)-(?P<version>[0-9][^-]*)(-(?P<flavor>.*))?$", current_name)
         if match:
-            current_name = line.split()[0]
-
-    return current_name
-
-# Function used to find out if a package is currently installed.
-def get_package_state(name, pkg_spec, module):
-    info_cmd = 'pkg_info -e'
+            installed.setdefault(match.group('stem'), []).append(
+                (current_name, match.group('version'), match.group('flavor')))
 
-    if pkg_spec['version']:
-        command = "%s %s" % (info_cmd, name)
-    elif pkg_spec['flavor']:
-        command = "%s %s-*-%s" % (info_cmd, pkg_spec['stem'], pkg_spec['flavor'])
-    else:
-        command = "%s %s-*" % (info_cmd, pkg_spec['stem'])
+    module.debug("get_installed_packages(): %s package(s) installed" % sum(map(len, installed.values())))
+    return installed
 
-    rc, stdout, stderr = execute_command(command, module)
+# Function used for getting the name of a currently installed package.
+def get_current_name(name, pkg_spec, installed):
+    current_name = None
+    for (package, version, flavor) in installed.get(pkg_spec['stem'], []):
+        if pkg_spec['version']:
+            if version != pkg_spec['version'] or flavor != pkg_spec['flavor']:
+                continue
+        elif pkg_spec['flavor'] and flavor != pkg_spec['flavor']:
+            continue
+        current_name = package
 
-    if (stderr):
-        module.fail_json(msg="failed in get_package_state(): " + stderr)
+    return current_name
 
-    if rc == 0:
-        return True
-    else:
-        return False
+# Function used to find out if a package is currently installed.
+def get_package_state(name, pkg_spec, installed):
+    return get_current_name(name, pkg_spec, installed) is not None
 
-# Function used to make sure a package is present.
-def package_present(name, installed_state, pkg_spec, module):
+# Function used to make sure the packages are present.
+def package_present(names, installed_state, pkg_specs, module):
     if module.check_mode:
         install_cmd = 'pkg_add -Imn'
     else:
         install_cmd = 'pkg_add -Im'
 
-    if installed_state is False:
+    missing = [name for name in names if installed_state[name] is False]
 
-        # Attempt to install the package
-        (rc, stdout, stderr) = execute_command("%s %s" % (install_cmd, name), module)
+    if missing:
+        changed=False
 
-        # The behaviour of pkg_add is a bit different depending on if a
-        # specific version is supplied or not.
-        #
-        # When a specific version is supplied the return code will be 0 when
-        # a package is found and 1 when it is not, if a version is not
-        # supplied the tool will exit 0 in both cases:
-        if pkg_spec['version']:
-            # Depend on the return code.
-            module.debug("package_present(): depending on return code")
-            if rc:
+        # Attempt to install all missing packages at once.
+        (rc, stdout, stderr) = execute_command("%s %s" % (install_cmd, " ".join(missing)), module)
+
+        if not module.check_mode:
+            # The behaviour of pkg_add is a bit different depending on if a
+            # specific version is supplied or not: with a version the return
+            # code is 0 when a package is found and 1 when it is not, without
+            # one the tool exits 0 in both cases. With several packages in
+            # one run neither is conclusive, so check the package database
+            # for what actually got installed instead.
+            installed = get_installed_packages(module)
+            failed = [name for name in missing if not get_package_state(name, pkg_specs[name], installed)]
+            module.debug("package_present(): failed = %s" % failed)
+            if failed:
+                rc = 1
                 changed=False
-        else:
-            # Depend on stderr instead.
-            module.debug("package_present(): depending on stderr")
-            if stderr:
-                # There is a corner case where having an empty directory in
-                # installpath prior to the right location will result in a
-                # "file:/local/package/directory/ is empty" message on stderr
-                # while still installing the package, so we need to look for
-                # for a message like "packagename-1.0: ok" just in case.
-                match = re.search("\W%s-[^:]+: ok\W" % name, stdout)
-                if match:
-                    # It turns out we were able to install the package.
-                    module.debug("package_present(): we were able to install package")
-                    pass
-                else:
+            else:
+                rc = 0
+
+        # In check mode nothing gets installed, so depend on the return code
+        # for versioned packages and on the output for the others.
+        elif stderr:
+            # There is a corner case where having an empty directory in
+            # installpath prior to the right location will result in a
+            # "file:/local/package/directory/ is empty" message on stderr
+            # while still installing the package, so we need to look for
+            # for a message like "packagename-1.0: ok" just in case.
+            for name in missing:
+                if pkg_specs[name]['version']:
+                    continue
+                match = re.search("\W%s-[^:]+: ok\W" % re.escape(pkg_specs[name]['stem']), stdout)
+                if not match:
                     # We really did fail, fake the return code.
-                    module.debug("package_present(): we really did fail")
+                    module.debug("package_present(): we really did fail for %s" % name)
                     rc = 1
                     changed=False
-            else:
-                module.debug("package_present(): stderr was not set")
 
         if rc == 0:
             if module.check_mode:
@@ -175,36 +176,41 @@ def package_present(name, installed_state, pkg_spec, module):
 
     return (rc, stdout, stderr, changed)
 
-# Function used to make sure a package is the latest available version.
-def package_latest(name, installed_state, pkg_spec, module):
+# Function used to make sure the packages are the latest available version.
+def package_latest(names, installed_state, pkg_specs, installed, module):
     if module.check_mode:
         upgrade_cmd = 'pkg_add -umn'
     else:
         upgrade_cmd = 'pkg_add -um'
 
-    pre_upgrade_name = ''
+    # If some packages are not installed at all just make them present.
+    (rc, stdout, stderr, changed) = package_present(names, installed_state, pkg_specs, module)
+    if rc != 0:
+        return (rc, stdout, stderr, changed)
+
+    upgradable = [name for name in names if installed_state[name] is True]
 
-    if installed_state is True:
+    if upgradable:
 
-        # Fetch name of currently installed package.
-        pre_upgrade_name = get_current_name(name, pkg_spec, module)
+        # Fetch names of currently installed packages from the index.
+        pre_upgrade_names = [get_current_name(name, pkg_specs[name], installed) for name in upgradable]
 
-        module.debug("package_latest(): pre_upgrade_name = %s" % pre_upgrade_name)
+        module.debug("package_latest(): pre_upgrade_names = %s" % pre_upgrade_names)
 
-        # Attempt to upgrade the package.
-        (rc, stdout, stderr) = execute_command("%s %s" % (upgrade_cmd, name), module)
+        # Attempt to upgrade the packages.
+        (rc, upgrade_stdout, stderr) = execute_command("%s %s" % (upgrade_cmd, " ".join(upgradable)), module)
+        stdout += upgrade_stdout
 
         # Look for output looking something like "nmap-6.01->6.25: ok" to see if
         # something changed (or would have changed). Use \W to delimit the match
         # from progress meter output.
-        match = re.search("\W%s->.+: ok\W" % pre_upgrade_name, stdout)
-        if match:
-            if module.check_mode:
-                module.exit_json(changed=True)
+        for pre_upgrade_name in pre_upgrade_names:
+            match = re.search("\W%s->.+: ok\W" % re.escape(pre_upgrade_name), upgrade_stdout)
+            if match:
+                if module.check_mode:
+                    module.exit_json(changed=True)
 
-            changed = True
-        else:
-            changed = False
+                changed = True
 
         # FIXME: This part is problematic. Based on the issues mentioned (and
         # handled) in package_present() it is not safe to blindly trust stderr
@@ -219,24 +225,21 @@ def package_latest(name, installed_state, pkg_spec, module):
             if stderr:
                 rc=1
 
-        return (rc, stdout, stderr, changed)
-
-    else:
-        # If package was not installed at all just make it present.
-        module.debug("package_latest(): package is not installed, calling package_present()")
-        return package_present(name, installed_state, pkg_spec, module)
+    return (rc, stdout, stderr, changed)
 
-# Function used to make sure a package is not installed.
-def package_absent(name, installed_state, module):
+# Function used to make sure the packages are not installed.
+def package_absent(names, installed_state, module):
     if module.check_mode:
         remove_cmd = 'pkg_delete -In'
     else:
         remove_cmd = 'pkg_delete -I'
 
-    if installed_state is True:
+    present = [name for name in names if installed_state[name] is True]
 
-        # Attempt to remove the package.
-        rc, stdout, stderr = execute_command("%s %s" % (remove_cmd, name), module)
+    if present:
+
+        # Attempt to remove all packages at once.
+        rc, stdout, stderr = execute_command("%s %s" % (remove_cmd, " ".join(present)), module)
 
         if rc == 0:
             if module.check_mode:
@@ -346,7 +349,7 @@ def upgrade_packages(module):
 def main():
     module = AnsibleModule(
         argument_spec = dict(
-            name = dict(required=True),
+            name = dict(required=True, type='list'),
             state = dict(required=True, choices=['absent', 'installed', 'latest', 'present', 'removed']),
         ),
         supports_check_mode = True
@@ -362,27 +365,32 @@ def main():
     result['name'] = name
     result['state'] = state
 
-    if name == '*':
-        if state != 'latest':
+    if '*' in name:
+        if state != 'latest' or len(name) > 1:
             module.fail_json(msg="the package name '*' is only valid when using state=latest")
         else:
             # Perform an upgrade of all installed packages.
             (rc, stdout, stderr, changed) = upgrade_packages(module)
     else:
-        # Parse package name and put results in the pkg_spec dictionary.
-        pkg_spec = {}
-        parse_package_name(name, pkg_spec, module)
-
-        # Get package state.
-        installed_state = get_package_state(name, pkg_spec, module)
+        # Parse package names and put results in the pkg_specs dictionary.
+        pkg_specs = {}
+        for package in name:
+            pkg_specs[package] = {}
+            parse_package_name(package, pkg_specs[package], module)
+
+        # Get package state from a single index of the installed packages.
+        installed = get_installed_packages(module)
+        installed_state = {}
+        for package in name:
+            installed_state[package] = get_package_state(package, pkg_specs[package], installed)
 
         # Perform requested action.
         if state in ['installed', 'present']:
-            (rc, stdout, stderr, changed) = package_present(name, installed_state, pkg_spec, module)
+            (rc, stdout, stderr, changed) = package_present(name, installed_state, pkg_specs, module)
         elif state in ['absent', 'removed']:
             (rc, stdout, stderr, changed) = package_absent(name, installed_state, module)
         elif state == 'latest':
-            (rc, stdout, stderr, changed) = package_latest(name, installed_state, pkg_spec, module)
+            (rc, stdout, stderr, changed) = package_latest(name, installed_state, pkg_specs, installed, module)
 
     if rc != 0:
         if stderr:
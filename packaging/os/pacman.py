@@ -115,38 +115,45 @@ import os
 import re
 import sys
 
-def get_version(pacman_output):
-    """Take pacman -Qi or pacman -Si output and get the Version"""
-    lines = pacman_output.split('\n')
-    for line in lines:
-        if 'Version' in line:
-            return line.split(':')[1].strip()
-    return None
-
-def query_package(module, pacman_path, name, state="present"):
+def get_package_versions(module, pacman_path):
+    """Read the state of the local and the sync databases once. Returns two dictionaries mapping package names to the installed and the available version."""
+    rc, stdout, stderr = module.run_command("%s -Q" % (pacman_path), check_rc=False)
+    if rc != 0:
+        module.fail_json(msg="could not list installed packages", stderr=stderr)
+    local = {}
+    for line in stdout.splitlines():
+        fields = line.split()
+        if len(fields) >= 2:
+            local[fields[0]] = fields[1]
+
+    # pacman -Sl prints "repo name version [installed]", the first repository
+    # listing a package wins just like it does for pacman -S
+    rc, stdout, stderr = module.run_command("%s -Sl" % (pacman_path), check_rc=False)
+    if rc != 0:
+        module.fail_json(msg="could not list sync database packages", stderr=stderr)
+    sync = {}
+    for line in stdout.splitlines():
+        fields = line.split()
+        if len(fields) >= 3:
+            sync.setdefault(fields[1], fields[2])
+            sync.setdefault('%s/%s' % (fields[0], fields[1]), fields[2])
+    return local, sync
+
+def query_package(versions, name):
     """Query the package status in both the local system and the repository. Returns a boolean to indicate if the package is installed, and a second boolean to indicate if the package is up-to-date."""
-    if state == "present":
-        lcmd = "%s -Qi %s" % (pacman_path, name)
-        lrc, lstdout, lstderr = module.run_command(lcmd, check_rc=False)
-        if lrc != 0:
-            # package is not installed locally
-            return False, False
-
-        # get the version installed locally (if any)
-        lversion = get_version(lstdout)
-
-        rcmd = "%s -Si %s" % (pacman_path, name)
-        rrc, rstdout, rstderr = module.run_command(rcmd, check_rc=False)
-        # get the version in the repository
-        rversion = get_version(rstdout)
-
-        if rrc == 0:
-            # Return True to indicate that the package is installed locally, and the result of the version number comparison
-            # to determine if the package is up-to-date.
-            return True, (lversion == rversion)
-
+    local, sync = versions
+    lversion = local.get(name.split('/')[-1])
+    if lversion is None:
+        # package is not installed locally
         return False, False
 
+    rversion = sync.get(name)
+    if rversion is None:
+        # package is not in any repository (e.g. installed from a file)
+        return True, True
+
+    return True, (lversion == rversion)
+
 
 def update_package_db(module, pacman_path):
     cmd = "%s -Sy" % (pacman_path)
@@ -174,73 +181,70 @@ def upgrade(module, pacman_path):
     else:
         module.exit_json(changed=False, msg='Nothing to upgrade')
 
-def remove_packages(module, pacman_path, packages):
+def remove_packages(module, pacman_path, versions, packages):
+    args = "R"
     if module.params["recurse"]:
-        args = "Rs"
-    else:
-        args = "R"
-
-def remove_packages(module, pacman_path, packages):
+        args += "s"
     if module.params["force"]:
-        args = "Rdd"
-    else:
-        args = "R"
+        args += "dd"
 
-    remove_c = 0
-    # Using a for loop incase of error, we can report the package that failed
+    to_remove = []
     for package in packages:
         # Query the package first, to see if we even need to remove
-        installed, updated = query_package(module, pacman_path, package)
-        if not installed:
-            continue
+        installed, updated = query_package(versions, package)
+        if installed and package not in to_remove:
+            to_remove.append(package)
 
-        cmd = "%s -%s %s --noconfirm" % (pacman_path, args, package)
-        rc, stdout, stderr = module.run_command(cmd, check_rc=False)
+    if not to_remove:
+        module.exit_json(changed=False, msg="package(s) already absent")
 
-        if rc != 0:
-            module.fail_json(msg="failed to remove %s" % (package))
-
-        remove_c += 1
-
-    if remove_c > 0:
+    # remove everything in a single transaction
+    cmd = "%s -%s %s --noconfirm" % (pacman_path, args, " ".join(to_remove))
+    rc, stdout, stderr = module.run_command(cmd, check_rc=False)
 
-        module.exit_json(changed=True, msg="removed %s package(s)" % remove_c)
+    if rc != 0:
+        module.fail_json(msg="failed to remove %s" % (" ".join(to_remove)), stdout=stdout, stderr=stderr)
 
-    module.exit_json(changed=False, msg="package(s) already absent")
+    module.exit_json(changed=True, msg="removed %s package(s)" % len(to_remove))
 
 
-def install_packages(module, pacman_path, state, packages, package_files):
-    install_c = 0
+def install_packages(module, pacman_path, versions, state, packages, package_files):
+    to_install = []
+    to_upgrade_files = []
 
     for i, package in enumerate(packages):
         # if the package is installed and state == present or state == latest and is up-to-date then skip
-        installed, updated = query_package(module, pacman_path, package)
+        installed, updated = query_package(versions, package)
         if installed and (state == 'present' or (state == 'latest' and updated)):
             continue
 
         if package_files[i]:
-            params = '-U %s' % package_files[i]
-        else:
-            params = '-S %s' % package
-
-        cmd = "%s %s --noconfirm" % (pacman_path, params)
+            to_upgrade_files.append(package_files[i])
+        elif package not in to_install:
+            to_install.append(package)
+
+    # repository packages and package files need one transaction each, as
+    # pacman does not accept both -S and -U in the same invocation
+    for params, targets in (('-S', to_install), ('-U', to_upgrade_files)):
+        if not targets:
+            continue
+        cmd = "%s %s %s --noconfirm" % (pacman_path, params, " ".join(targets))
         rc, stdout, stderr = module.run_command(cmd, check_rc=False)
 
         if rc != 0:
-            module.fail_json(msg="failed to install %s" % (package))
-
-        install_c += 1
+            module.fail_json(msg="failed to install %s" % (" ".join(targets)), stdout=stdout, stderr=stderr)
 
+    install_c = len(to_install) + len(to_upgrade_files)
     if install_c > 0:
         module.exit_json(changed=True, msg="installed %s package(s)" % (install_c))
 
     module.exit_json(changed=False, msg="package(s) already installed")
 
 
-def check_packages(module, pacman_path, packages, state):
+def check_packages(module, versions, packages, state):
     would_be_changed = []
     for package in packages:
-        installed, updated = query_package(module, pacman_path, package)
+        installed, updated = query_package(versions, package)
         if ((state in ["present", "latest"] and not installed) or
                 (state == "absent" and installed) or
                 (state == "latest" and not updated)):
@@ -304,13 +308,15 @@ def main():
             else:
                 pkg_files.append(None)
 
+        versions = get_package_versions(module, pacman_path)
+
         if module.check_mode:
-            check_packages(module, pacman_path, pkgs, p['state'])
+            check_packages(module, versions, pkgs, p['state'])
 
         if p['state'] in ['present', 'latest']:
-            install_packages(module, pacman_path, p['state'], pkgs, pkg_files)
+            install_packages(module, pacman_path, versions, p['state'], pkgs, pkg_files)
         elif p['state'] == 'absent':
-            remove_packages(module, pacman_path, pkgs)
+            remove_packages(module, pacman_path, versions, pkgs)
 
 # import module snippets
 from ansible.module_utils.basic import *
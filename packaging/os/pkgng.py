@@ -90,15 +90,37 @@ import shlex
 import os
 import re
 import sys
-
-def query_package(module, pkgng_path, name, rootdir_arg):
-
-    rc, out, err = module.run_command("%s %s info -g -e %s" % (pkgng_path, rootdir_arg, name))
-
-    if rc == 0:
-        return True
-
-    return False
+import fnmatch
+
+def query_packages(module, pkgng_path, rootdir_arg):
+    # Take a snapshot of the installed packages with a single query instead
+    # of one "pkg info" per package.
+    rc, out, err = module.run_command("%s %s query -a '%%n %%o %%v'" % (pkgng_path, rootdir_arg))
+
+    if rc != 0:
+        module.fail_json(msg="could not query installed packages: %s" % out, stderr=err)
+
+    installed = []
+    for line in out.splitlines():
+        fields = line.split()
+        if len(fields) == 3:
+            installed.append(tuple(fields))
+
+    return installed
+
+def matching_packages(installed, package):
+    # Like "pkg info -g -e", match the glob against the name, the origin and
+    # the name-version of every installed package.
+    matches = []
+    for name, origin, version in installed:
+        for candidate in (name, origin, "%s-%s" % (name, version)):
+            if fnmatch.fnmatchcase(candidate, package):
+                matches.append(name)
+                break
+    return matches
+
+def query_package(installed, package):
+    return len(matching_packages(installed, package)) > 0
 
 def pkgng_older_than(module, pkgng_path, compare_version):
 
@@ -118,32 +140,27 @@ def pkgng_older_than(module, pkgng_path, compare_version):
 
 
 def remove_packages(module, pkgng_path, packages, rootdir_arg):
-    
-    remove_c = 0
-    # Using a for loop incase of error, we can report the package that failed
-    for package in packages:
-        # Query the package first, to see if we even need to remove
-        if not query_package(module, pkgng_path, package, rootdir_arg):
-            continue
 
-        if not module.check_mode:
-            rc, out, err = module.run_command("%s %s delete -y %s" % (pkgng_path, rootdir_arg, package))
+    installed = query_packages(module, pkgng_path, rootdir_arg)
 
-        if not module.check_mode and query_package(module, pkgng_path, package, rootdir_arg):
-            module.fail_json(msg="failed to remove %s: %s" % (package, out))
-    
-        remove_c += 1
+    # Query the packages first, to see if we even need to remove
+    to_remove = [package for package in packages if query_package(installed, package)]
 
-    if remove_c > 0:
+    if not to_remove:
+        return (False, "package(s) already absent")
 
-        return (True, "removed %s package(s)" % remove_c)
+    if not module.check_mode:
+        rc, out, err = module.run_command("%s %s delete -g -y %s" % (pkgng_path, rootdir_arg, " ".join(to_remove)))
 
-    return (False, "package(s) already absent")
+        installed = query_packages(module, pkgng_path, rootdir_arg)
+        failed = [package for package in to_remove if query_package(installed, package)]
+        if failed:
+            module.fail_json(msg="failed to remove %s: %s" % (" ".join(failed), out), stderr=err)
 
+    return (True, "removed %s package(s)" % len(to_remove))
 
-def install_packages(module, pkgng_path, packages, cached, pkgsite, rootdir_arg):
 
-    install_c = 0
+def install_packages(module, pkgng_path, packages, cached, pkgsite, rootdir_arg):
 
     # as of pkg-1.1.4, PACKAGESITE is deprecated in favor of repository definitions
     # in /usr/local/etc/pkg/repos
@@ -165,36 +182,53 @@ def install_packages(module, pkgng_path, packages, cached, pkgsite, rootdir_arg)
         if rc != 0:
             module.fail_json(msg="Could not update catalogue")
 
-    for package in packages:
-        if query_package(module, pkgng_path, package, rootdir_arg):
-            continue
-
-        if not module.check_mode:
-            if old_pkgng:
-                rc, out, err = module.run_command("%s %s %s install -g -U -y %s" % (batch_var, pkgsite, pkgng_path, package))
-            else:
-                rc, out, err = module.run_command("%s %s %s install %s -g -U -y %s" % (batch_var, pkgng_path, rootdir_arg, pkgsite, package))
+    installed = query_packages(module, pkgng_path, rootdir_arg)
+    to_install = [package for package in packages if not query_package(installed, package)]
 
-        if not module.check_mode and not query_package(module, pkgng_path, package, rootdir_arg):
-            module.fail_json(msg="failed to install %s: %s" % (package, out), stderr=err)
-
-        install_c += 1
-    
-    if install_c > 0:
-        return (True, "added %s package(s)" % (install_c))
+    if not to_install:
+        return (False, "package(s) already present")
 
-    return (False, "package(s) already present")
-
-def annotation_query(module, pkgng_path, package, tag, rootdir_arg):
-    rc, out, err = module.run_command("%s %s info -g -A %s" % (pkgng_path, rootdir_arg, package))
-    match = re.search(r'^\s*(?P<tag>%s)\s*:\s*(?P<value>\w+)' % tag, out, flags=re.MULTILINE)
-    if match:
-        return match.group('value')
+    # install the whole delta with a single solver run
+    if not module.check_mode:
+        if old_pkgng:
+            rc, out, err = module.run_command("%s %s %s install -g -U -y %s" % (batch_var, pkgsite, pkgng_path, " ".join(to_install)))
+        else:
+            rc, out, err = module.run_command("%s %s %s install %s -g -U -y %s" % (batch_var, pkgng_path, rootdir_arg, pkgsite, " ".join(to_install)))
+
+        installed = query_packages(module, pkgng_path, rootdir_arg)
+        failed = [package for package in to_install if not query_package(installed, package)]
+        if failed:
+            module.fail_json(msg="failed to install %s: %s" % (" ".join(failed), out), stderr=err)
+
+    return (True, "added %s package(s)" % (len(to_install)))
+
+def query_annotations(module, pkgng_path, rootdir_arg):
+    # Read the annotations of every installed package with a single query,
+    # as a list of (name, origin, version) tuples and a dictionary mapping
+    # every package name to its annotations.
+    installed = query_packages(module, pkgng_path, rootdir_arg)
+    rc, out, err = module.run_command("%s %s query -a '%%n %%At %%Av'" % (pkgng_path, rootdir_arg))
+    if rc != 0:
+        module.fail_json(msg="could not query annotations: %s" % out, stderr=err)
+
+    annotations = {}
+    for line in out.splitlines():
+        fields = line.split(None, 2)
+        if len(fields) == 3:
+            annotations.setdefault(fields[0], {})[fields[1]] = fields[2]
+
+    return installed, annotations
+
+def annotation_query(snapshot, package, tag):
+    installed, annotations = snapshot
+    for name in matching_packages(installed, package):
+        if tag in annotations.get(name, {}):
+            return annotations[name][tag]
     return False
 
 
-def annotation_add(module, pkgng_path, package, tag, value, rootdir_arg):
-    _value = annotation_query(module, pkgng_path, package, tag, rootdir_arg)
+def annotation_add(module, pkgng_path, snapshot, package, tag, value, rootdir_arg):
+    _value = annotation_query(snapshot, package, tag)
     if not _value:
         # Annotation does not exist, add it.
         rc, out, err = module.run_command('%s %s annotate -y -A %s %s "%s"'
@@ -213,8 +247,8 @@ def annotation_add(module, pkgng_path, package, tag, value, rootdir_arg):
         # Annotation exists, nothing to do
         return False
 
-def annotation_delete(module, pkgng_path, package, tag, value, rootdir_arg):
-    _value = annotation_query(module, pkgng_path, package, tag, rootdir_arg)
+def annotation_delete(module, pkgng_path, snapshot, package, tag, value, rootdir_arg):
+    _value = annotation_query(snapshot, package, tag)
     if _value:
         rc, out, err = module.run_command('%s %s annotate -y -D %s %s'
             % (pkgng_path, rootdir_arg, package, tag))
@@ -224,8 +258,8 @@ def annotation_delete(module, pkgng_path, package, tag, value, rootdir_arg):
         return True
     return False
 
-def annotation_modify(module, pkgng_path, package, tag, value, rootdir_arg):
-    _value = annotation_query(module, pkgng_path, package, tag, rootdir_arg)
+def annotation_modify(module, pkgng_path, snapshot, package, tag, value, rootdir_arg):
+    _value = annotation_query(snapshot, package, tag)
     if not value:
         # No such tag
         module.fail_json("could not change annotation to %s: tag %s does not exist"
@@ -255,9 +289,11 @@ def annotate_packages(module, pkgng_path, packages, annotation, rootdir_arg):
         ':': annotation_modify
     }
 
+    snapshot = query_annotations(module, pkgng_path, rootdir_arg)
+
     for package in packages:
         for _annotation in annotations:
-            if operation[_annotation['operation']](module, pkgng_path, package, _annotation['tag'], _annotation['value']):
+            if operation[_annotation['operation']](module, pkgng_path, snapshot, package, _annotation['tag'], _annotation['value'], rootdir_arg):
                 annotate_c += 1
 
     if annotate_c > 0:
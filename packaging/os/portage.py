@@ -191,7 +191,99 @@ def query_package(module, package, action):
     return query_atom(module, package, action)
 
 
+VDB_PATH = '/var/db/pkg'
+
+# package-version as in PMS, e.g. foo-bar-1.2.3a_rc1_p2-r3
+VERSION_RE = re.compile(
+    r'^(?P<pn>.+?)-(?P<version>\d+(?:\.\d+)*[a-z]?'
+    r'(?:_(?:alpha|beta|pre|rc|p)\d*)*(?:-r\d+)?)$'
+)
+
+# atoms matched against the VDB index, anything fancier (version ranges,
+# wildcards, USE dependencies, blockers) is left to equery
+SIMPLE_ATOM_RE = re.compile(
+    r'^(?P<op>[=~])?(?P<cp>(?:[\w+][\w+.-]*/)?[\w+][\w+-]*?)'
+    r'(?:-(?P<version>\d[^:*]*))?'
+    r'(?::(?P<slot>[\w+][\w+.-]*(?:/[\w+][\w+.-]*)?))?'
+    r'(?:::(?P<repo>[\w-]+))?$'
+)
+
+
+def read_vdb(module):
+    """Index the installed packages once, as a dictionary mapping every
+    category/package to a list of (version, slot, repository) tuples."""
+    if getattr(module, 'vdb', None) is not None:
+        return module.vdb
+
+    vdb = {}
+    if not os.path.isdir(VDB_PATH):
+        module.vdb = False
+        return False
+
+    for category in os.listdir(VDB_PATH):
+        category_path = os.path.join(VDB_PATH, category)
+        if category.startswith('.') or not os.path.isdir(category_path):
+            continue
+        for pf in os.listdir(category_path):
+            match = VERSION_RE.match(pf)
+            if pf.startswith('-') or not match:
+                continue
+            entry = []
+            for name in ['SLOT', 'repository']:
+                try:
+                    f = open(os.path.join(category_path, pf, name))
+                    entry.append(f.read().strip())
+                    f.close()
+                except IOError:
+                    entry.append('')
+            vdb.setdefault('%s/%s' % (category, match.group('pn')), []).append(
+                (match.group('version'), entry[0], entry[1]))
+
+    module.vdb = vdb
+    return vdb
+
+
+def match_vdb(vdb, atom):
+    """Match a simple atom against the VDB index. Returns None when the
+    atom is too complex to be matched in-process."""
+    match = SIMPLE_ATOM_RE.match(atom)
+    if not match:
+        return None
+    op, cp, version = match.group('op'), match.group('cp'), match.group('version')
+    if bool(op) != bool(version):
+        return None
+
+    if '/' in cp:
+        candidates = vdb.get(cp, [])
+    else:
+        candidates = []
+        for key, installed in vdb.iteritems():
+            if key.split('/', 1)[1] == cp:
+                candidates.extend(installed)
+
+    for installed_version, slot, repo in candidates:
+        if op == '=' and installed_version != version:
+            continue
+        if op == '~' and re.sub(r'-r\d+$', '', installed_version) != version:
+            continue
+        if match.group('slot') and match.group('slot') not in (slot, slot.split('/')[0]):
+            continue
+        if match.group('repo') and match.group('repo') != repo:
+            continue
+        return True
+    return False
+
+
 def query_atom(module, atom, action):
+    vdb = read_vdb(module)
+    if vdb is not False:
+        installed = match_vdb(vdb, atom)
+        if installed is not None:
+            return installed
+
+    if not module.equery_path:
+        module.fail_json(msg='equery is required to query %s' % atom)
+
     cmd = '%s list %s' % (module.equery_path, atom)
 
     rc, out, err = module.run_command(cmd)
@@ -215,14 +307,15 @@ def query_set(module, set, action):
             module.fail_json(msg='set %s cannot be removed' % set)
         return False
 
-    world_sets_path = '/var/lib/portage/world_sets'
-    if not os.path.exists(world_sets_path):
-        return False
-
-    cmd = 'grep %s %s' % (set, world_sets_path)
+    if getattr(module, 'world_sets', None) is None:
+        module.world_sets = []
+        world_sets_path = '/var/lib/portage/world_sets'
+        if os.path.exists(world_sets_path):
+            f = open(world_sets_path)
+            module.world_sets = [line.strip() for line in f]
+            f.close()
 
-    rc, out, err = module.run_command(cmd)
-    return rc == 0
+    return set in module.world_sets
 
 
 def sync_repositories(module, webrsync=False):
@@ -240,9 +333,10 @@ def sync_repositories(module, webrsync=False):
         module.fail_json(msg='could not sync package repositories')
 
 
-# Note: In the 3 functions below, equery is done one-by-one, but emerge is done
-# in one go. If that is not desirable, split the packages into multiple tasks
-# instead of joining them together with comma.
+# Note: In the 3 functions below, packages are looked up in an index of the
+# VDB read once per run (equery is only used for atoms too complex for it) and
+# emerge is done in one go. If that is not desirable, split the packages into
+# multiple tasks instead of joining them together with comma.
 
 
 def emerge_packages(module, packages):
@@ -423,7 +517,7 @@ def main():
     )
 
     module.emerge_path = module.get_bin_path('emerge', required=True)
-    module.equery_path = module.get_bin_path('equery', required=True)
+    module.equery_path = module.get_bin_path('equery', required=False)
 
     p = module.params
 
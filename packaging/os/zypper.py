@@ -27,6 +27,7 @@
 # along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
 
 import re
+import struct
 
 DOCUMENTATION = '''
 ---
@@ -109,73 +110,109 @@ def zypper_version(module):
     else:
         return rc, stderr
 
-# Function used for getting versions of currently installed packages.
-def get_current_version(m, packages):
-    cmd = ['/bin/rpm', '-q', '--qf', '%{NAME} %{VERSION}-%{RELEASE}\n']
-    cmd.extend(packages)
+# Function used for reading the installed packages with a single rpm query.
+# Returns a dictionary mapping every installed package name to the sorted
+# list of its VERSION-RELEASE.ARCH strings.
+def get_installed_packages(m, packages=None):
+    cmd = ['/bin/rpm', '--query', '--qf', '%{NAME} %{VERSION} %{RELEASE} %{ARCH}\n']
+    if packages is None:
+        cmd.append('--all')
+    else:
+        cmd.extend(packages)
 
     rc, stdout, stderr = m.run_command(cmd, check_rc=False)
+    if packages is None and rc != 0:
+        m.fail_json(msg="failed to query the rpm database: %s" % stderr)
 
-    current_version = {}
-    rpmoutput_re = re.compile('^(\S+) (\S+)$')
-
+    installed = {}
+    rpmoutput_re = re.compile('^(\S+) (\S+) (\S+) (\S+)$')
     for stdoutline in stdout.splitlines():
         match = rpmoutput_re.match(stdoutline)
         if match == None:
-            return None
-        package = match.group(1)
-        version = match.group(2)
-        current_version[package] = version
-
-    for package in packages:
-        if package not in current_version:
-            print package + ' was not returned by rpm \n'
-            return None
-
-    return current_version
-
+            continue
+        name, version, release, arch = match.groups()
+        installed.setdefault(name, []).append('%s-%s.%s' % (version, release, arch))
+
+    for versions in installed.values():
+        versions.sort()
+    return installed
+
+# Function used for looking up the name of the installed package a package
+# specifier (name, name.arch, name-version, name-version-release...) refers to.
+def get_installed_name(installed, package):
+    if package in installed:
+        return package
+    for name, versions in installed.items():
+        if not package.startswith(name):
+            continue
+        for version in versions:
+            evr, arch = version.rsplit('.', 1)
+            if package in ('%s.%s' % (name, arch), '%s-%s' % (name, evr), '%s-%s' % (name, version),
+                           '%s-%s' % (name, evr.rsplit('-', 1)[0])):
+                return name
+    return None
+
+# Function used for reading the package name from the header of a local rpm
+# file, without forking rpm for every file.
+def get_rpm_file_name(m, package):
+    RPMTAG_NAME = 1000
+    try:
+        f = open(package, 'rb')
+        try:
+            # skip the lead, then the signature header which is padded to
+            # 8 bytes, to get to the main header
+            if f.read(4) != '\xed\xab\xee\xdb':
+                raise ValueError('not an rpm file')
+            f.seek(96)
+            for header in ('signature', 'main'):
+                magic, nindex, hsize = struct.unpack('>4s4xII', f.read(16))
+                if magic != '\x8e\xad\xe8\x01':
+                    raise ValueError('bad rpm header')
+                if header == 'signature':
+                    f.seek(nindex * 16 + hsize + (8 - hsize % 8) % 8, 1)
+            index = f.read(nindex * 16)
+            store = f.read(hsize)
+        finally:
+            f.close()
+        for i in range(nindex):
+            tag, type_, offset, count = struct.unpack('>IIII', index[i * 16:(i + 1) * 16])
+            if tag == RPMTAG_NAME:
+                return store[offset:store.index('\0', offset)]
+    except (IOError, ValueError, struct.error):
+        pass
+
+    # remote or unreadable package, let rpm have a look at it
+    cmd = ['/bin/rpm', '--query', '--qf', '%{NAME}', '--package', package]
+    rc, stdout, stderr = m.run_command(cmd, check_rc=False)
+    return stdout
 
 # Function used to find out if a package is currently installed.
-def get_package_state(m, packages):
-    for i in range(0, len(packages)):
+# Returns a dictionary mapping every requested package to the name of the
+# installed package it refers to, or None if it is not installed, and a
+# dictionary mapping rpm files to the name of the package they contain.
+def get_package_state(m, packages, installed):
+    installed_state = {}
+    rpm_names = {}
+    for package in packages:
         # Check state of a local rpm-file
-        if ".rpm" in packages[i]:
+        if ".rpm" in package:
             # Check if rpm file is available
-            package = packages[i]
             if not os.path.isfile(package) and not '://' in package:
                 stderr = "No Package file matching '%s' found on system" % package
                 m.fail_json(msg=stderr)
             # Get packagename from rpm file
-            cmd = ['/bin/rpm', '--query', '--qf', '%{NAME}', '--package']
-            cmd.append(package)
-            rc, stdout, stderr = m.run_command(cmd, check_rc=False)
-            packages[i] = stdout
-
-    cmd = ['/bin/rpm', '--query', '--qf', 'package %{NAME} is installed\n']
-    cmd.extend(packages)
-
-    rc, stdout, stderr = m.run_command(cmd, check_rc=False)
-
-    installed_state = {}
-    rpmoutput_re = re.compile('^package (\S+) (.*)$')
-    for stdoutline in stdout.splitlines():
-        match = rpmoutput_re.match(stdoutline)
-        if match == None:
-            continue
-        package = match.group(1)
-        result = match.group(2)
-        if result == 'is installed':
-            installed_state[package] = True
+            rpm_names[package] = get_rpm_file_name(m, package)
+            installed_state[package] = get_installed_name(installed, rpm_names[package])
         else:
-            installed_state[package] = False
+            installed_state[package] = get_installed_name(installed, package)
 
-    return installed_state
+    return installed_state, rpm_names
 
 # Function used to make sure a package is present.
 def package_present(m, name, installed_state, package_type, disable_gpg_check, disable_recommends, old_zypper):
     packages = []
     for package in name:
-        if package not in installed_state or installed_state[package] is False:
+        if installed_state.get(package) is None:
             packages.append(package)
     if len(packages) != 0:
         cmd = ['/usr/bin/zypper', '--non-interactive']
@@ -202,7 +239,7 @@ def package_present(m, name, installed_state, package_type, disable_gpg_check, d
     return (rc, stdout, stderr, changed)
 
 # Function used to make sure a package is the latest available version.
-def package_latest(m, name, installed_state, package_type, disable_gpg_check, disable_recommends, old_zypper):
+def package_latest(m, name, installed, installed_state, rpm_names, package_type, disable_gpg_check, disable_recommends, old_zypper):
 
     # first of all, make sure all the packages are installed
     (rc, stdout, stderr, changed) = package_present(m, name, installed_state, package_type, disable_gpg_check, disable_recommends, old_zypper)
@@ -212,9 +249,11 @@ def package_latest(m, name, installed_state, package_type, disable_gpg_check, di
     if rc:
         return (rc, stdout, stderr, changed)
 
-    # if we've already made a change, we don't have to check whether a version changed
+    # if we've already made a change, we don't have to check whether a version changed,
+    # otherwise the versions from the initial snapshot are compared to the new ones
     if not changed:
-        pre_upgrade_versions = get_current_version(m, name)
+        names = [installed_state[package] for package in name]
+        pre_upgrade_versions = dict((n, installed.get(n)) for n in names)
 
     cmd = ['/usr/bin/zypper', '--non-interactive']
 
@@ -226,23 +265,23 @@ def package_latest(m, name, installed_state, package_type, disable_gpg_check, di
     else:
         cmd.extend(['update', '--auto-agree-with-licenses', '-t', package_type])
 
-    cmd.extend(name)
+    cmd.extend([rpm_names.get(package, package) for package in name])
     rc, stdout, stderr = m.run_command(cmd, check_rc=False)
 
     # if we've already made a change, we don't have to check whether a version changed
     if not changed:
-        post_upgrade_versions = get_current_version(m, name)
-        if pre_upgrade_versions != post_upgrade_versions:
+        post_upgrade_versions = get_installed_packages(m, names)
+        if pre_upgrade_versions != dict((n, post_upgrade_versions.get(n)) for n in names):
             changed = True
 
     return (rc, stdout, stderr, changed)
 
 # Function used to make sure a package is not installed.
-def package_absent(m, name, installed_state, package_type, old_zypper):
+def package_absent(m, name, installed_state, rpm_names, package_type, old_zypper):
     packages = []
     for package in name:
-        if package not in installed_state or installed_state[package] is True:
-            packages.append(package)
+        if installed_state.get(package) is not None:
+            packages.append(rpm_names.get(package, package))
     if len(packages) != 0:
         cmd = ['/usr/bin/zypper', '--non-interactive', 'remove', '-t', package_type]
         cmd.extend(packages)
@@ -298,16 +337,18 @@ def main():
     else:
         old_zypper = True
 
-    # Get package state
-    installed_state = get_package_state(module, name)
+    # Get package state, the installed packages are read once and the
+    # snapshot is shared by all states
+    installed = get_installed_packages(module)
+    installed_state, rpm_names = get_package_state(module, name, installed)
 
     # Perform requested action
     if state in ['installed', 'present']:
         (rc, stdout, stderr, changed) = package_present(module, name, installed_state, type_, disable_gpg_check, disable_recommends, old_zypper)
     elif state in ['absent', 'removed']:
-        (rc, stdout, stderr, changed) = package_absent(module, name, installed_state, type_, old_zypper)
+        (rc, stdout, stderr, changed) = package_absent(module, name, installed_state, rpm_names, type_, old_zypper)
     elif state == 'latest':
-        (rc, stdout, stderr, changed) = package_latest(module, name, installed_state, type_, disable_gpg_check, disable_recommends, old_zypper)
+        (rc, stdout, stderr, changed) = package_latest(module, name, installed, installed_state, rpm_names, type_, disable_gpg_check, disable_recommends, old_zypper)
 
     if rc != 0:
         if stderr:
@@ -21,11 +21,25 @@
 # import module snippets
 from ansible.module_utils.basic import *
 
+import shlex
+import socket
+import struct
+
 BINS = dict(
     ipv4='iptables',
     ipv6='ip6tables',
 )
 
+SAVE_BINS = dict(
+    ipv4='iptables-save',
+    ipv6='ip6tables-save',
+)
+
+RESTORE_BINS = dict(
+    ipv4='iptables-restore',
+    ipv6='ip6tables-restore',
+)
+
 DOCUMENTATION = '''
 ---
 module: iptables
@@ -43,6 +57,11 @@ notes:
   - This module just deals with individual rules. If you need advanced
     chaining of rules the recommended way is to template the iptables restore
     file.
+  - With I(rules) the table is read once with iptables-save, the rules are
+    compared in-process and all changes are applied in a single
+    iptables-restore --noflush transaction. Rules are compared on the
+    options this module supports, so rules of the chain using other match
+    options are never considered equal to a listed rule.
 options:
   table:
     description:
@@ -212,6 +231,25 @@ options:
     description:
       - "Specifies the maximum average number of matches to allow per second. The number can specify units explicitly, using `/second', `/minute', `/hour' or `/day', or parts of them (so `5/second' is the same as `5/s')."
     required: false
+  rules:
+    description:
+      - "A list of rules for I(chain), applied as one transaction instead of
+        one iptables call per rule. Every item is a dictionary of the rule
+        options of this module (protocol, source, destination, match, jump,
+        goto, in_interface, out_interface, fragment, set_counters,
+        source_port, destination_port, to_ports, comment, ctstate, limit)
+        and may set its own state, which defaults to I(state). Missing
+        rules are appended in list order."
+    required: false
+    version_added: "2.1"
+  purge_rules:
+    description:
+      - "Together with I(rules), remove every rule of I(chain) that is not
+        listed."
+    required: false
+    default: false
+    choices: [ "yes", "no" ]
+    version_added: "2.1"
 '''
 
 EXAMPLES = '''
@@ -226,6 +264,17 @@ EXAMPLES = '''
 # Allow related and established connections
 - iptables: chain=INPUT ctstate=ESTABLISHED,RELATED jump=ACCEPT
   become: yes
+
+# Manage a whole chain in a single iptables-restore transaction
+- iptables:
+    chain: INPUT
+    purge_rules: yes
+    rules:
+      - { ctstate: [ 'ESTABLISHED', 'RELATED' ], jump: ACCEPT }
+      - { protocol: tcp, destination_port: 22, jump: ACCEPT, comment: ssh }
+      - { protocol: tcp, destination_port: 443, jump: ACCEPT }
+      - { source: 8.8.8.8, jump: DROP, state: absent }
+  become: yes
 '''
 
 
@@ -303,6 +352,215 @@ def remove_rule(iptables_path, module, params):
     module.run_command(cmd, check_rc=True)
 
 
+# Rule options which may be set per item of the rules list
+RULE_OPTIONS = dict(
+    protocol=None, source=None, destination=None, match=[], jump=None,
+    goto=None, in_interface=None, out_interface=None, fragment=None,
+    set_counters=None, source_port=None, destination_port=None,
+    to_ports=None, comment=None, ctstate=[], limit=None,
+)
+
+# Long and short spellings of options, as printed by iptables-save
+OPTION_ALIASES = {
+    '--protocol': '-p', '--source': '-s', '--src': '-s',
+    '--destination': '-d', '--dst': '-d', '--match': '-m', '--jump': '-j',
+    '--goto': '-g', '--in-interface': '-i', '--out-interface': '-o',
+    '--fragment': '-f', '--set-counters': '-c',
+    '--source-port': '--sport', '--destination-port': '--dport',
+    '--ctstate': '--state',
+}
+
+LIMIT_UNITS = dict(s='sec', m='min', h='hour', d='day')
+
+
+def normalize_address(address):
+    if '/' in address:
+        address, mask = address.split('/', 1)
+    else:
+        mask = None
+    if ':' in address:
+        family = socket.AF_INET6
+        bits = 128
+    else:
+        family = socket.AF_INET
+        bits = 32
+    try:
+        packed = socket.inet_pton(family, address)
+        if mask is None:
+            prefix = bits
+        elif '.' in mask:
+            netmask = struct.unpack('!I', socket.inet_aton(mask))[0]
+            prefix = 0
+            while netmask:
+                prefix += netmask & 1
+                netmask >>= 1
+        else:
+            prefix = int(mask)
+    except (socket.error, ValueError):
+        # host or network names are only resolved by iptables itself
+        if mask is None:
+            return address
+        return '%s/%s' % (address, mask)
+    value = 0
+    for byte in packed:
+        value = (value << 8) | ord(byte)
+    value &= ((1 << bits) - 1) ^ ((1 << (bits - prefix)) - 1)
+    packed = ''.join([chr((value >> shift) & 0xff) for shift in range(bits - 8, -8, -8)])
+    return '%s/%d' % (socket.inet_ntop(family, packed), prefix)
+
+
+def normalize_port(port):
+    ports = []
+    for item in port.split(':'):
+        if item and not item.isdigit():
+            try:
+                item = str(socket.getservbyname(item))
+            except socket.error:
+                pass
+        ports.append(item)
+    return ':'.join(ports)
+
+
+def normalize_limit(limit):
+    if '/' not in limit:
+        return '%s/sec' % limit
+    rate, unit = limit.split('/', 1)
+    return '%s/%s' % (rate, LIMIT_UNITS.get(unit[:1].lower(), unit))
+
+
+def rule_key(tokens):
+    '''Return a comparable key for the rule given as iptables arguments.
+
+    Spellings, addresses, ports, state lists and implicit protocol matches
+    are normalized the way iptables-save prints them, and the order of the
+    options does not matter. Counters are not part of a rule's identity.
+    '''
+    options = []
+    matches = set()
+    protocol = None
+    negate = False
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == '!':
+            negate = True
+            i += 1
+            continue
+        option = OPTION_ALIASES.get(token, token)
+        if i + 1 < len(tokens):
+            value = tokens[i + 1]
+        else:
+            value = ''
+        i += 2
+        if option == '-c':
+            continue
+        if option == '-m':
+            matches.add(value)
+            continue
+        if option in ('-s', '-d'):
+            value = ','.join(sorted([normalize_address(a) for a in value.split(',')]))
+        elif option in ('--sport', '--dport'):
+            value = normalize_port(value)
+        elif option == '--state':
+            value = ','.join(sorted(value.upper().split(',')))
+        elif option == '--limit':
+            value = normalize_limit(value)
+        elif option == '-p':
+            value = value.lower()
+            protocol = value
+        if negate:
+            option = '!' + option
+            negate = False
+        options.append((option, value))
+    # iptables-save prints the protocol match implied by port options
+    matches.discard(protocol)
+    return tuple(sorted(options) + sorted([('-m', m) for m in matches]))
+
+
+def quote_rule(tokens):
+    quoted = []
+    for t in tokens:
+        if ' ' in t or not t:
+            t = '"%s"' % t.replace('"', '\\"')
+        quoted.append(t)
+    return ' '.join(quoted)
+
+
+def read_chain(iptables_save_path, module, table, chain):
+    '''Return the rules of chain as (key, rule specification) tuples.'''
+    rc, out, err = module.run_command([iptables_save_path, '-t', table], check_rc=True)
+    prefix = '-A %s ' % chain
+    chain_exists = False
+    rules = []
+    for line in out.splitlines():
+        if line.startswith(':%s ' % chain):
+            chain_exists = True
+        elif line.startswith(prefix):
+            spec = line[len(prefix):]
+            rules.append((rule_key(shlex.split(spec)), spec))
+    if not chain_exists:
+        module.fail_json(msg="Chain %s does not exist in table %s" % (chain, table))
+    return rules
+
+
+def apply_rules(module):
+    '''Converge a chain to the rules list with one iptables-restore.'''
+    table = module.params['table']
+    chain = module.params['chain']
+    ip_version = module.params['ip_version']
+    iptables_save_path = module.get_bin_path(SAVE_BINS[ip_version], True)
+    iptables_restore_path = module.get_bin_path(RESTORE_BINS[ip_version], True)
+
+    wanted = []
+    for item in module.params['rules']:
+        if not isinstance(item, dict):
+            module.fail_json(msg="Every item of rules must be a dictionary")
+        unknown = [k for k in item if k not in RULE_OPTIONS and k != 'state']
+        if unknown:
+            module.fail_json(msg="Unsupported rule option(s): %s" % ', '.join(unknown))
+        params = dict(RULE_OPTIONS)
+        params.update(item)
+        for option in ('match', 'ctstate'):
+            if isinstance(params[option], basestring):
+                params[option] = params[option].split(',')
+        for option, value in params.items():
+            if option not in ('match', 'ctstate') and value is not None:
+                params[option] = str(value)
+        state = params.pop('state', None) or module.params['state']
+        if state not in ('present', 'absent'):
+            module.fail_json(msg="Invalid rule state: %s" % state)
+        tokens = construct_rule(params)
+        wanted.append((rule_key(tokens), tokens, state))
+
+    current = read_chain(iptables_save_path, module, table, chain)
+    current_keys = set([key for key, spec in current])
+    present_keys = set([key for key, tokens, state in wanted if state == 'present'])
+    absent_keys = set([key for key, tokens, state in wanted if state == 'absent'])
+
+    commands = []
+    removed = []
+    added = []
+    for key, spec in current:
+        if key in absent_keys or (module.params['purge_rules'] and key not in present_keys):
+            commands.append('-D %s %s' % (chain, spec))
+            removed.append(spec)
+    for key, tokens, state in wanted:
+        if state == 'present' and key not in current_keys:
+            current_keys.add(key)
+            commands.append('-A %s %s' % (chain, quote_rule(tokens)))
+            added.append(' '.join(tokens))
+
+    changed = bool(commands)
+    if changed and not module.check_mode:
+        data = '*%s\n%s\nCOMMIT\n' % (table, '\n'.join(commands))
+        rc, out, err = module.run_command([iptables_restore_path, '--noflush'], data=data)
+        if rc != 0:
+            module.fail_json(msg="iptables-restore failed: %s" % err, rc=rc, commands=commands)
+
+    module.exit_json(changed=changed, ip_version=ip_version, table=table, chain=chain,
+                     rules_added=added, rules_removed=removed)
+
+
 def main():
     module = AnsibleModule(
         supports_check_mode=True,
@@ -327,8 +585,13 @@ def main():
             comment=dict(required=False, default=None, type='str'),
             ctstate=dict(required=False, default=[], type='list'),
             limit=dict(required=False, default=None, type='str'),
+            rules=dict(required=False, default=None, type='list'),
+            purge_rules=dict(required=False, default=False, type='bool'),
         ),
     )
+    if module.params['rules'] is not None:
+        apply_rules(module)
+
     args = dict(
         changed=False,
         failed=False,
@@ -31,8 +31,8 @@ options:
   name:
     aliases: [ 'host' ]
     description:
-      - The host to add or remove (must match a host specified in key)
-    required: true
+      - The host to add or remove (must match a host specified in key). Required unless I(hosts) is used.
+    required: false
     default: null
   key:
     description:
@@ -50,6 +50,16 @@ options:
     choices: [ "present", "absent" ]
     required: no
     default: present
+  hosts:
+    description:
+      - A list of hosts to add or remove in one go, instead of I(name) and I(key). Every item is a
+        dictionary with the keys I(name), I(key) and optionally I(state), which defaults to the value of the
+        I(state) option.
+      - The file is parsed once, hashed host names are matched in-process and all changes are written
+        with a single atomic write, instead of running C(ssh-keygen) for every host.
+    required: no
+    default: null
+    version_added: "2.1"
 requirements: [ ]
 author: "Matthew Vernon (@mcv21)"
 '''
@@ -60,6 +70,18 @@ EXAMPLES = '''
   known_hosts: path='/etc/ssh/ssh_known_hosts'
                name='foo.com.invalid'
                key="{{ lookup('file', 'pubkeys/foo.com.invalid') }}"
+
+# Add many hosts and remove a stale one with a single rewrite of the file
+- name: tell the host about all of our servers
+  known_hosts:
+    path: /etc/ssh/ssh_known_hosts
+    hosts:
+      - name: foo.com.invalid
+        key: "{{ lookup('file', 'pubkeys/foo.com.invalid') }}"
+      - name: bar.com.invalid
+        key: "{{ lookup('file', 'pubkeys/bar.com.invalid') }}"
+      - name: old.com.invalid
+        state: absent
 '''
 
 # Makes sure public host keys are present or absent in the given known_hosts
@@ -76,6 +98,14 @@ import os
 import os.path
 import tempfile
 import errno
+import re
+import hmac
+import base64
+import binascii
+try:
+    from hashlib import sha1
+except ImportError:
+    import sha as sha1
 
 def enforce_state(module, params):
     """
@@ -234,19 +264,243 @@ def search_for_host_key(module,host,key,path,sshkeygen):
     #No match found, return current and replace
     return True, True
 
+def parse_key_line(line):
+    '''parse_key_line(line) -> (marker,hostfield,keytype,key) or None
+
+    Splits a known_hosts line into its fields, returns None for comments,
+    blank and malformed lines.
+    '''
+    fields=line.split()
+    if not fields or fields[0][0]=='#':
+        return None
+    marker=None
+    #The optional "marker" field, used for @cert-authority or @revoked
+    if fields[0][0]=='@':
+        marker=fields.pop(0)
+    if len(fields)<3:
+        return None
+    return marker,fields[0],fields[1],fields[2]
+
+def hashed_host_field(hostfield):
+    '''Return (salt,digest) of a hashed |1|salt|hash host field, or None.'''
+    if not hostfield.startswith('|1|'):
+        return None
+    try:
+        salt,digest=hostfield[3:].split('|',1)
+        return base64.b64decode(salt),base64.b64decode(digest)
+    except (ValueError,TypeError,binascii.Error):
+        return None
+
+def pattern_to_regex(pattern):
+    '''Convert an ssh host pattern using * and ? to a compiled regex.'''
+    regex=''.join([{'*':'.*','?':'.'}.get(c,re.escape(c)) for c in pattern])
+    return re.compile('^%s$' % regex,re.IGNORECASE)
+
+class KnownHosts(object):
+    '''In-memory index of a known_hosts file.
+
+    The file is parsed once. Plain host names are looked up in a dict,
+    hashed host names are matched with HMAC-SHA1, one digest per distinct
+    salt, and wildcard patterns are tried last. Removed lines are blanked
+    and the file is only written once by save().
+    '''
+
+    def __init__(self,path):
+        self.path=path
+        self.lines=[]
+        self.names={}
+        self.hashed={}
+        self.patterns=[]
+        self.changed=False
+        if os.path.exists(path):
+            f=open(path,'r')
+            try:
+                for line in f:
+                    self.append(line)
+            finally:
+                f.close()
+        self.changed=False
+
+    def append(self,line):
+        if line and line[-1]!='\n':
+            line+='\n'
+        index=len(self.lines)
+        self.lines.append(line)
+        self.changed=True
+        parsed=parse_key_line(line)
+        if parsed is None:
+            return
+        hostfield=parsed[1]
+        hashed=hashed_host_field(hostfield)
+        if hashed is not None:
+            salt,digest=hashed
+            self.hashed.setdefault(salt,{}).setdefault(digest,[]).append(index)
+            return
+        for name in hostfield.split(','):
+            if not name:
+                continue
+            if '*' in name or '?' in name or name[0]=='!':
+                self.patterns.append((hostfield,index))
+                break
+            self.names.setdefault(name.lower(),[]).append(index)
+
+    def find(self,host):
+        '''Return the indexes of all lines matching host.'''
+        found=set(self.names.get(host.lower(),[]))
+        for salt,digests in self.hashed.items():
+            digest=hmac.new(salt,host,sha1).digest()
+            found.update(digests.get(digest,[]))
+        for hostfield,index in self.patterns:
+            if host_field_matches(hostfield,host):
+                found.add(index)
+        return sorted([i for i in found if self.lines[i] is not None])
+
+    def keys(self,host):
+        '''Return the set of (marker,keytype,key) known for host.'''
+        keys=set()
+        for index in self.find(host):
+            marker,hostfield,keytype,key=parse_key_line(self.lines[index])
+            keys.add((marker,keytype,key))
+        return keys
+
+    def remove(self,host):
+        '''Remove the plain entries of host, like ssh-keygen -R.
+
+        @revoked and @cert-authority lines and wildcard patterns are
+        kept. Other names sharing a line with host keep that line.
+        Returns True if anything was removed.
+        '''
+        removed=False
+        for index in self.find(host):
+            line=self.lines[index]
+            marker,hostfield,keytype,key=parse_key_line(line)
+            if marker is not None:
+                continue
+            if hashed_host_field(hostfield) is None:
+                names=hostfield.split(',')
+                if [n for n in names if '*' in n or '?' in n or n[:1]=='!']:
+                    continue
+                rest=[n for n in names if n.lower()!=host.lower()]
+                if len(rest)==len(names):
+                    continue
+                if rest:
+                    self.names[host.lower()].remove(index)
+                    self.lines[index]='%s %s' % (','.join(rest),line.split(None,1)[1])
+                    removed=True
+                    self.changed=True
+                    continue
+            self.lines[index]=None
+            removed=True
+            self.changed=True
+        return removed
+
+    def save(self,module):
+        try:
+            outf=tempfile.NamedTemporaryFile(dir=os.path.dirname(self.path))
+            for line in self.lines:
+                if line is not None:
+                    outf.write(line)
+            outf.flush()
+            module.atomic_move(outf.name,self.path)
+        except (IOError,OSError),e:
+            module.fail_json(msg="Failed to write to file %s: %s" % \
+                                 (self.path,str(e)))
+        try:
+            outf.close()
+        except:
+            pass
+
+def host_field_matches(hostfield,host):
+    '''Does the host field of a known_hosts line match host?'''
+    hashed=hashed_host_field(hostfield)
+    if hashed is not None:
+        salt,digest=hashed
+        return hmac.new(salt,host,sha1).digest()==digest
+    matched=False
+    for pattern in hostfield.split(','):
+        if not pattern:
+            continue
+        negated=pattern[0]=='!'
+        if negated:
+            pattern=pattern[1:]
+        if pattern_to_regex(pattern).match(host):
+            if negated:
+                return False
+            matched=True
+    return matched
+
+def enforce_states(module,params):
+    '''
+    Add or remove the keys of every host in params["hosts"].
+    '''
+
+    path=os.path.expanduser(params.get("path"))
+    default_state=params.get("state")
+
+    wanted=[]
+    for item in params["hosts"]:
+        if not isinstance(item,dict) or not item.get("name"):
+            module.fail_json(msg="Every item of hosts requires a name")
+        host=item["name"]
+        key=item.get("key",None)
+        state=item.get("state",default_state)
+        if state not in ("present","absent"):
+            module.fail_json(msg="Invalid state %s for host %s" % (state,host))
+        if key is None and state!="absent":
+            module.fail_json(msg="No key specified when adding host %s" % host)
+        key_lines=[]
+        if key is not None:
+            for line in key.splitlines():
+                parsed=parse_key_line(line)
+                if parsed is None:
+                    continue
+                if not host_field_matches(parsed[1],host):
+                    module.fail_json(msg="Host parameter %s does not match hashed host field in supplied key" % host)
+                key_lines.append((line,(parsed[0],parsed[2],parsed[3])))
+            if not key_lines:
+                module.fail_json(msg="No valid key specified for host %s" % host)
+        wanted.append((host,state,key_lines))
+
+    known_hosts=KnownHosts(path)
+    changed_hosts=[]
+    for host,state,key_lines in wanted:
+        current=known_hosts.keys(host)
+        if state=="absent":
+            if current and known_hosts.remove(host):
+                changed_hosts.append(host)
+        elif not current or [k for l,k in key_lines if k not in current]:
+            #Replace all keys of the host, like ssh-keygen -R would
+            known_hosts.remove(host)
+            for line,k in key_lines:
+                known_hosts.append(line)
+            changed_hosts.append(host)
+
+    if changed_hosts and not module.check_mode:
+        known_hosts.save(module)
+
+    params['changed']=bool(changed_hosts)
+    params['changed_hosts']=changed_hosts
+    return params
+
 def main():
 
     module = AnsibleModule(
         argument_spec = dict(
-            name      = dict(required=True,  type='str', aliases=['host']),
+            name      = dict(required=False,  type='str', aliases=['host']),
             key       = dict(required=False,  type='str'),
             path      = dict(default="~/.ssh/known_hosts", type='str'),
             state     = dict(default='present', choices=['absent','present']),
+            hosts     = dict(required=False, type='list'),
             ),
+        required_one_of = [['name','hosts']],
+        mutually_exclusive = [['name','hosts'],['key','hosts']],
         supports_check_mode = True
         )
 
-    results = enforce_state(module,module.params)
+    if module.params['hosts'] is not None:
+        results = enforce_states(module,module.params)
+    else:
+        results = enforce_state(module,module.params)
     module.exit_json(**results)
 
 # import module snippets
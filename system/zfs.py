@@ -29,13 +29,24 @@ version_added: "1.1"
 options:
   name:
     description:
-      - File system, snapshot or volume name e.g. C(rpool/myfs)
-    required: true
+      - File system, snapshot or volume name e.g. C(rpool/myfs). Required unless C(datasets) is used.
+    required: false
   state:
     description:
       - Whether to create (C(present)), or remove (C(absent)) a file system, snapshot or volume.
+      - With C(datasets) this is the default state of every item.
     required: true
     choices: [present, absent]
+  datasets:
+    description:
+      - List of file systems, snapshots or volumes to manage in one run. Every item is a dictionary with a
+        C(name), an optional C(state) and any of the properties of this module. Properties set on the module
+        itself apply to every item unless overridden.
+      - The current state of all datasets is read with a single C(zfs list -r) over the pools involved and
+        property changes are applied with as few C(zfs set) calls as possible, one per set of identical
+        changes for all datasets sharing it.
+    required: false
+    version_added: "2.1"
   aclinherit:
     description:
       - The aclinherit property.
@@ -232,20 +243,35 @@ EXAMPLES = '''
 
 # Destroy a filesystem
 - zfs: name=rpool/myfs state=absent
+
+# Manage a tree of file systems in one go
+- zfs:
+    state: present
+    compression: lz4
+    datasets:
+      - name: tank/home
+        atime: 'off'
+      - name: tank/home/alice
+        quota: 10G
+      - name: tank/home/bob
+        quota: 20G
+      - name: tank/home/mallory
+        state: absent
 '''
 
 
 import os
 
 class Zfs(object):
+
+    immutable_properties = [ 'casesensitivity', 'normalization', 'utf8only' ]
+
     def __init__(self, module, name, properties):
         self.module = module
         self.name = name
         self.properties = properties
         self.changed = False
 
-        self.immutable_properties = [ 'casesensitivity', 'normalization', 'utf8only' ]
-
     def exists(self):
         cmd = [self.module.get_bin_path('zfs', True)]
         cmd.append('list')
@@ -309,26 +335,19 @@ class Zfs(object):
         else:
             self.module.fail_json(msg=out)
 
-    def set_property(self, prop, value):
-        if self.module.check_mode:
-            self.changed = True
-            return
-        cmd = self.module.get_bin_path('zfs', True)
-        args = [cmd, 'set', prop + '=' + value, self.name]
-        (rc, err, out) = self.module.run_command(args)
-        if rc == 0:
-            self.changed = True
-        else:
-            self.module.fail_json(msg=out)
-
     def set_properties_if_changed(self):
         current_properties = self.get_current_properties()
+        changes = []
         for prop, value in self.properties.iteritems():
             if current_properties[prop] != value:
                 if prop in self.immutable_properties:
                     self.module.fail_json(msg='Cannot change property %s after creation.' % prop)
                 else:
-                    self.set_property(prop, value) 
+                    changes.append((prop, value))
+        if changes:
+            if not self.module.check_mode:
+                set_properties(self.module, [self.name], changes)
+            self.changed = True
 
     def get_current_properties(self):
         def get_properties_by_name(propname):
@@ -351,12 +370,126 @@ class Zfs(object):
         cmd[0] = module.get_bin_path(progname, True)
         return module.run_command(cmd)
 
+# Properties holding sizes, listed in bytes by zfs list -p
+SIZE_PROPERTIES = [ 'quota', 'recordsize', 'refquota', 'refreservation',
+                    'reservation', 'volblocksize', 'volsize' ]
+
+# Options which are not properties read back from zfs list
+NON_PROPERTIES = [ 'createparent', 'origin' ]
+
+def parse_size(value):
+    if value in ('none', '-'):
+        return '0'
+    units = 'BKMGTPEZ'
+    size = value.upper()
+    if len(size) > 1 and size.endswith('B') and size[-2] in units:
+        size = size[:-1]
+    try:
+        if size[-1:] in units:
+            return str(int(float(size[:-1]) * 1024 ** units.index(size[-1])))
+        return str(int(float(size)))
+    except ValueError:
+        return value
+
+def set_properties(module, names, changes):
+    zfs = module.get_bin_path('zfs', True)
+    args = ['%s=%s' % (prop, value) for prop, value in changes]
+    rc, out, err = module.run_command([zfs, 'set'] + args + names)
+    if rc != 0 and len(args) > 1:
+        # older zfs releases only accept a single property per call
+        for arg in args:
+            rc, out, err = module.run_command([zfs, 'set', arg] + names)
+            if rc != 0:
+                break
+    if rc != 0:
+        module.fail_json(msg=err or out)
+
+class ZfsTree(object):
+    def __init__(self, module, items, default_state, default_properties):
+        self.module = module
+        self.changed = False
+        self.datasets = []
+        for item in items:
+            if not isinstance(item, dict) or not item.get('name'):
+                module.fail_json(msg='Every item of datasets requires a name')
+            properties = dict(default_properties)
+            state = default_state
+            for prop, value in item.iteritems():
+                if prop == 'state':
+                    state = value
+                elif prop != 'name':
+                    if prop not in module.argument_spec or prop in ['datasets']:
+                        module.fail_json(msg='Unsupported property %s for %s' % (prop, item['name']))
+                    properties[prop] = str(value)
+            if state not in ['present', 'absent']:
+                module.fail_json(msg='Invalid state %s for %s' % (state, item['name']))
+            self.datasets.append((item['name'], state, properties))
+
+    def snapshot(self):
+        props = set()
+        for name, state, properties in self.datasets:
+            props.update([p for p in properties if p not in NON_PROPERTIES])
+        props = sorted(props)
+        pools = sorted(set([name.split('@')[0].split('/')[0] for name, state, properties in self.datasets]))
+        types = 'filesystem,volume'
+        if [name for name, state, properties in self.datasets if '@' in name]:
+            types += ',snapshot'
+        cmd = [self.module.get_bin_path('zfs', True), 'list', '-H', '-p', '-r',
+               '-t', types, '-o', ','.join(['name'] + props)] + pools
+        # pools which do not exist are reported on stderr, the others listed
+        rc, out, err = self.module.run_command(cmd)
+        current = {}
+        for line in out.splitlines():
+            fields = line.split('\t')
+            current[fields[0]] = dict(zip(props, fields[1:]))
+        return current
+
+    def differs(self, prop, wanted, value):
+        if prop in SIZE_PROPERTIES:
+            return parse_size(wanted) != parse_size(value)
+        return wanted != value
+
+    def set_properties(self, names, changes):
+        if not self.module.check_mode:
+            set_properties(self.module, names, changes)
+        self.changed = True
+
+    def apply(self):
+        current = self.snapshot()
+        changes = {}
+        # destroy children before their parents
+        for name, state, properties in sorted(self.datasets, reverse=True):
+            if state == 'absent' and name in current:
+                zfs = Zfs(self.module, name, properties)
+                zfs.destroy()
+                self.changed = self.changed or zfs.changed
+        for name, state, properties in sorted(self.datasets):
+            if state == 'absent':
+                continue
+            if name not in current:
+                zfs = Zfs(self.module, name, dict(properties))
+                zfs.create()
+                self.changed = self.changed or zfs.changed
+                continue
+            changed = []
+            for prop, value in sorted(properties.iteritems()):
+                if prop in NON_PROPERTIES:
+                    continue
+                if self.differs(prop, value, current[name].get(prop)):
+                    if prop in Zfs.immutable_properties:
+                        self.module.fail_json(msg='Cannot change property %s of %s after creation.' % (prop, name))
+                    changed.append((prop, value))
+            if changed:
+                changes.setdefault(tuple(changed), []).append(name)
+        for changed, names in changes.iteritems():
+            self.set_properties(names, list(changed))
+
 def main():
 
     # FIXME: should use dict() constructor like other modules, required=False is default
     module = AnsibleModule(
         argument_spec = {
-            'name':            {'required': True},
+            'name':            {'required': False},
             'state':           {'required': True,  'choices':['present', 'absent']},
             'aclinherit':      {'required': False, 'choices':['discard', 'noallow', 'restricted', 'passthrough', 'passthrough-x']},
             'aclmode':         {'required': False, 'choices':['discard', 'groupmask', 'passthrough']},
@@ -400,12 +533,16 @@ def main():
             'vscan':           {'required': False, 'choices':['on', 'off']},
             'xattr':           {'required': False, 'choices':['on', 'off']},
             'zoned':           {'required': False, 'choices':['on', 'off']},
+            'datasets':        {'required': False, 'type': 'list'},
             },
+        required_one_of=[['name', 'datasets']],
+        mutually_exclusive=[['name', 'datasets']],
         supports_check_mode=True
         )
 
     state = module.params.pop('state')
     name = module.params.pop('name')
+    datasets = module.params.pop('datasets')
 
     # Get all valid zfs-properties
     properties = dict()
@@ -415,6 +552,12 @@ def main():
         if value:
             properties[prop] = value
 
+    if datasets is not None:
+        tree = ZfsTree(module, datasets, state, properties)
+        tree.apply()
+        module.exit_json(changed=tree.changed, state=state,
+                         datasets=[d[0] for d in tree.datasets])
+
     result = {}
     result['name'] = name
     result['state'] = state